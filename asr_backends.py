@@ -0,0 +1,128 @@
+import importlib.util
+import warnings
+
+
+class ASRBackend:
+    """
+    Base class for speech recognition engines used by the ASR worker process.
+
+    Subclasses load their model in load() and turn 16 kHz mono float32 audio in the
+    range [-1, 1] into text in transcribe(). Both run inside the worker process only.
+    """
+
+    name = "base"
+    module_name = None  # Top-level import the backend needs, for availability checks
+
+    def __init__(self, model_name, **options):
+        self.model_name = model_name
+        self.options = options
+        self.model = None
+
+    @classmethod
+    def is_available(cls):
+        return (
+            cls.module_name is not None
+            and importlib.util.find_spec(cls.module_name) is not None
+        )
+
+    def load(self):
+        raise NotImplementedError
+
+    def transcribe(self, audio_np, initial_prompt=None):
+        raise NotImplementedError
+
+    def describe(self):
+        return f"{self.name}:{self.model_name}"
+
+
+class WhisperBackend(ASRBackend):
+    """The reference openai-whisper implementation (PyTorch, fp32 on CPU)."""
+
+    name = "whisper"
+    module_name = "whisper"
+
+    def load(self):
+        import whisper
+
+        # The FutureWarning from Whisper regarding torch.load(weights_only=False)
+        # originates from within whisper.load_model. It's safe to ignore for official models.
+        with warnings.catch_warnings():
+            warnings.filterwarnings(
+                "ignore", category=FutureWarning, module="torch.serialization"
+            )
+            self.model = whisper.load_model(self.model_name)
+
+    def transcribe(self, audio_np, initial_prompt=None):
+        with warnings.catch_warnings():
+            warnings.filterwarnings(
+                "ignore", category=FutureWarning, module="torch.serialization"
+            )
+            result = self.model.transcribe(
+                audio_np, fp16=False, initial_prompt=initial_prompt or None
+            )  # fp16=False for CPU
+        return result["text"].strip()
+
+
+class FasterWhisperBackend(ASRBackend):
+    """
+    CTranslate2-based faster-whisper with quantized weights. On CPU-only machines int8
+    inference is several times faster than openai-whisper in fp32 at similar accuracy.
+    """
+
+    name = "faster-whisper"
+    module_name = "faster_whisper"
+
+    def load(self):
+        from faster_whisper import WhisperModel
+
+        self.model = WhisperModel(
+            self.model_name,
+            device=self.options.get("device", "cpu"),
+            compute_type=self.options.get("compute_type", "int8"),
+            cpu_threads=int(self.options.get("cpu_threads", 0)),
+        )
+
+    def transcribe(self, audio_np, initial_prompt=None):
+        segments, _info = self.model.transcribe(
+            audio_np,
+            beam_size=int(self.options.get("beam_size", 5)),
+            initial_prompt=initial_prompt or None,
+        )
+        # segments is a lazy generator; decoding happens while it is consumed
+        return "".join(segment.text for segment in segments).strip()
+
+
+ASR_BACKENDS = {
+    WhisperBackend.name: WhisperBackend,
+    FasterWhisperBackend.name: FasterWhisperBackend,
+}
+DEFAULT_ASR_BACKEND = WhisperBackend.name
+
+
+def asr_backend_available(name):
+    backend_cls = ASR_BACKENDS.get(name)
+    return backend_cls is not None and backend_cls.is_available()
+
+
+def select_asr_backend(name):
+    """
+    Returns name if that backend is installed, otherwise the first installed one,
+    DEFAULT_ASR_BACKEND first, or None when no backend is installed.
+    """
+    if asr_backend_available(name):
+        return name
+    candidates = [DEFAULT_ASR_BACKEND] + [
+        other for other in ASR_BACKENDS if other != DEFAULT_ASR_BACKEND
+    ]
+    return next((other for other in candidates if asr_backend_available(other)), None)
+
+
+def create_asr_backend(name, model_name, **options):
+    """Instantiates the backend registered under name. Raises ValueError for unknown names."""
+    try:
+        backend_cls = ASR_BACKENDS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown ASR backend '{name}'. Choose one of: {', '.join(ASR_BACKENDS)}"
+        )
+    return backend_cls(model_name, **options)
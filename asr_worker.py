@@ -0,0 +1,183 @@
+import itertools
+import multiprocessing
+import threading
+import time
+
+from asr_backends import DEFAULT_ASR_BACKEND, create_asr_backend
+
+ASR_SAMPLE_RATE = 16000
+
+
+def _asr_worker_main(conn, backend_name, model_name, backend_options):
+    """
+    Entry point of the ASR process. Loads the configured backend, runs one warm-up decode
+    so lazy initialization happens before the first real utterance, then serves requests.
+
+    Messages received: ("transcribe", request_id, initial_prompt) followed by the PCM as
+    raw int16 bytes via send_bytes, or ("shutdown",).
+    Messages sent: ("status", text), ("ready", load_seconds, warmup_seconds),
+    ("error", text), ("result", request_id, text, decode_seconds, error).
+    """
+    try:
+        import numpy as np
+
+        backend = create_asr_backend(backend_name, model_name, **backend_options)
+        conn.send(("status", f"Loading ASR model ({backend.describe()})..."))
+        start_time = time.perf_counter()
+        backend.load()
+        load_seconds = time.perf_counter() - start_time
+
+        conn.send(("status", f"Warming up {backend.name}..."))
+        start_time = time.perf_counter()
+        # One second of a quiet 440 Hz tone with a little noise exercises the full decode path
+        t = np.arange(ASR_SAMPLE_RATE, dtype=np.float32) / ASR_SAMPLE_RATE
+        warmup_audio = 0.05 * np.sin(2 * np.pi * 440 * t) + 0.005 * np.random.randn(
+            ASR_SAMPLE_RATE
+        ).astype(np.float32)
+        backend.transcribe(warmup_audio.astype(np.float32))
+        warmup_seconds = time.perf_counter() - start_time
+        conn.send(("ready", load_seconds, warmup_seconds))
+    except Exception as e:
+        conn.send(
+            ("error", f"Failed to load {backend_name} model '{model_name}': {e}")
+        )
+        return
+
+    while True:
+        try:
+            msg = conn.recv()
+        except (EOFError, OSError):
+            break
+        if msg[0] == "shutdown":
+            break
+        if msg[0] != "transcribe":
+            continue
+        _, request_id, initial_prompt = msg
+        pcm = conn.recv_bytes()
+        start_time = time.perf_counter()
+        try:
+            audio_np = np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+            text, error = backend.transcribe(audio_np, initial_prompt), None
+        except Exception as e:
+            text, error = None, str(e)
+        conn.send(
+            ("result", request_id, text, time.perf_counter() - start_time, error)
+        )
+    conn.close()
+
+
+class ASRWorkerProcess:
+    """
+    Runs the ASR backend in a separate process so model loading and decoding never hold
+    the GIL of the GUI process. PCM is sent over a pipe; results and readiness come back as
+    messages that a listener thread dispatches to waiting callers and to on_event.
+    """
+
+    def __init__(
+        self, model_name, on_event=None, backend_name=DEFAULT_ASR_BACKEND, **options
+    ):
+        self.model_name = model_name
+        self.backend_name = backend_name
+        self.backend_options = options
+        self.on_event = on_event  # Called as on_event(kind, *args) from the listener thread
+        self.process = None
+        self.conn = None
+        self.ready = False
+        self.failed = False
+        self.load_seconds = None
+        self.warmup_seconds = None
+
+        self._send_lock = threading.Lock()
+        self._request_ids = itertools.count(1)
+        self._pending = {}  # request_id -> [threading.Event, result tuple]
+        self._ready_event = threading.Event()
+        self._listener_thread = None
+
+    def start(self):
+        parent_conn, child_conn = multiprocessing.Pipe(duplex=True)
+        self.conn = parent_conn
+        self.process = multiprocessing.Process(
+            target=_asr_worker_main,
+            args=(child_conn, self.backend_name, self.model_name, self.backend_options),
+            daemon=True,
+            name="asr-worker",
+        )
+        self.process.start()
+        child_conn.close()
+        self._listener_thread = threading.Thread(target=self._listen, daemon=True)
+        self._listener_thread.start()
+        print(
+            f"ASR worker process started (pid {self.process.pid}, backend {self.backend_name})."
+        )
+
+    def _listen(self):
+        while True:
+            try:
+                msg = self.conn.recv()
+            except (EOFError, OSError):
+                break
+            kind = msg[0]
+            if kind == "result":
+                _, request_id, text, decode_seconds, error = msg
+                pending = self._pending.pop(request_id, None)
+                if pending:
+                    pending[1] = (text, decode_seconds, error)
+                    pending[0].set()
+            elif kind == "ready":
+                self.ready = True
+                self.load_seconds, self.warmup_seconds = msg[1], msg[2]
+                self._ready_event.set()
+            elif kind == "error":
+                self.failed = True
+                self._ready_event.set()
+            if self.on_event:
+                self.on_event(*msg)
+        # Process went away: release anyone still waiting
+        self.ready = False
+        for request_id, pending in list(self._pending.items()):
+            pending[1] = (None, 0.0, "ASR worker process exited.")
+            pending[0].set()
+        self._pending.clear()
+
+    def is_ready(self):
+        return self.ready
+
+    def wait_until_ready(self, timeout=None):
+        self._ready_event.wait(timeout)
+        return self.ready
+
+    def transcribe(self, pcm_bytes, initial_prompt=None, timeout=None):
+        """
+        Decodes 16 kHz int16 PCM in the worker process. Returns (text, decode_seconds).
+        Raises RuntimeError if the worker is not ready or the decode failed.
+        """
+        if not self.ready:
+            raise RuntimeError("ASR worker is not ready.")
+        request_id = next(self._request_ids)
+        pending = [threading.Event(), None]
+        self._pending[request_id] = pending
+        with self._send_lock:
+            self.conn.send(("transcribe", request_id, initial_prompt))
+            self.conn.send_bytes(pcm_bytes)
+        if not pending[0].wait(timeout):
+            self._pending.pop(request_id, None)
+            raise RuntimeError("Timed out waiting for the ASR worker.")
+        text, decode_seconds, error = pending[1]
+        if error:
+            raise RuntimeError(error)
+        return text, decode_seconds
+
+    def shutdown(self, timeout=2.0):
+        if not self.process:
+            return
+        try:
+            with self._send_lock:
+                self.conn.send(("shutdown",))
+        except Exception:
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            print("ASR worker did not exit in time, terminating.")
+            self.process.terminate()
+        self.ready = False
+        print("ASR worker process stopped.")
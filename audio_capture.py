@@ -0,0 +1,196 @@
+import array
+import threading
+import time
+
+
+class PreRollBuffer:
+    """
+    Fixed-size ring buffer of the most recent int16 samples, backed by a preallocated
+    array so the always-on reader thread never allocates per chunk.
+    """
+
+    def __init__(self, capacity_samples):
+        self.capacity = max(0, int(capacity_samples))
+        self._buf = array.array("h", bytes(2 * self.capacity))
+        self._write_pos = 0
+        self._filled = 0
+
+    def write(self, data):
+        if self.capacity == 0:
+            return
+        samples = array.array("h")
+        samples.frombytes(data)
+        if len(samples) >= self.capacity:
+            # Chunk larger than the buffer: keep only its newest samples
+            self._buf[:] = samples[-self.capacity :]
+            self._write_pos = 0
+            self._filled = self.capacity
+            return
+        end = self._write_pos + len(samples)
+        if end <= self.capacity:
+            self._buf[self._write_pos : end] = samples
+        else:
+            first = self.capacity - self._write_pos
+            self._buf[self._write_pos :] = samples[:first]
+            self._buf[: end - self.capacity] = samples[first:]
+        self._write_pos = end % self.capacity
+        self._filled = min(self.capacity, self._filled + len(samples))
+
+    def snapshot(self):
+        """Returns the buffered audio, oldest sample first, as int16 bytes."""
+        if self._filled < self.capacity:
+            return self._buf[: self._filled].tobytes()
+        return (self._buf[self._write_pos :] + self._buf[: self._write_pos]).tobytes()
+
+    def clear(self):
+        self._write_pos = 0
+        self._filled = 0
+
+
+class AudioCaptureService:
+    """
+    Owns a single PyAudio instance and a single input stream for the whole app session.
+
+    A reader thread keeps the stream drained at all times. Push-to-talk does not open or
+    close the device: begin_capture() and end_capture() only mark start and end offsets
+    (in chunks read since the stream was opened) and collect the chunks read in between.
+    Audio heard just before the press is kept in a pre-roll ring buffer and prepended to
+    every capture, so the first syllable is not lost to hotkey and thread latency.
+    """
+
+    def __init__(self, rate=16000, chunk=1024, on_error=None, preroll_seconds=1.0):
+        self.rate = rate
+        self.chunk = chunk
+        self.sample_width = 2  # int16
+        self.channels = 1
+        self.on_error = on_error  # Called as on_error(message) from the reader thread
+
+        self.pa = None
+        self.stream = None
+        self.device_index = None
+        self.chunks_read = 0  # Offset of the next chunk in the live stream
+
+        self._lock = threading.Lock()
+        self._running = False
+        self._reader_thread = None
+        self._capture_frames = None  # List of chunks while a capture is active
+        self._capture_start = 0
+        self.preroll = PreRollBuffer(int(preroll_seconds * rate))
+
+    def _ensure_pyaudio(self):
+        if self.pa is None:
+            import pyaudio  # Deferred so creating the service does not load PortAudio
+
+            self.pa = pyaudio.PyAudio()
+        return self.pa
+
+    def list_input_devices(self):
+        """Returns [{"name": ..., "index": ...}] for every device with input channels."""
+        pa = self._ensure_pyaudio()
+        devices = []
+        for i in range(pa.get_device_count()):
+            dev_info = pa.get_device_info_by_index(i)
+            if dev_info.get("maxInputChannels") > 0:
+                devices.append({"name": dev_info.get("name"), "index": i})
+        return devices
+
+    def default_input_device(self):
+        return self._ensure_pyaudio().get_default_input_device_info()
+
+    def start(self, device_index):
+        """
+        Opens the input stream on device_index (-1 for the system default) and starts the
+        reader thread. Returns the device index actually opened. Raises on failure.
+        """
+        self.stop_stream()
+        if device_index == -1:
+            device_index = self.default_input_device()["index"]
+        self.stream = self._open_stream(device_index)
+        self.device_index = device_index
+        self.chunks_read = 0
+        self.preroll.clear()
+        self._running = True
+        self._reader_thread = threading.Thread(target=self._reader, daemon=True)
+        self._reader_thread.start()
+        print(f"Audio capture: stream opened on device index {device_index}.")
+        return device_index
+
+    def _open_stream(self, device_index):
+        """Returns an input stream with read(frames, exception_on_overflow) and close()."""
+        pa = self._ensure_pyaudio()
+        return pa.open(
+            format=pa.get_format_from_width(self.sample_width),
+            channels=self.channels,
+            rate=self.rate,
+            input=True,
+            frames_per_buffer=self.chunk,
+            input_device_index=device_index,
+        )
+
+    def is_open(self):
+        return self._running and self.stream is not None
+
+    def _reader(self):
+        stream = self.stream
+        while self._running:
+            try:
+                data = stream.read(self.chunk, exception_on_overflow=False)
+            except IOError as e:
+                print(f"Audio capture: IOError while reading stream: {e}")
+                if self.on_error and self._capture_frames is not None:
+                    self.on_error(f"Audio error: {e}")
+                time.sleep(0.1)
+                continue
+            except Exception as e:
+                print(f"Audio capture: stream stopped unexpectedly: {e}")
+                self._running = False
+                if self.on_error:
+                    self.on_error(f"Microphone stream stopped: {e}")
+                break
+            with self._lock:
+                self.chunks_read += 1
+                if self._capture_frames is not None:
+                    self._capture_frames.append(data)
+                else:
+                    self.preroll.write(data)
+
+    def begin_capture(self):
+        """
+        Marks the start offset of a capture. Returns the list that chunks are appended to
+        while the capture is active, so consumers can read audio as it arrives. The first
+        entry holds the pre-roll audio captured before the press.
+        """
+        with self._lock:
+            self._capture_start = self.chunks_read
+            preroll_audio = self.preroll.snapshot()
+            self.preroll.clear()
+            self._capture_frames = [preroll_audio] if preroll_audio else []
+            return self._capture_frames
+
+    def end_capture(self):
+        """Marks the end offset of the capture and returns (start, end, frames)."""
+        with self._lock:
+            frames = self._capture_frames or []
+            self._capture_frames = None
+            return self._capture_start, self.chunks_read, frames
+
+    def stop_stream(self):
+        self._running = False
+        if self._reader_thread and self._reader_thread.is_alive():
+            self._reader_thread.join(timeout=1.0)
+        self._reader_thread = None
+        if self.stream:
+            try:
+                self.stream.stop_stream()
+                self.stream.close()
+            except Exception as e:
+                print(f"Audio capture: error closing stream: {e}")
+            self.stream = None
+
+    def close(self):
+        """Stops the stream and releases PyAudio. Only called on application exit."""
+        self.stop_stream()
+        if self.pa:
+            self.pa.terminate()
+            self.pa = None
+        print("Audio capture: PyAudio terminated.")
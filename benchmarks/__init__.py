@@ -0,0 +1,7 @@
+"""
+Micro-benchmarks for the speech pipeline. Run a module with python -m benchmarks.<name>.
+
+stage_bench and e2e_bench check their results against baselines.json. They run offline
+on stand-ins for Ollama (fake_ollama), the microphone (audio_corpus) and the speakers
+(null_tts).
+"""
@@ -0,0 +1,211 @@
+"""
+Utterances for the offline benchmarks and a microphone stand-in that plays them.
+
+A corpus is a directory of 16 kHz mono 16-bit WAV files, each optionally with a .txt file
+of the same name holding what is said. Recordings can be dropped in as they are;
+write_synthetic_corpus() creates speech-like test audio (voiced syllables between
+pauses) for when none are at hand. Synthetic audio exercises VAD and decoding time but
+does not transcribe to its .txt text.
+
+    python -m benchmarks.audio_corpus [--dir benchmarks/corpus] [--count 5]
+"""
+
+import argparse
+import array
+import collections
+import math
+import os
+import random
+import threading
+import time
+import wave
+
+from audio_capture import AudioCaptureService
+
+SAMPLE_RATE = 16000
+DEFAULT_CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+
+# What each synthetic utterance stands for; the e2e benchmark sends it as the query
+# when the ASR cannot make words of the audio
+SYNTHETIC_PROMPTS = (
+    "What is the capital of France?",
+    "Explain how a hash map works in two sentences.",
+    "Write a Python function that reverses a string.",
+    "Give me three tips for better sleep.",
+    "Summarize the plot of Hamlet briefly.",
+    "How do I list files in a directory from the shell?",
+    "What is the difference between a process and a thread?",
+    "Tell me a short joke about computers.",
+)
+
+Utterance = collections.namedtuple("Utterance", "name pcm transcript")
+
+
+def synthesize_utterance(seconds, seed=0, lead_silence=0.3, trail_silence=0.4):
+    """
+    Returns int16 PCM of speech-like sound: voiced syllables (a 120-220 Hz harmonic tone,
+    about four per second) with short pauses, between stretches of faint noise.
+    """
+    rng = random.Random(seed)
+    samples = array.array("h")
+
+    def noise(duration):
+        samples.extend(int(rng.gauss(0, 30)) for _ in range(int(duration * SAMPLE_RATE)))
+
+    noise(lead_silence)
+    spoken = 0.0
+    while spoken < seconds:
+        length = rng.uniform(0.15, 0.3)
+        pitch = rng.uniform(120, 220)
+        n = int(length * SAMPLE_RATE)
+        for i in range(n):
+            t = i / SAMPLE_RATE
+            envelope = math.sin(math.pi * i / n)  # Each syllable swells and fades
+            voiced = sum(
+                math.sin(2 * math.pi * pitch * k * t) / k for k in (1, 2, 3, 4)
+            )
+            samples.append(int(6000 * envelope * voiced + rng.gauss(0, 30)))
+        gap = rng.uniform(0.02, 0.12)
+        noise(gap)
+        spoken += length + gap
+    noise(trail_silence)
+    return samples.tobytes()
+
+
+def write_wav(path, pcm, sample_rate=SAMPLE_RATE):
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(pcm)
+
+
+def read_wav(path):
+    """Returns the int16 PCM of a 16 kHz mono 16-bit WAV file. Raises ValueError otherwise."""
+    with wave.open(path, "rb") as wf:
+        if (wf.getframerate(), wf.getnchannels(), wf.getsampwidth()) != (SAMPLE_RATE, 1, 2):
+            raise ValueError(
+                f"{path}: expected {SAMPLE_RATE} Hz mono 16-bit, got {wf.getframerate()} Hz, "
+                f"{wf.getnchannels()} channel(s), {8 * wf.getsampwidth()}-bit"
+            )
+        return wf.readframes(wf.getnframes())
+
+
+def write_synthetic_corpus(directory=DEFAULT_CORPUS_DIR, count=5):
+    """Writes count synthetic utterances (2-6 s of speech each) with their prompts."""
+    os.makedirs(directory, exist_ok=True)
+    for i in range(count):
+        name = f"synthetic_{i:02d}"
+        seconds = 2.0 + (i % 5)
+        write_wav(os.path.join(directory, f"{name}.wav"), synthesize_utterance(seconds, seed=i))
+        with open(os.path.join(directory, f"{name}.txt"), "w", encoding="utf-8") as f:
+            f.write(SYNTHETIC_PROMPTS[i % len(SYNTHETIC_PROMPTS)] + "\n")
+    return directory
+
+
+def load_corpus(directory=DEFAULT_CORPUS_DIR):
+    """Returns the corpus as Utterances sorted by name, creating a synthetic one if empty."""
+    if not os.path.isdir(directory) or not any(
+        name.endswith(".wav") for name in os.listdir(directory)
+    ):
+        print(f"No WAV files in {directory}; writing a synthetic corpus there.")
+        write_synthetic_corpus(directory)
+    utterances = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".wav"):
+            continue
+        base = os.path.join(directory, name[:-4])
+        transcript = ""
+        if os.path.exists(base + ".txt"):
+            with open(base + ".txt", encoding="utf-8") as f:
+                transcript = f.read().strip()
+        utterances.append(Utterance(name[:-4], read_wav(base + ".wav"), transcript))
+    return utterances
+
+
+class _CorpusStream:
+    """Input stream of CorpusAudioCapture: queued utterance audio, otherwise faint noise."""
+
+    def __init__(self, capture):
+        self.capture = capture
+        self._next_read = time.perf_counter()
+        self._rng = random.Random(0)
+
+    def read(self, frames, exception_on_overflow=False):
+        # Hand out audio no faster than a real device would (times speed)
+        self._next_read += frames / self.capture.rate / self.capture.speed
+        delay = self._next_read - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            self._next_read = time.perf_counter()
+        n_bytes = frames * self.capture.sample_width
+        with self.capture._pending_lock:
+            data = bytes(self.capture._pending[:n_bytes])
+            del self.capture._pending[:n_bytes]
+            if not self.capture._pending:
+                self.capture._played.set()
+        if len(data) < n_bytes:
+            silence = array.array(
+                "h", (int(self._rng.gauss(0, 30)) for _ in range((n_bytes - len(data)) // 2))
+            )
+            data += silence.tobytes()
+        return data
+
+    def stop_stream(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class CorpusAudioCapture(AudioCaptureService):
+    """
+    Microphone stand-in for the offline benchmarks. It offers one input device whose
+    stream delivers queued utterances, and faint noise in between, in real time or
+    speed times faster, through the same reader thread, pre-roll and capture offsets as
+    a real microphone.
+    """
+
+    def __init__(self, speed=1.0, **kwargs):
+        super().__init__(**kwargs)
+        self.speed = speed
+        self._pending = bytearray()
+        self._pending_lock = threading.Lock()
+        self._played = threading.Event()
+        self._played.set()
+
+    def list_input_devices(self):
+        return [{"name": "Benchmark corpus", "index": 0}]
+
+    def default_input_device(self):
+        return {"name": "Benchmark corpus", "index": 0}
+
+    def _open_stream(self, device_index):
+        return _CorpusStream(self)
+
+    def play_utterance(self, pcm):
+        """Queues pcm to be 'spoken' into the microphone. Returns its duration in seconds."""
+        with self._pending_lock:
+            self._pending.extend(pcm)
+            self._played.clear()
+        return len(pcm) / (self.rate * self.sample_width)
+
+    def wait_until_played(self, timeout=None):
+        """Blocks until every queued utterance has been read by the reader thread."""
+        return self._played.wait(timeout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--dir", default=DEFAULT_CORPUS_DIR)
+    parser.add_argument("--count", type=int, default=5)
+    args = parser.parse_args()
+    write_synthetic_corpus(args.dir, args.count)
+    for utterance in load_corpus(args.dir):
+        seconds = len(utterance.pcm) / (SAMPLE_RATE * 2)
+        print(f"  {utterance.name}: {seconds:5.2f} s  '{utterance.transcript}'")
+
+
+if __name__ == "__main__":
+    main()
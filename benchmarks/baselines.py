@@ -0,0 +1,104 @@
+"""
+Stored baselines and regression thresholds shared by stage_bench and e2e_bench.
+
+benchmarks/baselines.json maps metric names to the value recorded on a reference run,
+all "lower is better" (milliseconds, or a real-time factor). A metric regresses when it
+exceeds its baseline by more than the threshold ratio: the metric's own "threshold" if
+set, otherwise the file's, widened to SHORT_THRESHOLD for millisecond metrics under
+SHORT_METRIC_MS, whose timings are the noisiest. Baselines depend on the machine;
+stage_bench also stores "calibration_ms", the time of a fixed loop on the reference run,
+and scales its timings to that host, so the file stays usable elsewhere. Refresh it
+with --update-baselines after a deliberate change.
+"""
+
+import json
+import os
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+DEFAULT_THRESHOLD = 1.25  # 25% slower than the baseline fails
+SHORT_METRIC_MS = 100.0
+SHORT_THRESHOLD = 1.5  # Least ratio allowed for baselines under SHORT_METRIC_MS
+
+
+def add_baseline_arguments(parser):
+    parser.add_argument("--baselines", default=BASELINE_FILE, help="Baseline file.")
+    parser.add_argument(
+        "--update-baselines",
+        action="store_true",
+        help="Store this run's results as the new baselines instead of checking them.",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=None,
+        help=f"Allowed ratio over the baseline (file default, else {DEFAULT_THRESHOLD}).",
+    )
+
+
+def load_baselines(path=BASELINE_FILE):
+    if not os.path.exists(path):
+        return {"threshold": DEFAULT_THRESHOLD, "metrics": {}}
+    with open(path, encoding="utf-8") as f:
+        baselines = json.load(f)
+    baselines.setdefault("threshold", DEFAULT_THRESHOLD)
+    baselines.setdefault("metrics", {})
+    return baselines
+
+
+def save_baselines(results, path=BASELINE_FILE, threshold=None, calibration_ms=None):
+    """Merges results into the file, keeping other benchmarks' metrics and thresholds."""
+    baselines = load_baselines(path)
+    if threshold is not None:
+        baselines["threshold"] = threshold
+    if calibration_ms is not None:
+        baselines["calibration_ms"] = round(calibration_ms, 4)
+    for name, value in results.items():
+        entry = baselines["metrics"].setdefault(name, {})
+        entry["value"] = round(value, 4)
+    baselines["metrics"] = dict(sorted(baselines["metrics"].items()))
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(baselines, f, indent=4)
+        f.write("\n")
+
+
+def compare(results, baselines, threshold=None):
+    """Returns [(name, value, baseline, ratio, status)]; status is ok, REGRESSION or new."""
+    default_threshold = threshold or baselines["threshold"]
+    rows = []
+    for name, value in results.items():
+        entry = baselines["metrics"].get(name)
+        if not entry or not entry.get("value"):
+            rows.append((name, value, None, None, "new"))
+            continue
+        ratio = value / entry["value"]
+        limit = threshold or entry.get("threshold")
+        if not limit:
+            limit = default_threshold
+            if name.endswith("_ms") and entry["value"] < SHORT_METRIC_MS:
+                limit = max(limit, SHORT_THRESHOLD)
+        rows.append((name, value, entry["value"], ratio, "REGRESSION" if ratio > limit else "ok"))
+    return rows
+
+
+def check_results(results, args, calibration_ms=None):
+    """
+    Prints results next to their baselines, or stores them with --update-baselines,
+    along with calibration_ms when given. Returns the process exit code: 1 if any metric
+    regressed, else 0.
+    """
+    if args.update_baselines:
+        save_baselines(results, args.baselines, args.threshold, calibration_ms)
+        print(f"Stored {len(results)} baseline(s) in {args.baselines}.")
+        return 0
+    rows = compare(results, load_baselines(args.baselines), args.threshold)
+    width = max((len(name) for name in results), default=0)
+    print(f"{'metric':<{width}}  {'value':>10}  {'baseline':>10}  ratio")
+    for name, value, baseline, ratio, status in rows:
+        baseline_text = f"{baseline:10.3f}" if baseline is not None else f"{'-':>10}"
+        ratio_text = f"{ratio:5.2f}" if ratio is not None else "  -  "
+        print(f"{name:<{width}}  {value:10.3f}  {baseline_text}  {ratio_text}  {status}")
+    regressions = [row[0] for row in rows if row[4] == "REGRESSION"]
+    if regressions:
+        print(f"Regressed: {', '.join(regressions)}")
+        return 1
+    return 0
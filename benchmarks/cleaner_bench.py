@@ -0,0 +1,158 @@
+"""
+Compares the speech path of a streamed answer before and after the single-scan
+SpeechFilter: the old path ran FenceTokenizer and SpeechFilter.feed_events over each
+chunk and remove_special_characters over each sentence; the new one scans each chunk
+once in SpeechFilter.feed and cleans the stream with StreamingTextCleaner. Also reports
+how much <think> content leaks into speech when a reasoning block spans several
+sentences, which the per-sentence function cannot catch. Each stage is timed on its
+own as well, so a win in one does not hide a loss in another.
+
+    python -m benchmarks.cleaner_bench [--chunk-size 4] [--repeat 15]
+"""
+
+import argparse
+import time
+
+from text_stream import (
+    FenceTokenizer,
+    SentenceSegmenter,
+    SpeechFilter,
+    StreamingTextCleaner,
+    remove_special_characters,
+)
+
+ANSWER = (
+    "<think>\nThe user wants a summary. First I should recall the facts. "
+    "Then I will keep it short!\n</think>\n\n"
+    "**Sure!** Here's the *short* version: the meeting moved to 3.30 pm (room #4). "
+    "Bring your notes & the draft; we'll review section 2.1 -> 2.4 together.\n\n"
+    "- Agenda: budget, hiring, roadmap\n- Owner: @sam\n\n"
+)
+# Gives the filter stage something to drop
+CODE_AND_LINK = (
+    "The script is below, see https://example.com/docs for details.\n\n"
+    "```python\nfor item in agenda:\n    print(item)\n```\n\n"
+)
+THINK_MARKER = "recall the facts"
+
+
+def chunked(text, chunk_size):
+    return [text[i : i + chunk_size] for i in range(0, len(text), chunk_size)]
+
+
+def run_per_sentence(chunks):
+    """Old cleaning: split into sentences first, then clean each sentence separately."""
+    segmenter = SentenceSegmenter()
+    spoken = []
+    for chunk in chunks:
+        spoken.extend(remove_special_characters(s) for s in segmenter.feed(chunk))
+    spoken.extend(remove_special_characters(s) for s in segmenter.flush())
+    return " ".join(spoken)
+
+
+def run_streaming_cleaner(chunks):
+    """New cleaning: clean the stream once, then split into sentences."""
+    cleaner = StreamingTextCleaner()
+    segmenter = SentenceSegmenter()
+    spoken = []
+    for chunk in chunks:
+        spoken.extend(segmenter.feed(cleaner.feed(chunk)))
+    spoken.extend(segmenter.feed(cleaner.flush()))
+    spoken.extend(segmenter.flush())
+    return " ".join(spoken)
+
+
+def speech_path_two_pass(chunks):
+    """Old path: tokenizer, filter, sentence split, then per-sentence cleaning."""
+    fences = FenceTokenizer()
+    speech_filter = SpeechFilter()
+    segmenter = SentenceSegmenter()
+    spoken = []
+    for chunk in chunks:
+        speakable = speech_filter.feed_events(fences.feed(chunk))
+        spoken.extend(remove_special_characters(s) for s in segmenter.feed(speakable))
+    speakable = speech_filter.feed_events(fences.flush()) + speech_filter.flush()
+    spoken.extend(remove_special_characters(s) for s in segmenter.feed(speakable))
+    spoken.extend(remove_special_characters(s) for s in segmenter.flush())
+    return " ".join(spoken)
+
+
+def speech_path_single_pass(chunks):
+    """The engine's path: one filter scan per chunk, stream cleaning, sentence split."""
+    speech_filter = SpeechFilter()
+    cleaner = StreamingTextCleaner()
+    segmenter = SentenceSegmenter()
+    spoken = []
+    for chunk in chunks:
+        speakable = speech_filter.feed(chunk)
+        speech_filter.take_fence_events()  # The code viewer's share of the scan
+        spoken.extend(segmenter.feed(cleaner.feed(speakable)))
+    speakable = speech_filter.flush()
+    speech_filter.take_fence_events()
+    spoken.extend(segmenter.feed(cleaner.feed(speakable) + cleaner.flush()))
+    spoken.extend(segmenter.flush())
+    return " ".join(spoken)
+
+
+def filtering_two_pass(chunks):
+    fences = FenceTokenizer()
+    speech_filter = SpeechFilter()
+    for chunk in chunks:
+        speech_filter.feed_events(fences.feed(chunk))
+    speech_filter.feed_events(fences.flush())
+    speech_filter.flush()
+
+
+def filtering_single_pass(chunks):
+    speech_filter = SpeechFilter()
+    for chunk in chunks:
+        speech_filter.feed(chunk)
+        speech_filter.take_fence_events()
+    speech_filter.flush()
+
+
+def best_times(runs, repeat):
+    """Best time of each (fn, arg) in runs; rounds interleave them so load hits all alike."""
+    best = [float("inf")] * len(runs)
+    for _ in range(repeat):
+        for index, (fn, arg) in enumerate(runs):
+            start = time.perf_counter()
+            fn(arg)
+            best[index] = min(best[index], time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--chunk-size", type=int, default=4)
+    parser.add_argument("--copies", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=15)
+    args = parser.parse_args()
+
+    text = (ANSWER + CODE_AND_LINK) * args.copies
+    chunks = chunked(text, args.chunk_size)
+
+    old_speech = speech_path_two_pass(chunks)
+    new_speech = speech_path_single_pass(chunks)
+    print(f"Input: {len(text)} chars, {len(chunks)} chunks")
+    print(
+        f"<think> leaks: per-sentence {old_speech.count(THINK_MARKER)}, "
+        f"streaming {new_speech.count(THINK_MARKER)} (of {args.copies} blocks)"
+    )
+    print(f"Characters sent to TTS: per-sentence {len(old_speech)}, streaming {len(new_speech)}")
+
+    rows = (
+        ("whole path, old", speech_path_two_pass),
+        ("whole path, new", speech_path_single_pass),
+        ("filter, tokenizer + filter", filtering_two_pass),
+        ("filter, single scan", filtering_single_pass),
+        ("cleaning, per-sentence", run_per_sentence),
+        ("cleaning, streaming", run_streaming_cleaner),
+    )
+    seconds = best_times([(fn, chunks) for _, fn in rows], args.repeat)
+    for (label, _), best in zip(rows, seconds):
+        print(f"{label:28} {len(text) / best / 1e6:6.2f} M chars/s")
+
+
+if __name__ == "__main__":
+    main()
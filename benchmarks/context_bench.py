@@ -0,0 +1,88 @@
+"""
+Compares history selection over a long conversation: the old per-turn backward walk
+(with its 2000-character budget, and with a budget as large as the token window)
+against ContextWindow, which keeps running token counts and only advances its start
+index. Reports the best time of --repeat runs and how much history each one sends per
+turn. The legacy walk never summarizes; ContextWindow's own cost is shown with and
+without the summary of dropped messages, which is most of it at small budgets.
+
+    python -m benchmarks.context_bench [--turns 2000] [--num-ctx 4096] [--repeat 5]
+"""
+
+import argparse
+import time
+
+from context_window import ContextWindow
+
+MAX_HISTORY_CHARS = 2000  # The old character budget
+
+
+def make_turns(turns):
+    for i in range(turns):
+        yield "user", f"Question {i}: how does part {i} of the pipeline work? " * 2
+        yield "assistant", f"Part {i} reads the input, transforms it and writes it out. " * 8
+
+
+def legacy_select(history, max_chars=MAX_HISTORY_CHARS):
+    """The backward walk _send used before ContextWindow, run once per user turn."""
+    selected = [history[-1]]
+    char_count = len(history[-1]["content"])
+    for i in range(len(history) - 2, -1, -1):
+        msg_len = len(history[i]["content"])
+        if char_count + msg_len + 50 < max_chars:
+            selected.append(history[i])
+            char_count += msg_len
+        else:
+            break
+    return list(reversed(selected))
+
+
+def run_legacy(messages, max_chars=MAX_HISTORY_CHARS):
+    history = []
+    selections = []
+    for role, content in messages:
+        history.append({"role": role, "content": content})
+        if role == "user":
+            selections.append(legacy_select(history, max_chars))
+    return selections
+
+
+def run_window(messages, num_ctx, summarize=True):
+    window = ContextWindow(context_tokens=num_ctx, summarize=summarize)
+    selections = []
+    for role, content in messages:
+        window.append(role, content)
+        if role == "user":
+            selections.append(window.select())
+    return selections
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--turns", type=int, default=2000)
+    parser.add_argument("--num-ctx", type=int, default=4096)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    messages = list(make_turns(args.turns))
+    budget_chars = int(ContextWindow(context_tokens=args.num_ctx).budget * 4)
+    for name, func in (
+        ("legacy walk", run_legacy),
+        ("legacy, same budget", lambda m: run_legacy(m, budget_chars)),
+        ("ContextWindow", lambda m: run_window(m, args.num_ctx)),
+        ("without summary", lambda m: run_window(m, args.num_ctx, summarize=False)),
+    ):
+        elapsed = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            selections = func(messages)
+            elapsed = min(elapsed, time.perf_counter() - start)
+        sent_chars = sum(len(m["content"]) for s in selections for m in s)
+        print(
+            f"{name:>19}: {elapsed * 1000:8.2f} ms for {args.turns} turns, "
+            f"{sent_chars / args.turns:8.0f} history chars sent per turn"
+        )
+
+
+if __name__ == "__main__":
+    main()
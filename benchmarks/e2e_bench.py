@@ -0,0 +1,303 @@
+"""
+End-to-end benchmark of whole turns with no Ollama, microphone or speakers: the real
+SpeechChatEngine talks to the fake Ollama server, hears the audio corpus through the
+corpus microphone and speaks into a null (or WAV capture) sink with silent synthesis.
+Reports p50/p95 of every turn stage and the gaps between spoken sentences, and checks
+the p50s against benchmarks/baselines.json.
+
+    python -m benchmarks.e2e_bench [--turns 5] [--input voice|text] [--ttft 0.2]
+                                   [--tokens-per-second 50] [--capture-wav out.wav]
+
+--input voice (the default when an ASR backend is installed) holds the hotkey for each
+utterance, so ASR is part of the turn. When the ASR cannot make words of the audio, as
+with the synthetic corpus, the utterance's transcript is sent instead so the rest of the
+turn is still measured. --input text sends the transcripts as typed queries. Needs the
+ollama client library and httpx, and exits with 1 naming them when they are missing;
+baselines only compare runs with the same options.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.audio_corpus import DEFAULT_CORPUS_DIR, CorpusAudioCapture, load_corpus
+from benchmarks.baselines import add_baseline_arguments, check_results
+from benchmarks.fake_ollama import DEFAULT_MODEL, FakeOllamaServer
+from benchmarks.null_tts import NullSpeechSink, SilentSynthesizer, WavCaptureSink
+from speech_engine import (
+    AUDIO_SAMPLE_RATE,
+    DEFAULT_SETTINGS,
+    WHISPER_AVAILABLE,
+    SpeechChatEngine,
+    module_available,
+)
+from turn_metrics import format_summary
+
+# The engine reaches the fake server through the real ollama client, which uses httpx
+CLIENT_LIBRARIES = ("ollama", "httpx")
+
+# The spans worth guarding against regressions; ASR and capture spans join in voice mode
+CHECKED_SPANS = (
+    "release_to_closed",
+    "asr",
+    "first_token",
+    "first_sentence",
+    "first_audio",
+    "release_to_audio",
+)
+
+
+class OfflineSpeechChatEngine(SpeechChatEngine):
+    """SpeechChatEngine with the benchmark stand-ins in place of the devices."""
+
+    def __init__(self, speed=1.0, capture_wav=None, **kwargs):
+        self.speed = speed
+        self.capture_wav = capture_wav
+        self.synthesizers = []  # One per TTS thread that asked for an engine
+        super().__init__(**kwargs)
+
+    def create_audio_capture(self):
+        return CorpusAudioCapture(
+            speed=self.speed,
+            rate=AUDIO_SAMPLE_RATE,
+            on_error=self._on_audio_capture_error,
+            preroll_seconds=float(self.settings.get("preroll_seconds", 1.0)),
+        )
+
+    def create_tts_engine(self):
+        synthesizer = SilentSynthesizer()
+        self.synthesizers.append(synthesizer)
+        return synthesizer
+
+    def create_tts_player(self):
+        block_frames = int(self.settings.get("tts_block_frames", 512))
+        if self.capture_wav:
+            return WavCaptureSink(self.capture_wav, block_frames=block_frames, speed=self.speed)
+        return NullSpeechSink(block_frames=block_frames, speed=self.speed)
+
+
+class TurnWatcher:
+    """Engine event handler that lets the benchmark wait for each step of a turn."""
+
+    def __init__(self):
+        self.ready = threading.Event()
+        self.query = threading.Event()
+        self.response_done = threading.Event()
+        self.understood = False
+        self.errors = []
+
+    def on_event(self, kind, *args):
+        if kind == "ready":
+            self.ready.set()
+        elif kind == "query":
+            self.understood = True
+            self.query.set()
+        elif kind == "query_note":
+            self.understood = False
+            self.query.set()
+        elif kind == "response_done":
+            self.response_done.set()
+        elif kind == "error":
+            self.errors.append(f"{args[0]}: {args[1]}")
+            print(f"[error] {args[0]}: {args[1]}")
+
+    def new_turn(self):
+        self.query.clear()
+        self.response_done.clear()
+        self.understood = False
+
+
+def wait_for_speech_to_finish(engine, timeout, settle=0.3):
+    """
+    Waits until the TTS queues have been empty and every synthesizer and the sink idle
+    for settle seconds, which is when the last sentence of the answer has been played.
+    """
+    deadline = time.perf_counter() + timeout
+    idle_since = None
+    while time.perf_counter() < deadline:
+        idle = (
+            engine.tts_text_queue.empty()
+            and engine.tts_synthesis_queue.empty()
+            and engine.tts_audio_queue.empty()
+            and not any(synthesizer.busy for synthesizer in engine.synthesizers)
+            and not (engine.tts_player and engine.tts_player.playing)
+        )
+        if idle:
+            idle_since = idle_since or time.perf_counter()
+            if time.perf_counter() - idle_since >= settle:
+                return True
+        else:
+            idle_since = None
+        time.sleep(0.05)
+    return False
+
+
+def run_turn(engine, watcher, utterance, voice, timeout):
+    watcher.new_turn()
+    if voice:
+        engine.begin_voice_turn()
+        engine.start_recording()
+        engine.audio_capture.play_utterance(utterance.pcm)
+        engine.audio_capture.wait_until_played(timeout)
+        engine.mark_hotkey_release()
+        engine.stop_recording()
+        if not watcher.query.wait(timeout):
+            print(f"  {utterance.name}: no transcription within {timeout:.0f} s")
+            return False
+        if not watcher.understood:
+            if not utterance.transcript:
+                print(f"  {utterance.name}: not understood and no transcript, skipped")
+                return False
+            engine.submit_query(utterance.transcript)
+    else:
+        engine.submit_query(utterance.transcript)
+    if not watcher.response_done.wait(timeout):
+        print(f"  {utterance.name}: no answer within {timeout:.0f} s")
+        return False
+    return wait_for_speech_to_finish(engine, timeout)
+
+
+def write_config(directory, server_url, overrides):
+    """Writes a settings file for an offline run into directory and returns its path."""
+    settings = DEFAULT_SETTINGS.copy()
+    settings.update(
+        {
+            "ollama_host": server_url,
+            "ollama_model": DEFAULT_MODEL,
+            "selected_mic_index": 0,
+            # Every turn should do the full work, not hit a cache
+            "response_cache_enabled": False,
+            "tts_cache_enabled": False,
+            "archive_recordings": False,
+            "session_recording": False,
+            "metrics_export_dir": os.path.join(directory, "metrics"),
+        }
+    )
+    settings.update(overrides)
+    path = os.path.join(directory, "config.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(settings, f, indent=4)
+    return path
+
+
+def report_missing_client_libraries(program):
+    """Prints which client libraries are missing, if any; True means program cannot run."""
+    missing = [name for name in CLIENT_LIBRARIES if not module_available(name)]
+    if missing:
+        print(
+            f"{program}: the engine needs the optional {' and '.join(missing)} package(s), "
+            f"which are not installed. Install with: pip install {' '.join(missing)}",
+            file=sys.stderr,
+        )
+    return bool(missing)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--input", choices=("voice", "text"), default=None)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS_DIR)
+    parser.add_argument("--ttft", type=float, default=0.2)
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--speed", type=float, default=1.0, help="Audio time compression.")
+    parser.add_argument("--tts-mode", choices=("buffered", "direct"), default="buffered")
+    parser.add_argument("--asr-model", default="tiny")
+    parser.add_argument("--asr-backend", default="whisper")
+    parser.add_argument("--capture-wav", help="Write what would have been played here.")
+    parser.add_argument("--export-dir", help="Also export the turn metrics here.")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    add_baseline_arguments(parser)
+    args = parser.parse_args()
+    if report_missing_client_libraries("e2e_bench"):
+        return 1
+
+    voice = (args.input or ("voice" if WHISPER_AVAILABLE else "text")) == "voice"
+    if voice and not WHISPER_AVAILABLE:
+        parser.error("--input voice needs an ASR backend and NumPy")
+    utterances = load_corpus(args.corpus)
+    if not voice:
+        utterances = [u for u in utterances if u.transcript]
+    if not utterances:
+        parser.error(f"no usable utterances in {args.corpus}")
+
+    with tempfile.TemporaryDirectory() as directory, FakeOllamaServer(
+        ttft=args.ttft, tokens_per_second=args.tokens_per_second
+    ) as server:
+        watcher = TurnWatcher()
+        engine = OfflineSpeechChatEngine(
+            speed=args.speed,
+            capture_wav=args.capture_wav,
+            on_event=watcher.on_event,
+            config_file=write_config(
+                directory,
+                server.url,
+                {
+                    "whisper_model_name": args.asr_model,
+                    "asr_backend": args.asr_backend,
+                    "tts_mode": args.tts_mode,
+                    "metrics_export_dir": args.export_dir
+                    or os.path.join(directory, "metrics"),
+                },
+            ),
+        )
+        engine.start()
+        try:
+            if not watcher.ready.wait(args.timeout):
+                print("The engine did not become ready in time.")
+                return 1
+            while voice and not engine.audio_capture.is_open():
+                time.sleep(0.05)
+            print(
+                f"End-to-end: {args.turns} {'voice' if voice else 'text'} turn(s), fake Ollama "
+                f"TTFT {args.ttft:.2f} s at {args.tokens_per_second:.0f} tokens/s, "
+                f"{args.tts_mode} TTS, audio speed x{args.speed:g}."
+            )
+            started = time.perf_counter()
+            completed = 0
+            turn_starts = []
+            for i in range(args.turns):
+                utterance = utterances[i % len(utterances)]
+                turn_starts.append(time.perf_counter())
+                if run_turn(engine, watcher, utterance, voice, args.timeout):
+                    completed += 1
+            engine.turn_metrics.finish_turn()
+            wall_seconds = time.perf_counter() - started
+            if args.export_dir:
+                engine.export_turn_metrics()
+        finally:
+            engine.close()
+
+    print(f"{completed}/{args.turns} turn(s) completed in {wall_seconds:.1f} s.")
+    summary = engine.turn_metrics.summary()
+    print(format_summary(summary))
+    # Silences inside an answer are where speech stalled waiting for the next sentence
+    gaps = []
+    if engine.tts_player:
+        for start, end in zip(turn_starts, turn_starts[1:] + [float("inf")]):
+            gaps.extend(engine.tts_player.gaps(start, end))
+    if gaps:
+        print(
+            f"Gaps between sentences of one answer: max {max(gaps) * 1000:.0f} ms, "
+            f"mean {sum(gaps) / len(gaps) * 1000:.0f} ms over {len(gaps)}."
+        )
+    if not completed:
+        return 1
+    results = {
+        f"e2e_{name}_p50_ms": p50 * 1000
+        for name, (_, p50, _) in summary.items()
+        if name in CHECKED_SPANS
+    }
+    if gaps:
+        results["e2e_tts_gap_max_ms"] = max(gaps) * 1000
+    return check_results(results, args)
+
+
+if __name__ == "__main__":
+    import multiprocessing
+
+    multiprocessing.freeze_support()  # The ASR worker runs in a child process
+    raise SystemExit(main())
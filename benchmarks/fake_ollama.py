@@ -0,0 +1,301 @@
+"""
+A local stand-in for the Ollama server: /api/tags, /api/show and streaming /api/chat,
+answering at a configurable time to first token and tokens per second. Uses only the
+standard library, so the pipeline can be measured without Ollama or a GPU.
+
+    python -m benchmarks.fake_ollama [--port 11435] [--ttft 0.3] [--tokens-per-second 40]
+
+Point the app at it with "ollama_host": "http://127.0.0.1:11435" in the settings.
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_MODEL = "fake-llm:latest"
+# Prose, a list, a code block and a table, so segmenting, speech filtering and the code
+# viewer all get work
+DEFAULT_ANSWER = (
+    "Sure! Here is a short overview. The pipeline has three stages: speech recognition, "
+    "the language model and speech synthesis. Each stage streams into the next, so the "
+    "first sentence can be spoken while the rest is still being generated.\n\n"
+    "Steps to try it:\n1. Hold the hotkey and ask a question.\n2. Release it and wait "
+    "for the answer.\n\n"
+    "```python\ndef greet(name):\n    return f\"Hello, {name}!\"\n```\n\n"
+    "| Stage | Typical latency |\n|---|---|\n| ASR | 300 ms |\n| First token | 200 ms |\n\n"
+    "Is there anything else you would like to know?"
+)
+_TOKEN = re.compile(r"\s*\S{1,6}|\s+")  # Word pieces of up to six characters, like BPE
+
+
+def tokenize(text):
+    """Splits text into small pieces that concatenate back to text exactly."""
+    return _TOKEN.findall(text)
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+class FakeOllamaServer:
+    """
+    Serves the Ollama HTTP API on a background thread. Every chat answers with answer
+    (or answer_for(messages) when given), streamed as tokenize() pieces: the first piece
+    after ttft seconds, the rest at tokens_per_second. answer_for may instead return a
+    script of (seconds after the request, piece) pairs, which is streamed on that
+    schedule divided by speed. The first request for each model also waits load_seconds,
+    which is reported as load_duration like a cold model load. port=0 picks a free port;
+    see url.
+    """
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=0,
+        models=(DEFAULT_MODEL,),
+        answer=DEFAULT_ANSWER,
+        answer_for=None,
+        ttft=0.2,
+        tokens_per_second=50.0,
+        load_seconds=0.0,
+        context_length=8192,
+        speed=1.0,
+    ):
+        self.models = list(models)
+        self.answer = answer
+        self.answer_for = answer_for
+        self.ttft = ttft
+        self.tokens_per_second = tokens_per_second
+        self.load_seconds = load_seconds
+        self.context_length = context_length
+        self.speed = speed
+        self.loaded_models = set()
+        self.chat_requests = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), _FakeOllamaHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.fake = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, name="FakeOllama", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _load(self, model):
+        """Returns the simulated load time in seconds, sleeping it on first use of model."""
+        with self._lock:
+            cold = model not in self.loaded_models
+            self.loaded_models.add(model)
+        if cold and self.load_seconds:
+            time.sleep(self.load_seconds)
+            return self.load_seconds
+        return 0.0
+
+    def _schedule(self, messages):
+        """Returns [(seconds after the request, piece)] for the answer to messages."""
+        answer = self.answer_for(messages) if self.answer_for is not None else self.answer
+        if isinstance(answer, str):
+            return [
+                (self.ttft + i / self.tokens_per_second, token)
+                for i, token in enumerate(tokenize(answer))
+            ]
+        return [(offset / self.speed, piece) for offset, piece in answer]
+
+
+class _FakeOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like Ollama; the app reuses connections
+
+    def log_message(self, format, *args):
+        pass  # One line per request would swamp the benchmark output
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}") if length else {}
+
+    def _send_json(self, obj, status=200):
+        body = json.dumps(obj).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, obj):
+        data = json.dumps(obj).encode("utf-8") + b"\n"
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        fake = self.server.fake
+        if self.path == "/api/tags":
+            self._send_json(
+                {
+                    "models": [
+                        {
+                            "name": name,
+                            "model": name,
+                            "modified_at": _now(),
+                            "size": 0,
+                            "digest": "0" * 64,
+                            "details": {"format": "gguf", "family": "fake"},
+                        }
+                        for name in fake.models
+                    ]
+                }
+            )
+        elif self.path in ("/", "/api/version"):
+            self._send_json({"version": "0.0.0-fake"})
+        else:
+            self._send_json({"error": f"unknown path {self.path}"}, status=404)
+
+    def do_POST(self):
+        fake = self.server.fake
+        request = self._read_json()
+        model = request.get("model") or request.get("name")
+        if self.path != "/api/tags" and model not in fake.models:
+            self._send_json({"error": f"model '{model}' not found"}, status=404)
+        elif self.path == "/api/show":
+            self._send_json(
+                {
+                    "modelfile": "",
+                    "parameters": "",
+                    "template": "{{ .Prompt }}",
+                    "details": {"format": "gguf", "family": "fake"},
+                    "model_info": {
+                        "general.architecture": "fake",
+                        "fake.context_length": fake.context_length,
+                    },
+                }
+            )
+        elif self.path == "/api/chat":
+            self._chat(fake, model, request)
+        else:
+            self._send_json({"error": f"unknown path {self.path}"}, status=404)
+
+    def _chat(self, fake, model, request):
+        started = time.perf_counter()
+        load_seconds = fake._load(model)
+        messages = request.get("messages") or []
+        if not messages:
+            # An empty chat only loads the model, which is how the app preloads it
+            self._send_json(
+                {
+                    "model": model,
+                    "created_at": _now(),
+                    "message": {"role": "assistant", "content": ""},
+                    "done_reason": "load",
+                    "done": True,
+                }
+            )
+            return
+        with fake._lock:
+            fake.chat_requests += 1
+        schedule = fake._schedule(messages)
+        prompt_chars = sum(len(m.get("content", "")) for m in messages)
+        final = {
+            "model": model,
+            "created_at": _now(),
+            "message": {"role": "assistant", "content": ""},
+            "done": True,
+            "done_reason": "stop",
+            "load_duration": int(load_seconds * 1e9),
+            "prompt_eval_count": max(1, prompt_chars // 4),
+            "eval_count": len(schedule),
+        }
+        if request.get("stream", True) is False:
+            time.sleep(schedule[-1][0] if schedule else fake.ttft)
+            final["message"]["content"] = "".join(piece for _, piece in schedule)
+            final["total_duration"] = int((time.perf_counter() - started) * 1e9)
+            self._send_json(final)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        # Tokens are scheduled against the clock, so slow writes do not add up to drift
+        try:
+            for offset, token in schedule:
+                delay = started + load_seconds + offset - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                self._write_chunk(
+                    {
+                        "model": model,
+                        "created_at": _now(),
+                        "message": {"role": "assistant", "content": token},
+                        "done": False,
+                    }
+                )
+            final["total_duration"] = int((time.perf_counter() - started) * 1e9)
+            self._write_chunk(final)
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client cancelled the stream, as the app does on barge-in
+            self.close_connection = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--model", action="append", help="Model name (repeatable).")
+    parser.add_argument("--ttft", type=float, default=0.2, help="Seconds to first token.")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--load-seconds", type=float, default=0.0)
+    parser.add_argument("--answer-file", help="Text file with the answer to stream.")
+    args = parser.parse_args()
+
+    answer = DEFAULT_ANSWER
+    if args.answer_file:
+        with open(args.answer_file, encoding="utf-8") as f:
+            answer = f.read()
+    server = FakeOllamaServer(
+        host=args.host,
+        port=args.port,
+        models=args.model or [DEFAULT_MODEL],
+        answer=answer,
+        ttft=args.ttft,
+        tokens_per_second=args.tokens_per_second,
+        load_seconds=args.load_seconds,
+    )
+    print(
+        f"Fake Ollama on {server.url}: {len(tokenize(answer))} tokens per answer, "
+        f"TTFT {args.ttft:.2f} s, {args.tokens_per_second:.0f} tokens/s. Ctrl+C stops it."
+    )
+    server.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Compares the cost of finding code fences in a streamed answer with the old approach,
+which re-split the whole open code block on every chunk, against FenceTokenizer, which
+only looks at the new chunk. The gap grows with the length of the code block.
+
+    python -m benchmarks.fence_bench [--chunk-size 4] [--code-lines 400]
+"""
+
+import argparse
+import re
+import time
+
+from text_stream import FenceTokenizer
+
+_LEGACY_LANG_LINE = re.compile(r"^\s*[a-zA-Z0-9]+\s*\n")
+
+
+def make_answer(code_lines):
+    code = "".join(f"    value_{i} = compute({i}, scale=2)\n" for i in range(code_lines))
+    return f"Here is the script:\n\n```python\ndef main():\n{code}```\n\nThat is all.\n"
+
+
+def legacy_split(chunks):
+    """
+    The approach the chat loop used before FenceTokenizer: prepend the open code block
+    to each chunk and split("```") the result again. The original also appended the
+    re-split block to itself, doubling it on every chunk; that is corrected here so the
+    comparison finishes, leaving the quadratic re-scan.
+    """
+    blocks = []
+    current_code_block = ""
+    in_code_block = False
+    for content_chunk in chunks:
+        parts = (current_code_block + content_chunk).split("```")
+        for i, part in enumerate(parts):
+            if i > 0:
+                if in_code_block:
+                    blocks.append(_LEGACY_LANG_LINE.sub("", current_code_block, count=1))
+                in_code_block = not in_code_block
+                current_code_block = ""
+            if in_code_block:
+                current_code_block = part
+    return blocks
+
+
+def tokenizer_blocks(chunks):
+    tokenizer = FenceTokenizer()
+    blocks = []
+    parts = []
+    for chunk in chunks:
+        for kind, value in tokenizer.feed(chunk):
+            if kind == "code_start":
+                parts = []
+            elif kind == "code_delta":
+                parts.append(value)
+            elif kind == "code_end":
+                blocks.append("".join(parts))
+    for kind, value in tokenizer.flush():
+        if kind == "code_delta":
+            parts.append(value)
+        elif kind == "code_end":
+            blocks.append("".join(parts))
+    return blocks
+
+
+def best_time(func, chunks, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(chunks)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--chunk-size", type=int, default=4)
+    parser.add_argument("--code-lines", type=int, default=400)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    text = make_answer(args.code_lines)
+    chunks = [text[i : i + args.chunk_size] for i in range(0, len(text), args.chunk_size)]
+    print(f"Answer: {len(text)} chars in {len(chunks)} chunks")
+    print(f"Code blocks found: legacy {len(legacy_split(chunks))}, tokenizer {len(tokenizer_blocks(chunks))}")
+    for name, func in (("legacy split", legacy_split), ("FenceTokenizer", tokenizer_blocks)):
+        elapsed = best_time(func, chunks, args.repeat)
+        print(f"{name:>15}: {elapsed * 1000:8.2f} ms ({len(text) / elapsed / 1e6:.2f} M chars/s)")
+
+
+if __name__ == "__main__":
+    main()
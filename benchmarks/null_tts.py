@@ -0,0 +1,179 @@
+"""
+Speaker and synthesizer stand-ins for the offline benchmarks.
+
+NullSpeechSink takes the place of PCMPlayer: it plays nothing but takes as long as the
+audio would (or speed times less), and logs when each sentence started and ended, so
+gaps between sentences show up as they would through speakers. WavCaptureSink also
+writes what was played, gaps included as silence, to a WAV file. SilentSynthesizer
+replaces the pyttsx3 engine with silence of about the length speech would have.
+"""
+
+import os
+import threading
+import time
+import wave
+
+
+class SilentSynthesizer:
+    """
+    The part of the pyttsx3 engine API the app uses. save_to_file() + runAndWait() write
+    a WAV of silence as long as the text would take to say at the configured rate (words
+    per minute), after render_seconds_per_char of simulated synthesis work; say() +
+    runAndWait() just wait that long.
+    """
+
+    def __init__(self, sample_rate=22050, render_seconds_per_char=0.0005):
+        self.sample_rate = sample_rate
+        self.render_seconds_per_char = render_seconds_per_char
+        self.properties = {"rate": 180, "volume": 1.0, "voice": None}
+        self.busy = False
+        self._pending = []
+
+    def setProperty(self, name, value):
+        self.properties[name] = value
+
+    def getProperty(self, name):
+        return self.properties.get(name)
+
+    def speech_seconds(self, text):
+        words = max(1, len(text.split()))
+        return words * 60.0 / max(1, self.properties["rate"])
+
+    def save_to_file(self, text, path):
+        self._pending.append((text, path))
+
+    def say(self, text):
+        self._pending.append((text, None))
+
+    def runAndWait(self):
+        pending, self._pending = self._pending, []
+        self.busy = True
+        try:
+            for text, path in pending:
+                if path is None:
+                    time.sleep(self.speech_seconds(text))
+                    continue
+                time.sleep(len(text) * self.render_seconds_per_char)
+                frames = int(self.speech_seconds(text) * self.sample_rate)
+                with wave.open(path, "wb") as wf:
+                    wf.setnchannels(1)
+                    wf.setsampwidth(2)
+                    wf.setframerate(self.sample_rate)
+                    wf.writeframes(bytes(2 * frames))
+        finally:
+            self.busy = False
+
+    def isBusy(self):
+        return self.busy
+
+    def stop(self):
+        self._pending = []
+
+
+class NullSpeechSink:
+    """
+    PCMPlayer replacement that discards the audio. play() still takes the sentence's
+    duration divided by speed, in blocks of block_frames so a stop is honoured as
+    quickly as with the real player. played holds (started, ended, text, completed) per
+    sentence, in perf_counter() seconds; playing is True while play() runs.
+    """
+
+    def __init__(self, block_frames=512, speed=1.0):
+        self.block_frames = block_frames
+        self.speed = speed
+        self.played = []
+        self.playing = False
+        self._lock = threading.Lock()
+
+    def play(self, speech, should_stop):
+        self.playing = True
+        try:
+            return self._play(speech, should_stop)
+        finally:
+            self.playing = False
+
+    def _play(self, speech, should_stop):
+        frame_bytes = speech.channels * speech.sample_width
+        block_bytes = self.block_frames * frame_bytes
+        block_seconds = self.block_frames / speech.sample_rate / self.speed
+        started = time.perf_counter()
+        completed = True
+        for offset in range(0, len(speech.pcm), block_bytes):
+            if should_stop():
+                completed = False
+                break
+            self._write(speech, speech.pcm[offset : offset + block_bytes])
+            # Block until the block would have been played, like a full output buffer
+            played_frames = (offset + block_bytes) // frame_bytes
+            deadline = started + played_frames / speech.sample_rate / self.speed
+            delay = deadline - time.perf_counter()
+            if delay > 0:
+                time.sleep(min(delay, block_seconds))
+        with self._lock:
+            self.played.append((started, time.perf_counter(), speech.text, completed))
+        return completed
+
+    def _write(self, speech, pcm):
+        pass
+
+    def gaps(self, started_after=0.0, started_before=float("inf")):
+        """Silences between consecutive sentences started in the given window, in seconds."""
+        with self._lock:
+            played = [
+                entry
+                for entry in self.played
+                if started_after <= entry[0] < started_before
+            ]
+        return [
+            max(0.0, later[0] - earlier[1]) for earlier, later in zip(played, played[1:])
+        ]
+
+    def close(self):
+        pass
+
+
+class WavCaptureSink(NullSpeechSink):
+    """NullSpeechSink that also writes everything played to path, gaps as silence."""
+
+    def __init__(self, path, block_frames=512, speed=1.0):
+        super().__init__(block_frames=block_frames, speed=speed)
+        self.path = path
+        self._wav = None
+        self._format = None
+        self._last_end = None
+
+    def play(self, speech, should_stop):
+        if self._wav is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._wav = wave.open(self.path, "wb")
+            self._wav.setnchannels(speech.channels)
+            self._wav.setsampwidth(speech.sample_width)
+            self._wav.setframerate(speech.sample_rate)
+            self._format = (speech.sample_rate, speech.channels, speech.sample_width)
+        elif self._format != (speech.sample_rate, speech.channels, speech.sample_width):
+            print(f"WAV capture: skipping '{speech.text[:40]}', its audio format differs.")
+            return super().play(speech, should_stop)
+        if self._last_end is not None:
+            # Silence in real time, so the file sounds like what the speakers would play
+            gap = (time.perf_counter() - self._last_end) * self.speed
+            frames = int(gap * speech.sample_rate)
+            self._wav.writeframes(bytes(frames * speech.channels * speech.sample_width))
+        completed = super().play(speech, should_stop)
+        self._last_end = time.perf_counter()
+        return completed
+
+    def _write(self, speech, pcm):
+        if self._wav is not None and self._format == (
+            speech.sample_rate,
+            speech.channels,
+            speech.sample_width,
+        ):
+            self._wav.writeframes(pcm)
+
+    def close(self):
+        if self._wav is not None:
+            self._wav.close()
+            self._wav = None
+
@@ -0,0 +1,78 @@
+"""
+Compares the streaming SentenceSegmenter with the regex splitting the TTS worker used
+before it, feeding both the same text in small chunks as Ollama streams it.
+
+    python -m benchmarks.segmenter_bench [--chunk-size 4] [--repeat 5]
+"""
+
+import argparse
+import time
+
+from text_stream import SentenceSegmenter, legacy_regex_segment
+
+PROSE = (
+    "Sure! Here is a quick overview of the topic. Dr. Smith measured 3.14 units, "
+    "e.g. in the second trial... and then the results changed. Why does that matter? "
+    "Because the error bars overlap!\n\n"
+    "Steps to reproduce:\n1. Install the package\n2. Run the script\n- Check the log\n\n"
+)
+# Long stretches without punctuation are the worst case for re-splitting the buffer
+RUN_ON = " ".join(["the quick brown fox jumps over the lazy dog"] * 11) + "\n\n"
+
+
+def build_corpus(paragraphs=200):
+    return "".join(PROSE if i % 2 == 0 else RUN_ON for i in range(paragraphs))
+
+
+def chunked(text, chunk_size):
+    return [text[i : i + chunk_size] for i in range(0, len(text), chunk_size)]
+
+
+def run_streaming(chunks):
+    segmenter = SentenceSegmenter(max_chunk_chars=500)
+    count = 0
+    for chunk in chunks:
+        count += len(segmenter.feed(chunk))
+    return count + len(segmenter.flush())
+
+
+def run_legacy(chunks):
+    buffer = ""
+    count = 0
+    for chunk in chunks:
+        buffer += chunk
+        sentences, buffer = legacy_regex_segment(buffer)
+        count += len(sentences)
+    return count + (1 if buffer.strip() else 0)
+
+
+def best_time(fn, chunks, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(chunks)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--chunk-size", type=int, default=4)
+    parser.add_argument("--paragraphs", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.paragraphs)
+    chunks = chunked(corpus, args.chunk_size)
+    print(f"Corpus: {len(corpus)} chars in {len(chunks)} chunks of {args.chunk_size}")
+    for name, fn in (("legacy regex", run_legacy), ("streaming", run_streaming)):
+        seconds, sentences = best_time(fn, chunks, args.repeat)
+        print(
+            f"{name:>14}: {len(corpus) / seconds / 1e6:8.2f} M chars/s "
+            f"({seconds * 1000:7.1f} ms, {sentences} sentences)"
+        )
+
+
+if __name__ == "__main__":
+    main()
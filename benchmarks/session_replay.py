@@ -0,0 +1,158 @@
+"""
+Replays a recorded session (see session_recording in the settings) through the real
+pipeline with no microphone and no Ollama: each turn's captured audio goes in through
+the corpus microphone, and the fake Ollama server streams the recorded tokens on their
+recorded schedule. Audio, token timing and speech playback run at the original pace or
+--speed times faster. Prints the recorded next to the replayed stage timings per turn,
+so a stall seen in use can be reproduced, profiled and compared after a fix.
+
+    python -m benchmarks.session_replay sessions/session_20250101_120000_000000.vsession
+                                        [--speed 4] [--input voice|text] [--turns 2,5]
+
+Voice turns need an ASR backend; without one, or with --input text, the recorded query
+is sent as typed text. Speech is synthesized silently, so stages after the first
+sentence reflect the pipeline, not the original TTS voice.
+"""
+
+import argparse
+import tempfile
+import time
+
+from benchmarks.audio_corpus import Utterance
+from benchmarks.e2e_bench import (
+    OfflineSpeechChatEngine,
+    TurnWatcher,
+    report_missing_client_libraries,
+    run_turn,
+    write_config,
+)
+from benchmarks.fake_ollama import DEFAULT_MODEL, FakeOllamaServer
+from session_recorder import read_session
+from speech_engine import WHISPER_AVAILABLE
+from turn_metrics import TURN_SPANS, format_summary
+
+# Recorded settings that shape the pipeline and are applied to the replay
+REPLAYED_SETTINGS = (
+    "asr_backend",
+    "whisper_model_name",
+    "tts_mode",
+    "tts_rate",
+    "tts_volume",
+    "tts_skip_code",
+    "tts_max_chunk_chars",
+)
+
+
+def parse_turn_ids(text):
+    return {int(part) for part in text.split(",") if part.strip()} if text else None
+
+
+def print_comparison(recorded, replayed, speed):
+    note = f" (audio spans recorded at x1, replayed at x{speed:g})" if speed != 1 else ""
+    print(f"    {'span':<18} {'recorded':>10} {'replayed':>10}{note}")
+    for name, _, _ in TURN_SPANS:
+        before = recorded.get(name)
+        after = replayed.get(name)
+        if before is None and after is None:
+            continue
+        before_text = f"{before:8.0f}ms" if before is not None else f"{'-':>10}"
+        after_text = f"{after:8.0f}ms" if after is not None else f"{'-':>10}"
+        print(f"    {name:<18} {before_text} {after_text}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("session", help="A .vsession file written by the app.")
+    parser.add_argument("--speed", type=float, default=1.0, help="1 keeps the original timing.")
+    parser.add_argument("--input", choices=("voice", "text"), default=None)
+    parser.add_argument("--turns", help="Comma-separated turn numbers to replay (default all).")
+    parser.add_argument(
+        "--keep-pauses",
+        action="store_true",
+        help="Wait between turns as long as the user did (divided by --speed).",
+    )
+    parser.add_argument("--capture-wav", help="Write what would have been played here.")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+    if report_missing_client_libraries("session_replay"):
+        return 1
+
+    session_info, turns = read_session(args.session)
+    selected = parse_turn_ids(args.turns)
+    if selected:
+        turns = [turn for turn in turns if turn["turn"] in selected]
+    if not turns:
+        parser.error(f"no turns to replay in {args.session}")
+    voice = (args.input or ("voice" if WHISPER_AVAILABLE else "text")) == "voice"
+    if voice and not WHISPER_AVAILABLE:
+        parser.error("--input voice needs an ASR backend and NumPy")
+    model = session_info.get("ollama_model") or DEFAULT_MODEL
+    print(
+        f"Replaying {len(turns)} turn(s) of {args.session} ({model}) at x{args.speed:g}, "
+        f"{'voice' if voice else 'text'} input."
+    )
+
+    overrides = {
+        key: session_info[key] for key in REPLAYED_SETTINGS if session_info.get(key) is not None
+    }
+    overrides["ollama_model"] = model
+    with tempfile.TemporaryDirectory() as directory, FakeOllamaServer(
+        models=[model], speed=args.speed
+    ) as server:
+        watcher = TurnWatcher()
+        engine = OfflineSpeechChatEngine(
+            speed=args.speed,
+            capture_wav=args.capture_wav,
+            on_event=watcher.on_event,
+            config_file=write_config(directory, server.url, overrides),
+        )
+        engine.start()
+        try:
+            if not watcher.ready.wait(args.timeout):
+                print("The engine did not become ready in time.")
+                return 1
+            while voice and not engine.audio_capture.is_open():
+                time.sleep(0.05)
+            replay_started = time.perf_counter()
+            first_started_at = turns[0]["timeline"]["started_at"]
+            for turn in turns:
+                if args.keep_pauses:
+                    due = (turn["timeline"]["started_at"] - first_started_at) / args.speed
+                    delay = replay_started + due - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                # The recorded answer, on its recorded schedule, whatever the query
+                server.answer_for = lambda messages, tokens=turn["tokens"]: tokens
+                by_voice = voice and bool(turn["pcm"])
+                if not by_voice and not turn["query"]:
+                    print(f"Turn {turn['turn']}: nothing to send without its audio, skipped")
+                    continue
+                utterance = Utterance(f"turn {turn['turn']}", turn["pcm"], turn["query"] or "")
+                notes = []
+                if turn.get("cached"):
+                    notes.append("answered from the response cache")
+                if turn["timeline"].get("interrupted"):
+                    notes.append("interrupted in the recording, replayed to the end")
+                print(
+                    f"Turn {turn['turn']} ({turn['input']}, {len(turn['tokens'])} tokens): "
+                    f"'{(turn['query'] or '')[:60]}'" + (f" [{'; '.join(notes)}]" if notes else "")
+                )
+                if not run_turn(engine, watcher, utterance, by_voice, args.timeout):
+                    print("    did not complete")
+                    continue
+                current = engine.turn_metrics.current
+                replayed = current.to_dict()["spans_ms"] if current is not None else {}
+                print_comparison(turn["timeline"].get("spans_ms", {}), replayed, args.speed)
+            engine.turn_metrics.finish_turn()
+        finally:
+            engine.close()
+
+    print(format_summary(engine.turn_metrics.summary()))
+    return 0
+
+
+if __name__ == "__main__":
+    import multiprocessing
+
+    multiprocessing.freeze_support()  # The ASR worker runs in a child process
+    raise SystemExit(main())
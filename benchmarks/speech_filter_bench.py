@@ -0,0 +1,65 @@
+"""
+Measures how much text reaches the TTS engine for a code-heavy answer with and without
+SpeechFilter, and the filter's own streaming throughput. Characters handed to TTS are a
+good proxy for synthesis time, which grows roughly linearly with spoken text.
+
+    python -m benchmarks.speech_filter_bench [--chunk-size 4] [--repeat 5]
+"""
+
+import argparse
+import time
+
+from text_stream import SpeechFilter
+
+CODE_HEAVY_ANSWER = (
+    "Sure! Here is a function that parses the file:\n\n"
+    "```python\n"
+    "import json\n\n"
+    "def load_config(path):\n"
+    "    with open(path, 'r') as f:\n"
+    "        data = json.load(f)\n"
+    "    for key, value in data.items():\n"
+    "        print(f'{key} = {value}')\n"
+    "    return data\n"
+    "```\n\n"
+    "Call `load_config` with the path, for example `load_config('settings.json')`. "
+    "The options are listed below:\n\n"
+    "| Option | Default |\n|---|---|\n| theme | dark |\n| size | 14 |\n\n"
+    "See https://docs.python.org/3/library/json.html for details.\n"
+)
+
+
+def spoken_chars(chunks, use_filter):
+    speech_filter = SpeechFilter() if use_filter else None
+    spoken = []
+    for chunk in chunks:
+        spoken.append(speech_filter.feed(chunk) if speech_filter else chunk)
+    if speech_filter:
+        spoken.append(speech_filter.flush())
+    return len(" ".join("".join(spoken).split()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--chunk-size", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    text = CODE_HEAVY_ANSWER * 20
+    chunks = [text[i : i + args.chunk_size] for i in range(0, len(text), args.chunk_size)]
+    unfiltered = spoken_chars(chunks, use_filter=False)
+    filtered = spoken_chars(chunks, use_filter=True)
+    print(f"Characters sent to TTS without filter: {unfiltered}")
+    print(f"Characters sent to TTS with filter:    {filtered}")
+    print(f"Reduction: {unfiltered / max(1, filtered):.1f}x less text to synthesize")
+
+    best = float("inf")
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        spoken_chars(chunks, use_filter=True)
+        best = min(best, time.perf_counter() - start)
+    print(f"Filter throughput: {len(text) / best / 1e6:.2f} M chars/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+Per-stage benchmarks with stored baselines: sentence segmenter, stream cleaner, fence
+parser, GUI pump and ASR, each timed on fixed input and checked against
+benchmarks/baselines.json. Exits with 1 if any stage regressed beyond its threshold.
+Each run of a text stage is timed between two runs of a fixed calibration loop, and the
+stage is reported in milliseconds on the reference host: its best ratio to the loop
+times the loop's time stored in the baselines. Load on the machine and a faster or
+slower CPU move both alike, so the check holds on any host. The ASR stage decodes the audio corpus in the ASR worker process and is skipped when no
+backend is installed; everything else needs only the standard library.
+
+    python -m benchmarks.stage_bench [--stages segmenter,cleaner,fence,gui_pump,asr]
+                                     [--repeat 5] [--update-baselines]
+"""
+
+import argparse
+import re
+import time
+
+from benchmarks.audio_corpus import DEFAULT_CORPUS_DIR, SAMPLE_RATE, load_corpus
+from benchmarks.baselines import add_baseline_arguments, check_results, load_baselines
+from benchmarks.cleaner_bench import ANSWER, run_streaming_cleaner
+from benchmarks.fence_bench import make_answer, tokenizer_blocks
+from benchmarks.segmenter_bench import build_corpus, chunked, run_streaming
+from ui_updates import UIUpdateChannel
+
+STAGES = ("segmenter", "cleaner", "fence", "gui_pump", "asr")
+_CALIBRATION_TEXT = "The quick brown fox, 3.14 times. Jumps over! " * 4
+_WORD = re.compile(r"\w+")
+
+
+def calibration_loop(rounds=1000):
+    """Fixed string and regex work, like the text stages do, as a yardstick for the CPU."""
+    total = 0
+    for i in range(rounds):
+        piece = _CALIBRATION_TEXT[i % 40 :]
+        total += len(_WORD.findall(piece)) + len(piece.split()) + piece.count(".")
+    return total
+
+
+def _elapsed(fn, arg):
+    start = time.perf_counter()
+    fn(arg)
+    return time.perf_counter() - start
+
+
+def best_ratio(fn, arg, repeat):
+    """
+    Returns (best ratio of fn(arg)'s time to the calibration loop's, best loop time in
+    seconds). Every run is paired with the faster of the loop runs just before and after
+    it, so a slowdown of the whole machine cancels out.
+    """
+    best, calibration = float("inf"), float("inf")
+    for _ in range(repeat):
+        before = _elapsed(calibration_loop, 1000)
+        elapsed = _elapsed(fn, arg)
+        loop = min(before, _elapsed(calibration_loop, 1000))
+        best = min(best, elapsed / loop)
+        calibration = min(calibration, loop)
+    return best, calibration
+
+
+class _CountingTextbox:
+    """Accepts the CTkTextbox calls the pump makes and only counts characters."""
+
+    def __init__(self):
+        self.chars = 0
+
+    def insert(self, index, text):
+        self.chars += len(text)
+
+    def delete(self, start, end):
+        self.chars = 0
+
+    def see(self, index):
+        pass
+
+    def configure(self, **options):
+        pass
+
+
+def run_gui_pump(tokens, tokens_per_frame=4):
+    """
+    Appends tokens to a UIUpdateChannel and applies a frame after every tokens_per_frame
+    of them (100 tokens/s at 30 fps is about 3-4), with a status configure per frame.
+    Measures the channel's own buffering and coalescing; Tk drawing is not included.
+    """
+    channel = UIUpdateChannel(root=None, max_fps=30)
+    textbox, status = _CountingTextbox(), _CountingTextbox()
+    channel.set_epoch(1)
+    channel.set_text(textbox, "", epoch=1)
+    for i, token in enumerate(tokens, 1):
+        channel.append_text(textbox, token, epoch=1)
+        if i % tokens_per_frame == 0:
+            channel.configure(status, text=f"{i} tokens")
+            channel._apply()
+    channel._apply()
+    return textbox.chars
+
+
+def bench_text_stages(stages, repeat, calibration_ms=None):
+    """
+    Returns ({metric: milliseconds}, this run's calibration loop time in milliseconds).
+    Timings are scaled to a host whose loop takes calibration_ms, or this one's if None.
+    """
+    ratios = {}
+    calibration = float("inf")
+    runs = {
+        "segmenter": ("segmenter_ms", run_streaming, lambda: chunked(build_corpus(200), 4)),
+        "cleaner": ("cleaner_ms", run_streaming_cleaner, lambda: chunked(ANSWER * 200, 4)),
+        "fence": ("fence_ms", tokenizer_blocks, lambda: chunked(make_answer(400), 4)),
+        "gui_pump": ("gui_pump_ms", run_gui_pump, lambda: chunked(build_corpus(100), 4)),
+    }
+    for stage, (metric, fn, make_input) in runs.items():
+        if stage in stages:
+            ratios[metric], loop = best_ratio(fn, make_input(), repeat)
+            calibration = min(calibration, loop * 1000)
+    if not ratios:
+        return {}, None
+    reference = calibration_ms or calibration
+    return {metric: ratio * reference for metric, ratio in ratios.items()}, calibration
+
+
+def bench_asr(model_name, backend_name, corpus_dir):
+    """Returns {asr_rtf, asr_decode_ms} over the corpus, or {} without an ASR backend."""
+    from asr_worker import ASRWorkerProcess
+    from speech_engine import WHISPER_AVAILABLE
+
+    if not WHISPER_AVAILABLE:
+        print("asr: skipped, no ASR backend (or NumPy) installed.")
+        return {}
+    from vad import trim_silence
+
+    utterances = load_corpus(corpus_dir)
+    worker = ASRWorkerProcess(model_name, backend_name=backend_name)
+    worker.start()
+    try:
+        if not worker.wait_until_ready(timeout=600):
+            print("asr: skipped, the ASR worker failed to load.")
+            return {}
+        print(
+            f"asr: {backend_name} '{model_name}' loaded in {worker.load_seconds:.2f} s, "
+            f"warm-up {worker.warmup_seconds:.2f} s."
+        )
+        audio_seconds = decode_seconds = 0.0
+        for utterance in utterances:
+            # Decoded as the app does: silence trimmed first
+            pcm, _, _ = trim_silence(utterance.pcm, sample_rate=SAMPLE_RATE)
+            if not pcm:
+                continue
+            text, seconds = worker.transcribe(pcm)
+            audio_seconds += len(pcm) / (SAMPLE_RATE * 2)
+            decode_seconds += seconds
+            print(f"  {utterance.name}: {seconds:.2f} s for {len(pcm) / (SAMPLE_RATE * 2):.2f} s: '{text}'")
+    finally:
+        worker.shutdown()
+    if not audio_seconds:
+        return {}
+    return {
+        "asr_rtf": decode_seconds / audio_seconds,
+        "asr_decode_ms": decode_seconds / len(utterances) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--stages", default=",".join(STAGES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--asr-model", default="tiny")
+    parser.add_argument("--asr-backend", default="whisper")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS_DIR)
+    add_baseline_arguments(parser)
+    args = parser.parse_args()
+
+    stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    unknown = sorted(set(stages) - set(STAGES))
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(unknown)}")
+    reference = None
+    if not args.update_baselines:
+        reference = load_baselines(args.baselines).get("calibration_ms")
+    results, calibration_ms = bench_text_stages(stages, args.repeat, reference)
+    if calibration_ms is not None:
+        print(
+            f"calibration: {calibration_ms:.2f} ms here, "
+            f"{reference or calibration_ms:.2f} ms on the reference host."
+        )
+    if "asr" in stages:
+        results.update(bench_asr(args.asr_model, args.asr_backend, args.corpus))
+    return check_results(results, args, calibration_ms)
+
+
+if __name__ == "__main__":
+    import multiprocessing
+
+    multiprocessing.freeze_support()  # The ASR stage runs a worker process
+    raise SystemExit(main())
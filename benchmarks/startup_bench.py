@@ -0,0 +1,114 @@
+"""
+Measures start-up cost with python -X importtime. By default it starts the app with
+--exit-when-ready and reports time-to-window (GUI only) and time-to-ready, as printed by
+the app's "Startup:" lines, next to the slowest top-level imports. --import-only just
+imports the front end module, which needs no microphone, Ollama or display.
+
+    python -m benchmarks.startup_bench [--entry gui|headless] [--import-only] [--top 15]
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENTRIES = {"gui": "google", "headless": "headless"}
+# The module each front end lives in; google.py imports chat_app only when main() runs
+MODULES = {"gui": "chat_app", "headless": "headless"}
+
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s+)(\S+)")
+_MILESTONE_LINE = re.compile(
+    r"^Startup: (\w+) after ([\d.]+) s \(heavy modules loaded: (.*)\)\."
+)
+
+
+def parse_importtime(stderr):
+    """Returns [(module, self_us, cumulative_us, depth)] in the order Python reported them."""
+    imports = []
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            depth = (len(indent) - 1) // 2
+            imports.append((module, int(self_us), int(cumulative_us), depth))
+    return imports
+
+
+def parse_milestones(stdout):
+    """Returns {milestone: (seconds, heavy modules loaded by then)}."""
+    milestones = {}
+    for line in stdout.splitlines():
+        match = _MILESTONE_LINE.match(line)
+        if match:
+            name, seconds, loaded = match.groups()
+            milestones[name] = (float(seconds), loaded)
+    return milestones
+
+
+def run_entry(entry, import_only, timeout):
+    if import_only:
+        command = [sys.executable, "-X", "importtime", "-c", f"import {MODULES[entry]}"]
+    else:
+        command = [
+            sys.executable,
+            "-X",
+            "importtime",
+            f"{ENTRIES[entry]}.py",
+            "--exit-when-ready",
+        ]
+    started = time.perf_counter()
+    result = subprocess.run(
+        command, cwd=ROOT, capture_output=True, text=True, timeout=timeout
+    )
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entry", choices=sorted(ENTRIES), default="gui")
+    parser.add_argument("--import-only", action="store_true")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    args = parser.parse_args()
+
+    result, wall_seconds = run_entry(args.entry, args.import_only, args.timeout)
+    imports = parse_importtime(result.stderr)
+    top_level = [entry for entry in imports if entry[3] == 0]
+    # The front end module's own cumulative time covers everything; rank what it imports
+    ranked = [
+        entry for entry in imports if entry[3] <= 1 and entry[0] != MODULES[args.entry]
+    ]
+    total_us = sum(cumulative for _, _, cumulative, _ in top_level)
+    print(
+        f"{args.entry}: process wall time {wall_seconds:.2f} s, exit code {result.returncode}, "
+        f"{len(imports)} modules imported in {total_us / 1e6:.2f} s"
+    )
+    if result.returncode:
+        errors = [
+            line
+            for line in result.stderr.splitlines()
+            if not line.startswith("import time:")
+        ]
+        print("\n".join("    " + line for line in errors[-10:]))
+
+    milestones = parse_milestones(result.stdout)
+    for name in ("window", "ready"):
+        if name in milestones:
+            seconds, loaded = milestones[name]
+            print(f"  time to {name:>6}: {seconds:7.3f} s  (heavy modules loaded: {loaded})")
+    if not args.import_only and "ready" not in milestones:
+        print("  ready was never reached; see the app output:")
+        print("\n".join("    " + line for line in result.stdout.strip().splitlines()[-10:]))
+
+    print("Slowest imports (cumulative):")
+    for module, self_us, cumulative_us, _ in sorted(
+        ranked, key=lambda entry: entry[2], reverse=True
+    )[: args.top]:
+        print(f"  {cumulative_us / 1000:9.1f} ms  {module}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,804 @@
+"""
+The Tk front end. google.py imports this module only when it starts the GUI, so
+python google.py --headless runs without customtkinter or a display.
+"""
+
+import time
+import customtkinter as ctk
+import tkinter.messagebox as messagebox
+import sys
+import threading
+import io
+import base64
+
+# PIL, Pygments and keyboard are imported where they are first used: PIL for the first
+# image, Pygments for the first code window and keyboard when the hotkey is bound.
+from speech_engine import (
+    CONFIG_FILE,
+    MISSING_DEPENDENCIES,
+    NO_MICS,
+    NO_MODELS,
+    WHISPER_AVAILABLE,
+    WHISPER_MISSING_MESSAGE,
+    SpeechChatEngine,
+    log_startup_milestone,
+    module_available,
+)
+from turn_metrics import format_summary
+from ui_updates import UIUpdateChannel
+
+PYGMENTS_AVAILABLE = module_available("pygments")
+KEYBOARD_AVAILABLE = module_available("keyboard")
+
+_pygments_style_map = None
+
+
+def pygments_style_map():
+    """
+    Token colors for the code window as {token: (foreground_dark_mode,
+    foreground_light_mode)}, built on first use so Pygments is only imported then.
+    A simple mapping for a dark theme. Extend as needed.
+    """
+    global _pygments_style_map
+    if _pygments_style_map is None:
+        from pygments.token import Token
+
+        _pygments_style_map = {
+            Token.Keyword: ("#ff79c6", "#bd93f9"),  # pink, purple
+            Token.Keyword.Constant: ("#ff79c6", "#bd93f9"),
+            Token.Keyword.Declaration: ("#ff79c6", "#bd93f9"),
+            Token.Keyword.Namespace: ("#ff79c6", "#bd93f9"),
+            Token.Keyword.Pseudo: ("#ff79c6", "#bd93f9"),
+            Token.Keyword.Reserved: ("#ff79c6", "#bd93f9"),
+            Token.Keyword.Type: ("#ff79c6", "#bd93f9"),
+            Token.Name.Builtin: ("#8be9fd", "#a4e6ff"),  # cyan
+            Token.Name.Builtin.Pseudo: ("#8be9fd", "#a4e6ff"),
+            Token.Name.Class: ("#50fa7b", "#77f29a"),  # green
+            Token.Name.Function: ("#50fa7b", "#77f29a"),
+            Token.Name.Exception: ("#ff5555", "#ff7a7a"),  # red
+            Token.Name.Variable: ("#8be9fd", "#a4e6ff"),
+            Token.Name.Constant: ("#bd93f9", "#e0caff"),  # purple
+            Token.Name.Label: ("#f1fa8c", "#ffe9a4"),  # yellow
+            Token.Literal.String: ("#f1fa8c", "#ffe9a4"),  # yellow
+            Token.Literal.String.Doc: ("#f1fa8c", "#ffe9a4"),
+            Token.Literal.Number: ("#bd93f9", "#e0caff"),  # purple
+            Token.Operator: ("#ff79c6", "#bd93f9"),  # pink
+            Token.Punctuation: ("#f8f8f2", "#282a36"),  # white/grey
+            Token.Comment: ("#6272a4", "#959595"),  # grey/blue
+            Token.Comment.Single: ("#6272a4", "#959595"),
+            Token.Comment.Multiline: ("#6272a4", "#959595"),
+            Token.Generic.Deleted: ("#ff5555", "#ff7a7a"),
+            Token.Generic.Inserted: ("#50fa7b", "#77f29a"),
+            Token.Generic.Heading: ("#ffb86c", "#ffd2a4"),
+            Token.Generic.Subheading: ("#ffb86c", "#ffd2a4"),
+            Token.Generic.Emph: ("#f8f8f2", "#282a36"),
+            Token.Generic.Strong: ("#f8f8f2", "#282a36"),
+            Token.Generic.Error: ("#ff5555", "#ff7a7a"),
+            Token.Text: ("#f8f8f2", "#282a36"),  # default text color
+            Token.Error: ("#ff5555", "#ff7a7a"),
+        }
+    return _pygments_style_map
+
+
+# --- Main Application ---
+class OllamaSpeechChatApp(ctk.CTk):
+    """
+    Tk front end for SpeechChatEngine. It owns the widgets, the global hotkey and the
+    code and image views; everything else happens in the engine, whose events are drawn
+    through the UIUpdateChannel pump or scheduled onto the GUI thread with after().
+    """
+
+    def __init__(self, config_file=CONFIG_FILE, exit_when_ready=False, started=None):
+        super().__init__()
+
+        self.title("Ollama Speech Chat")
+        self.geometry("1000x750")
+        self.grid_columnconfigure(1, weight=1)
+        self.grid_rowconfigure(2, weight=1)
+
+        self.ui_updates = None  # Created once the widgets exist
+        self.hotkey_pressed = False
+        self.hotkey_listening_event = threading.Event()
+        self.code_window = None
+        self.exit_when_ready = exit_when_ready  # Start-up benchmark: close once ready
+        self.started = started if started is not None else time.perf_counter()
+
+        self.engine = SpeechChatEngine(
+            on_event=self._on_engine_event, config_file=config_file
+        )
+        self.settings = self.engine.settings  # Shared dict, saved by the engine
+        ctk.set_appearance_mode(self.settings["theme_mode"])
+        ctk.set_default_color_theme(self.settings["color_theme"])
+
+        self._create_widgets()
+        # Worker threads post widget updates here; the pump draws them on the GUI thread
+        self.ui_updates = UIUpdateChannel(
+            self, max_fps=int(self.settings.get("ui_max_fps", 30))
+        )
+        self.ui_updates.set_epoch(self.engine.turn_epoch)
+        self.ui_updates.start()
+        self._init_tts_controls()
+
+        # Runs once the main loop is processing events, i.e. the window is on screen
+        self.after(0, log_startup_milestone, "window", self.started)
+        # Defer tasks that might interact with GUI early or use global hooks
+        self.after(100, self._perform_initial_background_tasks)
+
+        self.protocol("WM_DELETE_WINDOW", self._on_closing)
+
+    def _perform_initial_background_tasks(self):
+        """
+        Performs initializations that should happen after the main loop is more stable,
+        especially those involving threads that might schedule GUI updates or global hooks.
+        """
+        if not WHISPER_AVAILABLE:
+            messagebox.showwarning("Dependency Warning", WHISPER_MISSING_MESSAGE)
+        if not PYGMENTS_AVAILABLE:
+            messagebox.showwarning(
+                "Dependency Warning",
+                "Pygments not found. Code syntax highlighting will be disabled. Install with: pip install Pygments",
+            )
+        self.engine.start()  # TTS workers, model and microphone lists, ASR worker
+        self._initialize_hotkey_listener_safely()
+
+    def _initialize_hotkey_listener_safely(self):
+        """Initializes the global hotkey listener."""
+        print("Attempting to initialize hotkey listener safely...")
+        self._start_hotkey_listener()
+
+    def _create_widgets(self):
+        # Sidebar Frame
+        self.sidebar_frame = ctk.CTkFrame(self, width=200, corner_radius=0)
+        self.sidebar_frame.grid(row=0, column=0, rowspan=4, sticky="nsew")
+        self.sidebar_frame.grid_rowconfigure(7, weight=0)
+        self.sidebar_frame.grid_rowconfigure(26, weight=1)
+
+        self.logo_label = ctk.CTkLabel(
+            self.sidebar_frame,
+            text="Ollama Chat",
+            font=ctk.CTkFont(size=24, weight="bold"),
+        )
+        self.logo_label.grid(row=0, column=0, padx=20, pady=(20, 10))
+
+        self.theme_label = ctk.CTkLabel(self.sidebar_frame, text="Appearance Mode:")
+        self.theme_label.grid(row=1, column=0, padx=20, pady=(10, 0), sticky="w")
+        self.theme_optionmenu = ctk.CTkOptionMenu(
+            self.sidebar_frame,
+            values=["Light", "Dark", "System"],
+            command=self._change_appearance_mode_event,
+        )
+        self.theme_optionmenu.grid(row=2, column=0, padx=20, pady=(0, 10), sticky="ew")
+        self.theme_optionmenu.set(self.settings["theme_mode"])
+
+        self.color_theme_label = ctk.CTkLabel(self.sidebar_frame, text="Color Theme:")
+        self.color_theme_label.grid(row=3, column=0, padx=20, pady=(10, 0), sticky="w")
+        self.color_theme_optionmenu = ctk.CTkOptionMenu(
+            self.sidebar_frame,
+            values=["blue", "green", "dark-blue"],
+            command=self._change_color_theme_event,
+        )
+        self.color_theme_optionmenu.grid(
+            row=4, column=0, padx=20, pady=(0, 10), sticky="ew"
+        )
+        self.color_theme_optionmenu.set(self.settings["color_theme"])
+
+        self.font_size_label = ctk.CTkLabel(self.sidebar_frame, text="Font Size:")
+        self.font_size_label.grid(row=5, column=0, padx=20, pady=(10, 0), sticky="w")
+        self.font_size_slider = ctk.CTkSlider(
+            self.sidebar_frame,
+            from_=10,
+            to=20,
+            number_of_steps=10,
+            command=self._update_font_size,
+        )
+        self.font_size_slider.grid(row=6, column=0, padx=20, pady=(0, 10), sticky="ew")
+        self.font_size_slider.set(self.settings["font_size"])
+        self.font_size_value_label = ctk.CTkLabel(
+            self.sidebar_frame, text=str(int(self.settings["font_size"]))
+        )
+        self.font_size_value_label.grid(
+            row=5, column=0, padx=(100, 20), pady=(10, 0), sticky="e"
+        )
+
+        self.model_label = ctk.CTkLabel(self.sidebar_frame, text="Select Ollama Model:")
+        self.model_label.grid(row=8, column=0, padx=20, pady=(10, 0), sticky="w")
+        self.model_combobox = ctk.CTkComboBox(
+            self.sidebar_frame,
+            values=["Loading models..."],
+            command=self.engine.select_ollama_model,
+        )
+        self.model_combobox.grid(row=9, column=0, padx=20, pady=(0, 10), sticky="ew")
+        self.model_combobox.set("No models found")
+
+        self.hotkey_label = ctk.CTkLabel(
+            self.sidebar_frame, text="Push-to-Talk Hotkey:"
+        )
+        self.hotkey_label.grid(row=10, column=0, padx=20, pady=(10, 0), sticky="w")
+        self.current_hotkey_label = ctk.CTkLabel(
+            self.sidebar_frame, text=f"Current: {self.settings['hotkey_str']}"
+        )
+        self.current_hotkey_label.grid(
+            row=11, column=0, padx=20, pady=(0, 5), sticky="w"
+        )
+        self.set_hotkey_button = ctk.CTkButton(
+            self.sidebar_frame, text="Set Hotkey", command=self._set_hotkey_callback
+        )
+        self.set_hotkey_button.grid(
+            row=12, column=0, padx=20, pady=(0, 10), sticky="ew"
+        )
+
+        self.tts_label = ctk.CTkLabel(self.sidebar_frame, text="TTS Settings:")
+        self.tts_label.grid(row=13, column=0, padx=20, pady=(10, 0), sticky="w")
+
+        self.tts_voice_label = ctk.CTkLabel(self.sidebar_frame, text="Voice:")
+        self.tts_voice_label.grid(row=14, column=0, padx=20, pady=(5, 0), sticky="w")
+        self.tts_voice_combobox = ctk.CTkComboBox(
+            self.sidebar_frame,
+            values=["System Default"],  # Changed default value
+            command=self._update_tts_settings,
+        )
+        self.tts_voice_combobox.grid(
+            row=15, column=0, padx=20, pady=(0, 5), sticky="ew"
+        )
+        self.tts_voice_combobox.set("System Default")  # Set initial display
+        self.tts_voice_combobox.configure(state="disabled")  # Disable selection for now
+
+        self.tts_rate_label = ctk.CTkLabel(self.sidebar_frame, text="Rate:")
+        self.tts_rate_label.grid(row=16, column=0, padx=20, pady=(5, 0), sticky="w")
+        self.tts_rate_slider = ctk.CTkSlider(
+            self.sidebar_frame,
+            from_=50,
+            to=300,
+            number_of_steps=25,
+            command=self._update_tts_settings,
+        )
+        self.tts_rate_slider.grid(row=17, column=0, padx=20, pady=(0, 5), sticky="ew")
+        self.tts_rate_slider.set(self.settings["tts_rate"])
+        self.tts_rate_value_label = ctk.CTkLabel(
+            self.sidebar_frame, text=str(int(self.settings["tts_rate"]))
+        )
+        self.tts_rate_value_label.grid(
+            row=16, column=0, padx=(100, 20), pady=(5, 0), sticky="e"
+        )
+
+        self.tts_volume_label = ctk.CTkLabel(self.sidebar_frame, text="Volume:")
+        self.tts_volume_label.grid(row=18, column=0, padx=20, pady=(5, 0), sticky="w")
+        self.tts_volume_slider = ctk.CTkSlider(
+            self.sidebar_frame,
+            from_=0.0,
+            to=1.0,
+            number_of_steps=10,
+            command=self._update_tts_settings,
+        )
+        self.tts_volume_slider.grid(
+            row=19, column=0, padx=20, pady=(0, 10), sticky="ew"
+        )
+        self.tts_volume_slider.set(self.settings["tts_volume"])
+        self.tts_volume_value_label = ctk.CTkLabel(
+            self.sidebar_frame, text=f"{self.settings['tts_volume']:.1f}"
+        )
+        self.tts_volume_value_label.grid(
+            row=18, column=0, padx=(100, 20), pady=(5, 0), sticky="e"
+        )
+
+        self.stop_speaking_button = ctk.CTkButton(
+            self.sidebar_frame,
+            text="Stop Speaking",
+            command=self.engine.interrupt_turn,
+        )
+        self.stop_speaking_button.grid(
+            row=20, column=0, padx=20, pady=(10, 20), sticky="ew"
+        )
+
+        self.mic_label = ctk.CTkLabel(self.sidebar_frame, text="Select Microphone:")
+        self.mic_label.grid(row=21, column=0, padx=20, pady=(10, 0), sticky="w")
+        self.mic_combobox = ctk.CTkComboBox(
+            self.sidebar_frame,
+            values=["Loading microphones..."],
+            command=self.engine.select_microphone,
+        )
+        self.mic_combobox.grid(row=22, column=0, padx=20, pady=(0, 10), sticky="ew")
+        self.mic_combobox.set("No microphones found")
+
+        self.response_cache_switch = ctk.CTkSwitch(
+            self.sidebar_frame,
+            text="Use Response Cache",
+            command=self._toggle_response_cache,
+        )
+        self.response_cache_switch.grid(
+            row=23, column=0, padx=20, pady=(10, 0), sticky="w"
+        )
+        if self.engine.response_cache and not self.settings.get(
+            "response_cache_bypass"
+        ):
+            self.response_cache_switch.select()
+        if not self.engine.response_cache:
+            self.response_cache_switch.configure(state="disabled")
+        self.response_cache_stats_label = ctk.CTkLabel(
+            self.sidebar_frame, text="Cache: 0 hits / 0 misses"
+        )
+        self.response_cache_stats_label.grid(
+            row=24, column=0, padx=20, pady=(0, 10), sticky="nw"
+        )
+
+        # Per-stage latency of recent turns, p50 / p95
+        self.turn_metrics_label = ctk.CTkLabel(
+            self.sidebar_frame,
+            text=format_summary({}),
+            font=ctk.CTkFont(family="Courier", size=11),
+            justify="left",
+        )
+        self.turn_metrics_label.grid(row=25, column=0, padx=20, pady=(0, 5), sticky="nw")
+        self.export_metrics_button = ctk.CTkButton(
+            self.sidebar_frame,
+            text="Export Metrics",
+            command=lambda: threading.Thread(
+                target=self.engine.export_turn_metrics, daemon=True
+            ).start(),
+        )
+        self.export_metrics_button.grid(
+            row=26, column=0, padx=20, pady=(0, 10), sticky="new"
+        )
+
+        self.exit_button = ctk.CTkButton(
+            self.sidebar_frame, text="Exit", command=self._on_closing
+        )
+        self.exit_button.grid(row=27, column=0, padx=20, pady=(10, 20), sticky="sew")
+
+        self.main_frame = ctk.CTkFrame(self, corner_radius=0)
+        self.main_frame.grid(
+            row=0, column=1, rowspan=4, sticky="nsew", padx=10, pady=10
+        )
+        self.main_frame.grid_columnconfigure(0, weight=1)
+        self.main_frame.grid_rowconfigure(2, weight=1)
+        self.main_frame.grid_rowconfigure(4, weight=2)
+        self.main_frame.grid_rowconfigure(5, weight=0)
+
+        self.status_label = ctk.CTkLabel(
+            self.main_frame,
+            text="Press and hold 'Alt' to speak...",
+            font=ctk.CTkFont(size=self.settings["font_size"] + 2, weight="bold"),
+        )
+        self.status_label.grid(row=0, column=0, padx=10, pady=(10, 5), sticky="ew")
+
+        self.user_query_label = ctk.CTkLabel(
+            self.main_frame,
+            text="Your Query:",
+            font=ctk.CTkFont(size=self.settings["font_size"], weight="bold"),
+        )
+        self.user_query_label.grid(row=1, column=0, padx=10, pady=(5, 0), sticky="w")
+        self.user_query_textbox = ctk.CTkTextbox(
+            self.main_frame, wrap="word", height=100
+        )
+        self.user_query_textbox.grid(
+            row=2, column=0, padx=10, pady=(0, 10), sticky="nsew"
+        )
+        self.user_query_textbox.configure(
+            font=ctk.CTkFont(size=self.settings["font_size"])
+        )
+
+        self.ollama_response_label = ctk.CTkLabel(
+            self.main_frame,
+            text="Ollama's Response:",
+            font=ctk.CTkFont(size=self.settings["font_size"], weight="bold"),
+        )
+        self.ollama_response_label.grid(
+            row=3, column=0, padx=10, pady=(5, 0), sticky="w"
+        )
+        self.ollama_response_textbox = ctk.CTkTextbox(self.main_frame, wrap="word")
+        self.ollama_response_textbox.grid(
+            row=4, column=0, padx=10, pady=(0, 10), sticky="nsew"
+        )
+        self.ollama_response_textbox.configure(
+            font=ctk.CTkFont(size=self.settings["font_size"])
+        )
+
+        self.image_frame = ctk.CTkFrame(
+            self.main_frame, corner_radius=8, border_width=2
+        )
+        self.image_label = ctk.CTkLabel(self.image_frame, text="")
+        self.image_label.pack(padx=10, pady=5, expand=True, fill="both")
+        self.image_caption_label = ctk.CTkLabel(
+            self.image_frame,
+            text="",
+            wraplength=400,
+            font=ctk.CTkFont(size=self.settings["font_size"] - 2, slant="italic"),
+        )
+        self.image_caption_label.pack(padx=10, pady=5, expand=True, fill="x")
+        self.current_image = None
+
+        self._hide_image_frame()
+        self._update_all_fonts()
+
+    def _update_all_fonts(self, *args):
+        font_size = int(self.settings["font_size"])
+        bold_font = ctk.CTkFont(size=font_size, weight="bold")
+        normal_font = ctk.CTkFont(size=font_size)
+        italic_font = ctk.CTkFont(size=font_size - 2, slant="italic")
+
+        self.logo_label.configure(font=ctk.CTkFont(size=font_size + 10, weight="bold"))
+        self.status_label.configure(font=ctk.CTkFont(size=font_size + 2, weight="bold"))
+        self.user_query_label.configure(font=bold_font)
+        self.ollama_response_label.configure(font=bold_font)
+        self.user_query_textbox.configure(font=normal_font)
+        self.ollama_response_textbox.configure(font=normal_font)
+        self.image_caption_label.configure(font=italic_font)
+
+        for widget in [
+            self.theme_label,
+            self.color_theme_label,
+            self.font_size_label,
+            self.font_size_value_label,
+            self.model_label,
+            self.hotkey_label,
+            self.current_hotkey_label,
+            self.tts_label,
+            self.tts_voice_label,
+            self.tts_rate_label,
+            self.tts_rate_value_label,
+            self.tts_volume_label,
+            self.tts_volume_value_label,
+            self.mic_label,
+        ]:
+            widget.configure(font=normal_font)
+        for widget in [
+            self.theme_optionmenu,
+            self.color_theme_optionmenu,
+            self.model_combobox,
+            self.tts_voice_combobox,  # This will be disabled, but font still applies
+            self.mic_combobox,
+        ]:
+            widget.configure(font=normal_font)
+        for widget in [
+            self.set_hotkey_button,
+            self.stop_speaking_button,
+            self.exit_button,
+        ]:
+            widget.configure(font=normal_font)
+
+    def _update_font_size(self, value):
+        self.settings["font_size"] = int(value)
+        self.font_size_value_label.configure(text=str(int(value)))
+        self._update_all_fonts()
+        self.engine.save_config()
+
+    def _change_appearance_mode_event(self, new_appearance_mode: str):
+        ctk.set_appearance_mode(new_appearance_mode)
+        self.settings["theme_mode"] = new_appearance_mode
+        self.engine.save_config()
+        if self.code_window and self.code_window.winfo_exists():
+            print(
+                "Appearance mode changed. Re-open code window for updated syntax highlighting if needed."
+            )
+
+    def _change_color_theme_event(self, new_color_theme: str):
+        ctk.set_default_color_theme(new_color_theme)
+        self.settings["color_theme"] = new_color_theme
+        self.engine.save_config()
+
+    def _update_status_label(self, message, color="white"):
+        if self.ui_updates:
+            self.ui_updates.configure(self.status_label, text=message, text_color=color)
+
+    def _show_error_message(self, title, message):
+        self.after(0, lambda: messagebox.showerror(title, message))
+
+    def _on_engine_event(self, kind, *args):
+        """Called by the engine from its worker threads; nothing here touches Tk directly."""
+        if kind == "status":
+            self._update_status_label(*args)
+        elif kind == "error":
+            self._show_error_message(*args)
+        elif kind == "warning":
+            self.after(0, lambda: messagebox.showwarning(*args))
+        elif kind == "query":
+            self.ui_updates.set_text(self.user_query_textbox, args[0])
+        elif kind == "query_partial":
+            self.ui_updates.set_text(self.user_query_textbox, args[0] + " ...")
+        elif kind == "query_note":
+            self.ui_updates.append_text(self.user_query_textbox, args[0])
+        elif kind == "epoch":
+            self.ui_updates.set_epoch(args[0])
+        elif kind == "response_start":
+            epoch = args[0]
+            self.after(0, self._hide_image_frame)
+            self.after(0, self._destroy_code_window)
+            self.ui_updates.set_text(self.ollama_response_textbox, "", epoch=epoch)
+        elif kind == "response_delta":
+            epoch, text = args
+            self.ui_updates.append_text(self.ollama_response_textbox, text, epoch=epoch)
+        elif kind == "code_block":
+            epoch, code, language = args
+            self.after(
+                0,
+                lambda: epoch == self.engine.turn_epoch
+                and self._show_code_window(code, language),
+            )
+        elif kind == "image":
+            self.after(0, lambda: self._show_image_frame(*args))
+        elif kind == "models":
+            self.after(0, self._complete_ollama_models_fetch_gui_update, *args)
+        elif kind == "microphones":
+            self.after(0, self._complete_microphone_fetch_gui_update, *args)
+        elif kind == "microphone_opened":
+            self.after(0, lambda: self.mic_combobox.set(args[0]))
+        elif kind == "ready":
+            log_startup_milestone("ready", self.started)
+            if self.exit_when_ready:
+                self.after(0, self._on_closing)
+        elif kind == "response_cache":
+            hits, misses = args
+            self.ui_updates.configure(
+                self.response_cache_stats_label,
+                text=f"Cache: {hits} hits / {misses} misses",
+            )
+        elif kind == "turn_metrics":
+            self.ui_updates.configure(
+                self.turn_metrics_label, text=format_summary(args[0])
+            )
+
+    def _complete_ollama_models_fetch_gui_update(self, model_names, selected_model):
+        self.model_combobox.configure(
+            values=model_names if model_names else [NO_MODELS]
+        )
+        self.model_combobox.set(selected_model)
+
+    def _complete_microphone_fetch_gui_update(self, names, sel_name, err):
+        self.mic_combobox.configure(values=names if names else [NO_MICS])
+        self.mic_combobox.set(sel_name)
+
+    def _toggle_response_cache(self):
+        self.settings["response_cache_bypass"] = not self.response_cache_switch.get()
+        self.engine.save_config()
+
+    def _start_hotkey_listener(self):
+        if not KEYBOARD_AVAILABLE:
+            self._update_status_label(
+                "Hotkey unavailable (keyboard not installed).", "red"
+            )
+            return
+        import keyboard
+
+        try:
+            keyboard.unhook_all()
+        except Exception:
+            pass
+        hotkey_to_bind = self.settings["hotkey_str"]
+        print(f"Attempting to bind hotkey: '{hotkey_to_bind}'")  # Debug print
+        if not hotkey_to_bind or hotkey_to_bind.lower() == "none":
+            self._update_status_label("No hotkey set.", "yellow")
+            print("No hotkey configured.")  # Debug print
+            return
+        try:
+            keyboard.on_press_key(hotkey_to_bind, self._on_hotkey_press, suppress=True)
+            keyboard.on_release_key(
+                hotkey_to_bind, self._on_hotkey_release, suppress=True
+            )
+            self._update_status_label(
+                f"Ready. Hold '{hotkey_to_bind}' to speak...", "green"
+            )
+            self.after(
+                0,
+                lambda: self.current_hotkey_label.configure(
+                    text=f"Current: {hotkey_to_bind}"
+                ),
+            )
+            print(f"Hotkey '{hotkey_to_bind}' bound successfully.")  # Debug print
+        except Exception as e:
+            self._show_error_message(
+                "Hotkey Error",
+                f"Failed to set hotkey '{hotkey_to_bind}': {e}\nOn macOS, ensure Accessibility permissions are granted for your terminal/IDE or Python app. On Linux, you might need 'sudo' or specific X server configuration.",
+            )
+            self._update_status_label("Hotkey setup failed.", "red")
+            print(f"Hotkey binding failed: {e}")  # Debug print
+
+    def _on_hotkey_press(self, event):
+        if not self.hotkey_pressed:
+            self.hotkey_pressed = True
+            # Barge-in: the answer still streaming or speaking is abandoned at once
+            print(
+                "Hotkey pressed. Interrupting the current answer, then starting recording."
+            )
+            self.engine.begin_voice_turn()
+            self.after(0, self.engine.start_recording)
+
+    def _on_hotkey_release(self, event):
+
+        if self.hotkey_pressed:
+            self.hotkey_pressed = False
+            self.engine.mark_hotkey_release()
+            self.after(0, self.engine.stop_recording)
+
+    def _set_hotkey_callback(self):
+        if not KEYBOARD_AVAILABLE:
+            self._show_error_message(
+                "Dependency Error",
+                "The 'keyboard' library is not installed. Please install it with: pip install keyboard",
+            )
+            return
+        self._update_status_label("Press key combination for new hotkey...", "orange")
+        self.set_hotkey_button.configure(state="disabled")
+        print("Listening for new hotkey...")  # Debug print
+        threading.Thread(target=self._listen_for_hotkey, daemon=True).start()
+
+    def _listen_for_hotkey(self):
+        import keyboard
+
+        try:
+            keyboard.unhook_all()
+            recorded_hotkey = keyboard.read_hotkey(suppress=False)
+            new_hotkey_string = (
+                str(recorded_hotkey)
+                .lower()
+                .replace("right ", "")
+                .replace("left ", "")
+                .replace("control", "ctrl")
+            )
+            if not new_hotkey_string:
+                raise ValueError("No hotkey detected.")
+            self.settings["hotkey_str"] = new_hotkey_string
+            self.engine.save_config()
+            self.after(0, self._start_hotkey_listener)
+            self.after(0, lambda: self.set_hotkey_button.configure(state="normal"))
+            self.after(
+                0,
+                lambda s=new_hotkey_string: self.current_hotkey_label.configure(
+                    text=f"Current: {s}"
+                ),
+            )
+            print(f"New hotkey detected and set: '{new_hotkey_string}'")  # Debug print
+        except Exception as e:
+            self._show_error_message("Hotkey Error", f"Failed to set hotkey: {e}")
+            self.after(0, lambda: self.set_hotkey_button.configure(state="normal"))
+            self.after(0, self._start_hotkey_listener)  # Restore previous listener
+            print(f"Error setting new hotkey: {e}")  # Debug print
+
+    def _init_tts_controls(self):
+        # The pyttsx3 engines live in the speech engine's TTS worker threads; this only
+        # sets up the sidebar controls from the settings.
+        self.tts_voice_combobox.configure(values=["System Default"])
+        self.tts_voice_combobox.set("System Default")
+        self.tts_voice_combobox.configure(state="disabled")
+        self.tts_rate_slider.set(self.settings["tts_rate"])
+        self.tts_volume_slider.set(self.settings["tts_volume"])
+        self.tts_rate_value_label.configure(text=str(int(self.settings["tts_rate"])))
+        self.tts_volume_value_label.configure(text=f"{self.settings['tts_volume']:.1f}")
+
+    def _update_tts_settings(self, *args):
+        new_rate = int(self.tts_rate_slider.get())
+        new_volume = float(self.tts_volume_slider.get())
+        self.tts_rate_value_label.configure(text=str(new_rate))
+        self.tts_volume_value_label.configure(text=f"{new_volume:.1f}")
+        # The TTS worker that owns the pyttsx3 engine applies them
+        self.engine.update_tts_settings(new_rate, new_volume)
+
+    def _show_image_frame(self, base64_data, caption):
+        try:
+            from PIL import Image
+
+            img_data = base64.b64decode(base64_data)
+            img = Image.open(io.BytesIO(img_data))
+            max_w, max_h = self.main_frame.winfo_width() - 40 or 400, 300
+            orig_w, orig_h = img.size
+            ratio = orig_w / orig_h
+            disp_w = min(orig_w, max_w)
+            disp_h = int(disp_w / ratio)
+            if disp_h > max_h:
+                disp_h = max_h
+                disp_w = int(disp_h * ratio)
+            disp_w, disp_h = max(1, disp_w), max(1, disp_h)
+            resized_img = img.resize((disp_w, disp_h), Image.LANCZOS)
+            ctk_img = ctk.CTkImage(
+                light_image=resized_img, dark_image=resized_img, size=(disp_w, disp_h)
+            )
+            self.image_label.configure(image=ctk_img, text="")
+            self.current_image = ctk_img
+            self.image_caption_label.configure(text=caption, wraplength=disp_w - 20)
+            self.image_frame.grid(row=5, column=0, padx=10, pady=(0, 10), sticky="ew")
+            self.main_frame.grid_rowconfigure(5, weight=0)
+            self.main_frame.grid_rowconfigure(4, weight=1)
+        except Exception as e:
+            self._show_error_message("Image Error", f"Failed to display image: {e}")
+            self._hide_image_frame()
+
+    def _hide_image_frame(self):
+        self.image_frame.grid_remove()
+        self.current_image = None
+        self.main_frame.grid_rowconfigure(5, weight=0)
+        self.main_frame.grid_rowconfigure(4, weight=2)
+
+    def _show_code_window(self, code_text, language="text"):
+        if self.code_window and self.code_window.winfo_exists():
+            self.code_window.destroy()
+        self.code_window = ctk.CTkToplevel(self)
+        self.code_window.title(f"Generated Code ({language})")
+        self.code_window.geometry("700x500")
+        self.code_window.transient(self)
+        self.code_window.protocol("WM_DELETE_WINDOW", self._destroy_code_window)
+        self.code_window.grid_columnconfigure(0, weight=1)
+        self.code_window.grid_rowconfigure(0, weight=1)
+        display_code = code_text.strip()
+        tb = ctk.CTkTextbox(
+            self.code_window,
+            wrap="none",
+            font=("Fira Code", self.settings["font_size"] - 1),
+        )
+        tb.grid(row=0, column=0, padx=10, pady=(10, 5), sticky="nsew")
+        if PYGMENTS_AVAILABLE:
+            from pygments.lexers import get_lexer_by_name, guess_lexer
+
+            style_map = pygments_style_map()
+            try:
+                lexer = get_lexer_by_name(language)
+            except:
+                lexer = (
+                    guess_lexer(display_code)
+                    if PYGMENTS_AVAILABLE
+                    else get_lexer_by_name("text")
+                )  # Fallback
+            dark = ctk.get_appearance_mode() == "Dark"
+            for tt, val in lexer.get_tokens(display_code):
+                tag, parent = str(tt), tt.parent
+                colors = style_map.get(tt)
+                while parent and not colors:
+                    colors = style_map.get(parent)
+                    parent = parent.parent
+                fg = (
+                    colors[0]
+                    if dark
+                    else colors[1] if colors else ("#f8f8f2" if dark else "#282a36")
+                )
+                tb.tag_config(tag, foreground=fg)
+                tb.insert("end", val, tag)
+        else:
+            tb.insert("end", display_code)
+        tb.configure(state="disabled")
+        ctk.CTkButton(
+            self.code_window,
+            text="Copy Code",
+            command=lambda: self._copy_code_to_clipboard(display_code),
+        ).grid(row=1, column=0, padx=10, pady=(5, 10), sticky="ew")
+
+    def _copy_code_to_clipboard(self, code_text):
+        try:
+            self.clipboard_clear()
+            self.clipboard_append(code_text)
+            messagebox.showinfo("Copied", "Code copied!", parent=self.code_window)
+        except Exception as e:
+            self._show_error_message("Copy Error", f"Failed to copy: {e}")
+
+    def _destroy_code_window(self):
+        if self.code_window:
+            self.code_window.destroy()
+            self.code_window = None
+
+    def _on_closing(self):
+        print("Closing application...")
+
+        # Unhook keyboard listener; only loaded if a hotkey was ever bound
+        keyboard = sys.modules.get("keyboard")
+        if keyboard is not None:
+            try:
+                print("Unhooking all keyboard events...")
+                keyboard.unhook_all()
+                print("Keyboard events unhooked.")
+            except Exception as e:
+                print(f"Error unhooking keyboard: {e}")
+
+        self.engine.close()  # Joins the workers and saves the configuration
+        self.ui_updates.stop()  # No pump callbacks may fire on a destroyed window
+        print("Configuration saved. Destroying main window.")
+        self.destroy()
+        print("Application closed.")
+
+
+def run(config_file=CONFIG_FILE, exit_when_ready=False, started=None):
+    if MISSING_DEPENDENCIES:
+        for message in MISSING_DEPENDENCIES:
+            messagebox.showerror("Dependency Error", message)
+        return 1
+    app = OllamaSpeechChatApp(
+        config_file=config_file, exit_when_ready=exit_when_ready, started=started
+    )
+    app.mainloop()
+    return 0
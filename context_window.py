@@ -0,0 +1,286 @@
+import collections
+import re
+import threading
+from collections.abc import Sequence
+
+CHARS_PER_TOKEN = 4.0  # Starting estimate for English text, refined from Ollama's counts
+DEFAULT_NUM_CTX = 4096
+MESSAGE_OVERHEAD_TOKENS = 4  # Role markers the chat template adds around each message
+
+_FIRST_SENTENCE = re.compile(r"\s*(.+?[.!?])(?:\s|$)", re.DOTALL)
+
+
+def context_length_from_show(show_response):
+    """
+    Returns (model_context_length, num_ctx) from an ollama.show() response. Either is
+    None when the model does not report it. num_ctx is the model's own Modelfile
+    parameter, which is what Ollama actually allocates when set.
+    """
+    model_info = getattr(show_response, "modelinfo", None)
+    parameters = getattr(show_response, "parameters", None)
+    if model_info is None and isinstance(show_response, dict):
+        model_info = show_response.get("model_info")
+        parameters = show_response.get("parameters")
+    context_length = None
+    for key, value in (model_info or {}).items():
+        if key.endswith(".context_length"):
+            context_length = int(value)
+            break
+    num_ctx = None
+    match = re.search(r"^\s*num_ctx\s+(\d+)", parameters or "", re.MULTILINE)
+    if match:
+        num_ctx = int(match.group(1))
+    return context_length, num_ctx
+
+
+class WindowView(Sequence):
+    """
+    What ContextWindow.select() returns: the summary message (if any) followed by
+    history[start:stop], read straight from the history list instead of copied. Slices
+    are views too. It stays valid while the history only grows; pop() or clear() can
+    invalidate it, so use it for the request it was selected for.
+    """
+
+    __slots__ = ("_messages", "_start", "_stop", "_summary")
+
+    def __init__(self, messages, start, stop, summary=None):
+        self._messages = messages
+        self._start = start
+        self._stop = stop
+        self._summary = summary
+
+    def __len__(self):
+        return self._stop - self._start + (self._summary is not None)
+
+    def __getitem__(self, index):
+        offset = self._summary is not None
+        if isinstance(index, slice):
+            first, last, step = index.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(first, last, step)]
+            last = max(first, last)
+            summary = self._summary if first == 0 and last > 0 else None
+            return WindowView(
+                self._messages,
+                self._start + max(first - offset, 0),
+                self._start + max(last - offset, 0),
+                summary,
+            )
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("window index out of range")
+        if offset:
+            if index == 0:
+                return self._summary
+            index -= 1
+        return self._messages[self._start + index]
+
+    def __iter__(self):
+        if self._summary is not None:
+            yield self._summary
+        messages = self._messages
+        for i in range(self._start, self._stop):
+            yield messages[i]
+
+    def __eq__(self, other):
+        if isinstance(other, (WindowView, list)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"WindowView({list(self)!r})"
+
+
+class ContextWindow:
+    """
+    Conversation history with a token budget, maintained incrementally.
+
+    Every message carries a token count: Ollama's eval_count for assistant replies, and
+    for other messages an estimate from a chars-per-token ratio that is recalibrated from
+    each prompt_eval_count. The window is history[start:]; appending a message adds its
+    count to a running total, and once that exceeds the budget start advances past the
+    oldest messages until the total is down to trim_ratio of the budget, so each message
+    is counted and dropped at most once. select() returns a WindowView over the history
+    list, so a turn costs the same however long the window is. Trimming in such large
+    steps keeps the prompt prefix byte-identical for many turns in between, which lets
+    Ollama reuse its KV cache instead of re-evaluating the whole history after every
+    turn. Dropped messages are optionally folded into a short extractive summary that is
+    sent as a system message ahead of the window. All public methods are thread-safe.
+    """
+
+    def __init__(
+        self,
+        context_tokens=DEFAULT_NUM_CTX,
+        reserve_tokens=1024,
+        summarize=True,
+        summary_max_tokens=200,
+        trim_ratio=0.6,
+    ):
+        self._lock = threading.RLock()
+        self.messages = []  # Full history: {"role", "content"} dicts
+        self.tokens = []  # Token count per message, parallel to messages
+        self.start = 0  # First message inside the window
+        self.window_tokens = 0  # Sum of tokens[start:]
+        self.window_chars = 0  # Content characters in messages[start:]
+        self.chars_per_token = CHARS_PER_TOKEN
+        self.summarize = summarize
+        self.summary_max_tokens = summary_max_tokens
+        self._summary_lines = collections.deque()  # (line, tokens), oldest first
+        self._summary_tokens = 0
+        self._summary_message = None  # Built lazily, reset whenever the summary changes
+        self.trim_ratio = trim_ratio
+        self.trims = 0  # How often the prefix changed because of trimming
+        self.reserve_tokens = reserve_tokens
+        self.context_tokens = context_tokens
+        self.budget = 0
+        self.set_context_tokens(context_tokens)
+
+    def estimate_tokens(self, text):
+        return int(len(text) / self.chars_per_token) + 1 + MESSAGE_OVERHEAD_TOKENS
+
+    def set_context_tokens(self, context_tokens):
+        """
+        Sizes the budget from the model's context length, keeping reserve_tokens free
+        for the reply (but never more than half the context). A smaller budget drops
+        the oldest messages now; a larger one does not bring back dropped messages.
+        """
+        with self._lock:
+            self.context_tokens = context_tokens
+            reserve = min(self.reserve_tokens, context_tokens // 2)
+            self.budget = max(1, context_tokens - reserve)
+            self._shrink()
+
+    def append(self, role, content, tokens=None):
+        with self._lock:
+            self.messages.append({"role": role, "content": content})
+            count = tokens if tokens is not None else self.estimate_tokens(content)
+            self.tokens.append(count)
+            self.window_tokens += count
+            self.window_chars += len(content)
+            if self.window_tokens + self._summary_tokens > self.budget:
+                self._shrink()
+
+    def pop(self):
+        """Removes the newest message, e.g. a user turn whose request failed."""
+        with self._lock:
+            if not self.messages:
+                return None
+            message = self.messages.pop()
+            count = self.tokens.pop()
+            if len(self.messages) >= self.start:
+                self.window_tokens -= count
+                self.window_chars -= len(message["content"])
+            else:
+                self.start = len(self.messages)
+            return message
+
+    def record_usage(self, sent_tokens, prompt_eval_count, sent_chars):
+        """
+        Recalibrates chars_per_token from Ollama's prompt_eval_count for a request
+        whose messages were estimated at sent_tokens. Counts far below the estimate
+        mean Ollama reused a cached prefix and only evaluated the rest, so they are
+        ignored.
+        """
+        if not prompt_eval_count or not sent_chars:
+            return
+        if prompt_eval_count < 0.5 * sent_tokens:
+            return
+        measured = sent_chars / prompt_eval_count
+        with self._lock:
+            # Smooth it so one unusual reply (code, another language) does not swing it
+            self.chars_per_token += 0.3 * (measured - self.chars_per_token)
+
+    def select(self):
+        """Returns the messages to send, the summary (if any) and the window, as a view."""
+        with self._lock:
+            return WindowView(
+                self.messages, self.start, len(self.messages), self._summary()
+            )
+
+    def selected_tokens(self):
+        with self._lock:
+            return self.window_tokens + self._summary_tokens
+
+    def selected_chars(self):
+        """Content characters in what select() returns, without walking it."""
+        with self._lock:
+            summary = self._summary()
+            return self.window_chars + (len(summary["content"]) if summary else 0)
+
+    def _summary(self):
+        if not self._summary_lines:
+            return None
+        if self._summary_message is None:
+            summary = " ".join(line for line, _ in self._summary_lines)
+            self._summary_message = {
+                "role": "system",
+                "content": f"Summary of the earlier conversation: {summary}",
+            }
+        return self._summary_message
+
+    def clear(self):
+        with self._lock:
+            self.messages.clear()
+            self.tokens.clear()
+            self.start = 0
+            self.window_tokens = 0
+            self.window_chars = 0
+            self._summary_lines.clear()
+            self._summary_tokens = 0
+            self._summary_message = None
+
+    def _shrink(self):
+        if self.window_tokens + self._summary_tokens <= self.budget:
+            return
+        self.trims += 1
+        target = self.budget * self.trim_ratio
+        # Leave room for the summary at its largest, so folding cannot overshoot target
+        summary_room = self.summary_max_tokens if self.summarize else self._summary_tokens
+        first = self.start
+        # The newest message always stays, even if it alone exceeds the budget
+        while (
+            self.window_tokens + summary_room > target
+            and self.start < len(self.messages) - 1
+        ):
+            self.window_tokens -= self.tokens[self.start]
+            self.window_chars -= len(self.messages[self.start]["content"])
+            self.start += 1
+        if self.summarize:
+            self._fold(first, self.start)
+
+    def _fold(self, first, stop):
+        """Adds summary lines for messages[first:stop], the ones just dropped."""
+        lines = []
+        tokens = 0
+        # Newest first: older lines would only be pushed out of the summary again
+        for i in range(stop - 1, first - 1, -1):
+            line = self._summary_line(self.messages[i])
+            if line is None:
+                continue
+            count = self.estimate_tokens(line)
+            lines.append((line, count))
+            tokens += count
+            if tokens > self.summary_max_tokens:
+                break
+        if not lines:
+            return
+        self._summary_message = None
+        for line, count in reversed(lines):
+            self._summary_lines.append((line, count))
+            self._summary_tokens += count
+        while self._summary_tokens > self.summary_max_tokens and self._summary_lines:
+            _, dropped = self._summary_lines.popleft()
+            self._summary_tokens -= dropped
+
+    def _summary_line(self, message):
+        # Only the start of the message can end up in the summary
+        content = message["content"][:400].lstrip()
+        match = _FIRST_SENTENCE.match(content)
+        # Whitespace is collapsed in the sentence only, not in all 400 characters
+        sentence = " ".join((match.group(1) if match else content).split())
+        if not sentence:
+            return None
+        if len(sentence) > 200:
+            sentence = sentence[:200].rsplit(" ", 1)[0] + "..."
+        return f"{message['role'].capitalize()}: {sentence}"
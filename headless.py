@@ -0,0 +1,157 @@
+"""
+Runs the voice pipeline from a terminal, without Tk.
+
+    python headless.py [--config config.json] [--exit-when-ready]
+
+python google.py --headless does the same; it imports the Tk front end only for the GUI.
+
+Press Enter to start recording and Enter again to stop and send what was said. Any
+other line is sent to the model as a typed query. /stop interrupts the current answer,
+/metrics prints p50/p95 per turn stage and exports them, and /quit (or end of input)
+exits.
+"""
+
+import time
+
+STARTUP_STARTED = time.perf_counter()  # Origin of the start-up milestones
+
+import argparse
+import sys
+import threading
+
+from speech_engine import (
+    CONFIG_FILE,
+    MISSING_DEPENDENCIES,
+    SpeechChatEngine,
+    log_startup_milestone,
+)
+from turn_metrics import format_summary
+
+
+class TerminalFrontend:
+    """Prints engine events to stdout. Streamed answer text is written as it arrives."""
+
+    def __init__(self, out=sys.stdout, started=None):
+        self.out = out
+        self.started = started if started is not None else STARTUP_STARTED
+        self.ready = threading.Event()
+        self.epoch = 0
+        self._lock = threading.Lock()
+        self._in_response = False  # A streamed answer is mid-line on the terminal
+
+    def _line(self, text):
+        with self._lock:
+            if self._in_response:
+                self.out.write("\n")
+                self._in_response = False
+            self.out.write(text + "\n")
+            self.out.flush()
+
+    def on_event(self, kind, *args):
+        if kind == "status":
+            self._line(f"[status] {args[0]}")
+        elif kind in ("error", "warning"):
+            title, message = args
+            self._line(f"[{kind}] {title}: {message}")
+        elif kind == "query":
+            self._line(f"You: {args[0]}")
+        elif kind == "query_partial":
+            self._line(f"You (so far): {args[0]} ...")
+        elif kind == "query_note":
+            self._line(f"[asr] {args[0]}")
+        elif kind == "epoch":
+            self.epoch = args[0]
+        elif kind == "response_start":
+            if args[0] == self.epoch:
+                self._line("Ollama:")
+        elif kind == "response_delta":
+            epoch, text = args
+            if epoch == self.epoch:
+                with self._lock:
+                    self.out.write(text)
+                    self.out.flush()
+                    self._in_response = True
+        elif kind == "response_done":
+            if args[0] == self.epoch:
+                self._line("")
+        elif kind == "code_block":
+            epoch, code, language = args
+            if epoch == self.epoch:
+                self._line(f"[code: {language}, {len(code.splitlines())} line(s)]")
+        elif kind == "image":
+            self._line(f"[image] {args[1] or '(no caption)'}")
+        elif kind == "models":
+            names, selected = args
+            self._line(f"[models] {', '.join(names)} (selected: {selected})")
+        elif kind == "microphones":
+            names, selected, _error = args
+            self._line(f"[microphones] {', '.join(names)} (selected: {selected})")
+        elif kind == "microphone_opened":
+            self._line(f"[microphone] {args[0]}")
+        elif kind == "ready":
+            log_startup_milestone("ready", self.started)
+            self.ready.set()
+        elif kind == "response_cache":
+            hits, misses = args
+            self._line(f"[cache] {hits} hits / {misses} misses")
+
+
+def run(config_file=CONFIG_FILE, exit_when_ready=False, started=None):
+    if MISSING_DEPENDENCIES:
+        for message in MISSING_DEPENDENCIES:
+            print(f"Dependency Error: {message}", file=sys.stderr)
+        return 1
+    frontend = TerminalFrontend(started=started)
+    engine = SpeechChatEngine(on_event=frontend.on_event, config_file=config_file)
+    engine.start()
+    if exit_when_ready:
+        frontend.ready.wait()
+        engine.close()
+        return 0
+    print(__doc__.strip().split("\n\n")[-1])
+    try:
+        for line in sys.stdin:
+            command = line.strip()
+            if command == "/quit":
+                break
+            if command == "/stop":
+                engine.interrupt_turn()
+            elif command == "/metrics":
+                print(format_summary(engine.turn_metrics.summary()))
+                engine.export_turn_metrics()
+            elif not command:
+                if engine.is_recording:
+                    engine.mark_hotkey_release()
+                    engine.stop_recording()
+                else:
+                    # Barge-in: the answer still streaming or speaking is abandoned at once
+                    engine.begin_voice_turn()
+                    engine.start_recording()
+            else:
+                engine.interrupt_turn()
+                frontend.on_event("query", command)
+                engine.submit_query(command)
+    except KeyboardInterrupt:
+        pass
+    print("Closing...")
+    engine.close()
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Voice chat with Ollama in the terminal.")
+    parser.add_argument("--config", default=CONFIG_FILE, help="Settings file.")
+    parser.add_argument(
+        "--exit-when-ready",
+        action="store_true",
+        help="Exit once the ASR model and the Ollama model are loaded (start-up benchmark).",
+    )
+    args = parser.parse_args()
+    return run(args.config, args.exit_when_ready)
+
+
+if __name__ == "__main__":
+    import multiprocessing
+
+    multiprocessing.freeze_support()  # The ASR worker runs in a child process
+    raise SystemExit(main())
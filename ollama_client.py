@@ -0,0 +1,82 @@
+import asyncio
+import threading
+
+import httpx
+import ollama
+
+
+class OllamaService:
+    """
+    One long-lived ollama.AsyncClient running on a dedicated asyncio event loop thread.
+
+    Every request is submitted to that loop and returns a concurrent.futures.Future, so
+    the GUI can check on it, wait for it from a worker, or cancel it; cancelling the
+    future cancels the request's task on the loop and closes its HTTP stream. Callers
+    write their requests as coroutines that await self.client and hand them to
+    submit(). All requests share the client's connection pool, so consecutive turns reuse the same
+    keep-alive connection instead of opening a new one. The pool lives in an
+    httpx.AsyncHTTPTransport that this service creates, hands to the client and closes.
+    """
+
+    def __init__(
+        self,
+        host=None,
+        connect_timeout=5.0,
+        read_timeout=120.0,
+        max_keepalive_connections=4,
+        keepalive_expiry=300.0,
+    ):
+        self.host = host or None  # None lets ollama use OLLAMA_HOST or its default
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._run_loop, name="OllamaEventLoop", daemon=True
+        )
+        self._thread.start()
+        self._timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self._limits = httpx.Limits(
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._transport = None  # The connection pool, created with the client
+        # The client (and its connection pool) must belong to the loop that uses it
+        self.client = self.submit(self._create_client()).result()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    async def _create_client(self):
+        # ollama passes extra keyword arguments on to its httpx.AsyncClient; with a
+        # transport of our own, close() can release the pool through public API
+        self._transport = httpx.AsyncHTTPTransport(limits=self._limits)
+        return ollama.AsyncClient(
+            host=self.host, timeout=self._timeout, transport=self._transport
+        )
+
+    def submit(self, coro):
+        """Schedules a coroutine on the client's loop and returns its Future."""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def close(self, timeout=2.0):
+        """Cancels outstanding requests, closes the connection pool and stops the loop."""
+        if not self._loop.is_running():
+            return
+
+        async def _shutdown():
+            tasks = [
+                task
+                for task in asyncio.all_tasks()
+                if task is not asyncio.current_task()
+            ]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            # Closing the transport releases the pooled keep-alive sockets
+            await self._transport.aclose()
+
+        try:
+            self.submit(_shutdown()).result(timeout)
+        except Exception as e:
+            print(f"Ollama client: error during shutdown: {e}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
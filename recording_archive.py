@@ -0,0 +1,115 @@
+import os
+import queue
+import threading
+import time
+import wave
+
+try:
+    import numpy as np
+    import soundfile
+
+    FLAC_AVAILABLE = True
+except ImportError:
+    FLAC_AVAILABLE = False
+
+
+class RecordingArchive:
+    """
+    Background writer for captured utterances.
+
+    submit() only hands the captured chunks to a bounded queue; a writer thread joins
+    them, encodes them as FLAC (or WAV when soundfile is not installed) with a timestamped
+    name, and rotates the archive directory so it never exceeds max_files or max_bytes.
+    Nothing here runs on the transcription path.
+    """
+
+    FILE_PREFIX = "recording_"
+
+    def __init__(
+        self,
+        directory,
+        max_files=50,
+        max_bytes=100 * 1024 * 1024,
+        sample_rate=16000,
+        queue_size=8,
+    ):
+        self.directory = directory
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.sample_rate = sample_rate
+        self.extension = ".flac" if FLAC_AVAILABLE else ".wav"
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._writer, daemon=True)
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread.start()
+
+    def submit(self, frames):
+        """Queues a list of int16 PCM chunks for archiving. Drops it if the writer is behind."""
+        try:
+            self._queue.put_nowait((time.time(), list(frames)))
+        except queue.Full:
+            print("Recording archive: writer is behind, dropping this recording.")
+
+    def _writer(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            timestamp, frames = item
+            try:
+                path = self._write(timestamp, b"".join(frames))
+                print(f"Recording archive: saved {path}")
+                self._rotate()
+            except Exception as e:
+                print(f"Recording archive: failed to save recording: {e}")
+
+    def _write(self, timestamp, pcm_bytes):
+        millis = int((timestamp % 1) * 1000)
+        name = time.strftime("%Y%m%d_%H%M%S", time.localtime(timestamp))
+        path = os.path.join(
+            self.directory, f"{self.FILE_PREFIX}{name}_{millis:03d}{self.extension}"
+        )
+        if FLAC_AVAILABLE:
+            soundfile.write(
+                path,
+                np.frombuffer(pcm_bytes, dtype=np.int16),
+                self.sample_rate,
+                format="FLAC",
+                subtype="PCM_16",
+            )
+        else:
+            with wave.open(path, "wb") as wf:
+                wf.setnchannels(1)  # Mono
+                wf.setsampwidth(2)  # 16-bit
+                wf.setframerate(self.sample_rate)
+                wf.writeframes(pcm_bytes)
+        return path
+
+    def _rotate(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.startswith(self.FILE_PREFIX):
+                path = os.path.join(self.directory, name)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()  # Oldest first
+        total_bytes = sum(size for _, size, _ in entries)
+        while entries and (
+            len(entries) > self.max_files or total_bytes > self.max_bytes
+        ):
+            _, size, path = entries.pop(0)
+            try:
+                os.remove(path)
+                total_bytes -= size
+            except OSError as e:
+                print(f"Recording archive: could not remove {path}: {e}")
+                break
+
+    def close(self, timeout=2.0):
+        """Writes any queued recordings, then stops the writer thread."""
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            print("Recording archive: queue still full on close, abandoning writes.")
+            return
+        self._thread.join(timeout)
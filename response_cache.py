@@ -0,0 +1,140 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+
+_NON_WORD = re.compile(r"[^\w\s]+")
+
+
+def normalize_prompt(prompt):
+    """
+    Reduces a (usually transcribed) question to the form used as its cache key: lower
+    case, punctuation removed, whitespace collapsed. "What's the time format?" and
+    "whats the time format" hit the same entry.
+    """
+    return " ".join(_NON_WORD.sub("", prompt.lower()).split())
+
+
+class ResponseCache:
+    """
+    On-disk cache of complete assistant responses in SQLite.
+
+    Entries are keyed by model, normalized prompt and a hash of the last few history
+    messages, so a context-dependent question ("repeat that") only hits when it follows
+    the same exchange. Expired entries (older than ttl_seconds) are never returned, and
+    the least recently used entries are evicted whenever the stored responses exceed
+    max_bytes. hits and misses count lookups for this session.
+    """
+
+    def __init__(
+        self,
+        path,
+        max_bytes=20 * 1024 * 1024,
+        ttl_seconds=24 * 3600,
+        history_messages=2,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.history_messages = history_messages
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " model TEXT NOT NULL,"
+            " prompt TEXT NOT NULL,"
+            " response TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)"
+        )
+        self._db.commit()
+
+    def make_key(self, model, prompt, history):
+        """history is the sequence of messages sent before the prompt, oldest first."""
+        recent = []
+        # Walked from the end, so the cost does not grow with the history
+        for msg in reversed(history):
+            if len(recent) >= self.history_messages:
+                break
+            # The rolling summary changes on every trim, so it is left out
+            if msg["role"] != "system":
+                recent.append((msg["role"], msg["content"]))
+        recent.reverse()
+        material = json.dumps(
+            [model, normalize_prompt(prompt), recent], ensure_ascii=False
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Returns the stored response, or None on a miss or an expired entry."""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT response, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and now - row[1] > self.ttl_seconds:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._db.execute(
+                "UPDATE responses SET last_used = ? WHERE key = ?", (now, key)
+            )
+            self._db.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, model, prompt, response):
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses"
+                " (key, model, prompt, response, size, created, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model, normalize_prompt(prompt), response, size, now, now),
+            )
+            self._evict(now)
+            self._db.commit()
+
+    def _evict(self, now):
+        self._db.execute(
+            "DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,)
+        )
+        (total,) = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        if total <= self.max_bytes:
+            return
+        # Walk from the least recently used entry until enough space is freed
+        doomed = []
+        for key, size in self._db.execute(
+            "SELECT key, size FROM responses ORDER BY last_used"
+        ):
+            if total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            total -= size
+        self._db.executemany("DELETE FROM responses WHERE key = ?", doomed)
+
+    def stats(self):
+        with self._lock:
+            (entries,) = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,181 @@
+import itertools
+import json
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+
+SESSION_MAGIC = b"VSESSION1\n"
+SESSION_EXTENSION = ".vsession"
+_RECORD_HEADER = struct.Struct(">II")  # JSON length, blob length
+
+
+class SessionRecorder:
+    """
+    Opt-in recorder of whole turns for later replay (see benchmarks/session_replay.py).
+
+    The engine reports each turn's pieces as they happen, keyed by the turn id of its
+    TurnMetrics timeline: the captured PCM, the query, and every streamed token with its
+    offset from the request. When the timeline closes, finish_turn() hands the turn and
+    its stage timings to a writer thread, which appends it as one record to this
+    session's file. Nothing on the turn path touches the disk.
+
+    A session file is SESSION_MAGIC followed by records, each a big-endian (json_length,
+    blob_length) header, a compact JSON object and a blob: zlib-compressed PCM for turns,
+    empty otherwise. The first record describes the session. A file cut short by a crash
+    reads back up to its last complete record. Old session files are rotated beyond
+    max_files.
+    """
+
+    FILE_PREFIX = "session_"
+
+    def __init__(self, directory, session_info=None, max_files=20, queue_size=16):
+        self.directory = directory
+        self.max_files = max_files
+        self.session_info = dict(session_info or {})
+        self.path = None  # Created with the first turn, so idle sessions leave no file
+        self.turns_written = 0
+        self._turns = {}  # turn id -> turn being recorded
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._writer, daemon=True)
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread.start()
+
+    def _turn(self, turn_id):
+        return self._turns.setdefault(
+            turn_id, {"query": None, "input": None, "tokens": [], "pcm": b""}
+        )
+
+    def add_audio(self, turn_id, pcm, sample_rate):
+        with self._lock:
+            turn = self._turn(turn_id)
+            turn["pcm"] = pcm
+            turn["sample_rate"] = sample_rate
+
+    def set_query(self, turn_id, text, source):
+        """Records what was asked; source is "voice" or "text". The first call wins."""
+        with self._lock:
+            turn = self._turn(turn_id)
+            if turn["query"] is None:
+                turn["query"] = text
+                turn["input"] = source
+
+    def add_token(self, turn_id, offset_seconds, text):
+        """Records a streamed piece of the answer, offset_seconds after the request."""
+        with self._lock:
+            self._turn(turn_id)["tokens"].append((round(offset_seconds, 4), text))
+
+    def set_response_info(self, turn_id, **info):
+        """Extra facts about the answer, e.g. cached=True or Ollama's token counts."""
+        with self._lock:
+            self._turn(turn_id).update(info)
+
+    def finish_turn(self, turn_id, timeline):
+        """Queues the turn with its timeline (TurnTimeline.to_dict()) for writing."""
+        with self._lock:
+            turn = self._turns.pop(turn_id, None)
+        if turn is None or (turn["query"] is None and not turn["pcm"]):
+            return  # Nothing was asked, e.g. a press that never reached recording
+        turn["turn"] = turn_id
+        turn["timeline"] = timeline
+        try:
+            self._queue.put_nowait(turn)
+        except queue.Full:
+            print("Session recorder: writer is behind, dropping this turn.")
+
+    def _open(self):
+        started_at = time.time()
+        # Microseconds keep names apart (and in order) for sessions started in the same
+        # second; "xb" never appends to another session's file, a suffix is added instead
+        stamp = time.strftime("%Y%m%d_%H%M%S", time.localtime(started_at))
+        stamp += f"_{int(started_at % 1 * 1e6):06d}"
+        for attempt in itertools.count():
+            suffix = f"_{attempt}" if attempt else ""
+            self.path = os.path.join(
+                self.directory, f"{self.FILE_PREFIX}{stamp}{suffix}{SESSION_EXTENSION}"
+            )
+            try:
+                f = open(self.path, "xb")
+                break
+            except FileExistsError:
+                continue
+        f.write(SESSION_MAGIC)
+        _write_record(f, {"kind": "session", "started_at": started_at, **self.session_info})
+        self._rotate()
+        return f
+
+    def _writer(self):
+        f = None
+        while True:
+            turn = self._queue.get()
+            if turn is None:
+                break
+            try:
+                if f is None:
+                    f = self._open()
+                pcm = turn.pop("pcm")
+                turn["kind"] = "turn"
+                _write_record(f, turn, zlib.compress(pcm, 6) if pcm else b"")
+                f.flush()
+                self.turns_written += 1
+            except Exception as e:
+                print(f"Session recorder: failed to write turn {turn.get('turn')}: {e}")
+        if f is not None:
+            f.close()
+            print(f"Session recorder: {self.turns_written} turn(s) saved to {self.path}")
+
+    def _rotate(self):
+        entries = sorted(
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.startswith(self.FILE_PREFIX) and name.endswith(SESSION_EXTENSION)
+        )  # Timestamped names sort oldest first
+        for path in entries[: max(0, len(entries) - self.max_files)]:
+            try:
+                os.remove(path)
+            except OSError as e:
+                print(f"Session recorder: could not remove {path}: {e}")
+
+    def close(self, timeout=2.0):
+        """Writes the queued turns, then stops the writer thread."""
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            print("Session recorder: queue still full on close, abandoning writes.")
+            return
+        self._thread.join(timeout)
+
+
+def _write_record(f, obj, blob=b""):
+    data = json.dumps(obj, separators=(",", ":")).encode("utf-8")
+    f.write(_RECORD_HEADER.pack(len(data), len(blob)) + data + blob)
+
+
+def read_session(path):
+    """
+    Returns (session_info, turns) from a session file. Each turn is the dict written by
+    SessionRecorder with its PCM decompressed into turn["pcm"] (bytes, maybe empty).
+    """
+    session_info, turns = {}, []
+    with open(path, "rb") as f:
+        if f.read(len(SESSION_MAGIC)) != SESSION_MAGIC:
+            raise ValueError(f"{path} is not a session file")
+        while True:
+            header = f.read(_RECORD_HEADER.size)
+            if len(header) < _RECORD_HEADER.size:
+                break
+            json_length, blob_length = _RECORD_HEADER.unpack(header)
+            data, blob = f.read(json_length), f.read(blob_length)
+            if len(data) < json_length or len(blob) < blob_length:
+                print(f"{path}: last record is incomplete, ignoring it.")
+                break
+            record = json.loads(data)
+            if record.get("kind") == "session":
+                session_info = record
+            elif record.get("kind") == "turn":
+                record["pcm"] = zlib.decompress(blob) if blob else b""
+                turns.append(record)
+    return session_info, turns
@@ -0,0 +1,1713 @@
+import importlib.util
+import json
+import os
+import queue
+import re
+import sys
+import threading
+import time
+
+from asr_backends import (
+    ASR_BACKENDS,
+    DEFAULT_ASR_BACKEND,
+    asr_backend_available,
+    select_asr_backend,
+)
+from asr_worker import ASRWorkerProcess
+from audio_capture import AudioCaptureService
+from context_window import (
+    MESSAGE_OVERHEAD_TOKENS,
+    ContextWindow,
+    context_length_from_show,
+)
+from response_cache import ResponseCache
+from text_stream import (
+    FenceTokenizer,
+    SentenceSegmenter,
+    SpeechFilter,
+    StreamingTextCleaner,
+)
+from tts_cache import SpeechCache
+from tts_output import PCMPlayer, render_to_pcm
+from turn_metrics import TurnMetrics
+
+
+def module_available(name):
+    """True if name can be imported. Only looks the module up; nothing is imported."""
+    return importlib.util.find_spec(name) is not None
+
+
+# External libraries. They are imported where they are first used, so start-up does not
+# pay for them; a missing one is recorded here instead, so the GUI can show a dialog and
+# the headless runner can print it before the engine is created.
+REQUIRED_DEPENDENCIES = {
+    "ollama": "The 'ollama' library is not installed. Please install it with: pip install ollama",
+    "pyaudio": "The 'PyAudio' library is not installed. Please install it with: pip install pyaudio\n(Also ensure PortAudio is installed on your system).",
+    "pyttsx3": "The 'pyttsx3' library is not installed. Please install it with: pip install pyttsx3\n(Also ensure espeak or other TTS backend is installed on your system).",
+}
+MISSING_DEPENDENCIES = [
+    message
+    for name, message in REQUIRED_DEPENDENCIES.items()
+    if not module_available(name)
+]
+
+# Speech recognition itself runs in the ASR worker process; this process only needs
+# NumPy for audio buffers and one installed backend (openai-whisper or faster-whisper).
+WHISPER_AVAILABLE = module_available("numpy") and any(
+    asr_backend_available(name) for name in ASR_BACKENDS
+)
+WHISPER_MISSING_MESSAGE = "Whisper or NumPy not found. Offline speech recognition will be disabled. Install with: pip install openai-whisper numpy (or pip install faster-whisper numpy)"
+
+# Imports worth knowing about at start-up: each costs noticeable time or memory
+HEAVY_MODULES = (
+    "torch",
+    "whisper",
+    "faster_whisper",
+    "numpy",
+    "ollama",
+    "httpx",
+    "pygments",
+    "PIL",
+    "pyaudio",
+    "pyttsx3",
+    "keyboard",
+)
+
+
+def log_startup_milestone(name, started):
+    """Prints how long start-up took to reach name and which heavy modules it loaded."""
+    loaded = [module for module in HEAVY_MODULES if module in sys.modules]
+    print(
+        f"Startup: {name} after {time.perf_counter() - started:.3f} s "
+        f"(heavy modules loaded: {', '.join(loaded) or 'none'})."
+    )
+
+
+# Configuration File
+CONFIG_FILE = "config.json"
+
+# Default Settings
+DEFAULT_SETTINGS = {
+    "theme_mode": "System",
+    "color_theme": "blue",
+    "ollama_model": "llama2",
+    "hotkey_str": "alt",
+    "tts_voice_id": None,
+    "tts_rate": 180,
+    "tts_volume": 1.0,
+    "font_size": 14,
+    "ollama_num_ctx": 4096,  # Context window requested from Ollama, unless the model's Modelfile sets num_ctx
+    "context_reserve_tokens": 1024,  # Part of the context kept free for the reply
+    "context_summary": True,  # Fold turns that no longer fit into a short summary instead of dropping them
+    "context_summary_max_tokens": 200,
+    "context_trim_ratio": 0.6,  # When history overflows, trim it to this share of the budget in one step
+    "ollama_host": "",  # Empty uses OLLAMA_HOST or http://127.0.0.1:11434
+    "ollama_connect_timeout": 5.0,  # Seconds
+    "ollama_read_timeout": 120.0,  # Seconds to wait for the next bytes of a response
+    "ollama_keep_alive": "30m",  # How long Ollama keeps the model loaded after the last request
+    "ollama_preload": True,  # Load the selected model at startup and on switch, before the first query
+    "response_cache_enabled": True,  # Answer repeated questions from an on-disk cache
+    "response_cache_bypass": False,  # Sidebar toggle: skip the cache without disabling it
+    "response_cache_path": "response_cache.sqlite3",
+    "response_cache_max_mb": 20,  # Least recently used answers are evicted beyond this
+    "response_cache_ttl_hours": 24.0,  # Cached answers older than this are not reused
+    "response_cache_history_messages": 2,  # Preceding messages that must match for a hit
+    "whisper_model_name": "base",  # e.g., "tiny", "base", "small", "medium", "large"
+    "asr_backend": "whisper",  # "whisper" (openai-whisper) or "faster-whisper" (CTranslate2, int8)
+    "asr_compute_type": "int8",  # faster-whisper only: "int8", "int8_float32", "float32", ...
+    "asr_cpu_threads": 0,  # faster-whisper only: 0 lets CTranslate2 decide
+    "selected_mic_index": -1,  # -1 means no specific mic selected, will try default or first available
+    "streaming_transcription": True,  # Decode finished windows while the hotkey is still held
+    "streaming_window_seconds": 5.0,  # Length of each background Whisper window
+    "preroll_seconds": 1.0,  # Audio kept from before the hotkey press and prepended to each capture
+    "vad_enabled": True,  # Trim silence before decoding and skip audio with no speech
+    "vad_min_energy_db": -50.0,  # Frames quieter than this (dBFS) never count as speech
+    "vad_padding_ms": 200,  # Audio kept around detected speech
+    "tts_mode": "buffered",  # "buffered" renders sentences ahead of playback, "direct" uses say()/runAndWait()
+    "tts_lookahead_sentences": 2,  # Rendered sentences kept ready ahead of the one playing
+    "tts_max_chunk_chars": 500,  # Text without a sentence boundary is spoken once it gets this long
+    "tts_skip_code": True,  # Replace code blocks, tables and URLs with a short spoken placeholder
+    "tts_block_frames": 512,  # Audio written per check for a stop; smaller goes silent sooner
+    "tts_cache_enabled": True,  # Reuse synthesized sentences (buffered mode only)
+    "tts_cache_dir": "tts_cache",
+    "tts_cache_max_mb": 50,  # Least recently played sentences are evicted beyond this
+    "tts_cache_prewarm_phrases": [  # Synthesized into the cache at startup while TTS is idle
+        "The code is shown on screen.",
+        "The table is shown on screen.",
+    ],
+    "ui_max_fps": 30,  # How often streamed text and status updates are drawn
+    "archive_recordings": False,  # Save each utterance (FLAC) in a background thread for debugging
+    "recording_archive_dir": "recordings",
+    "recording_archive_max_files": 50,
+    "recording_archive_max_mb": 100,
+    "metrics_max_turns": 200,  # Turn timelines kept in memory for the JSONL export
+    "metrics_window_turns": 200,  # Recent samples per stage behind the p50/p95 figures
+    "metrics_export_dir": "metrics",  # Where turns.jsonl and turn_metrics.prom are written
+    "metrics_export_on_exit": False,  # Write both files when the app closes
+    "session_recording": False,  # Save each turn's audio, token timing and stage timings for replay
+    "session_dir": "sessions",
+    "session_max_files": 20,  # Oldest session files are removed beyond this
+}
+
+# A reply whose load_duration exceeds this had to wait for the model to be loaded
+OLLAMA_COLD_LOAD_SECONDS = 0.5
+
+# Audio capture format shared by recording and transcription
+AUDIO_SAMPLE_RATE = 16000
+AUDIO_SAMPLE_WIDTH = 2  # bytes per int16 sample
+
+NO_MODELS = "No models found"
+NO_MICS = "No mics"
+
+
+def find_quiet_split(audio_np, search_start, search_end, frame_len=320):
+    """
+    Returns the sample index of the quietest 20 ms frame between search_start and
+    search_end, so streaming windows are cut between words rather than through them.
+    """
+    import numpy as np
+
+    search_start = max(0, search_start)
+    search_end = min(len(audio_np), search_end)
+    n_frames = (search_end - search_start) // frame_len
+    if n_frames <= 0:
+        return search_end
+    region = audio_np[search_start : search_start + n_frames * frame_len]
+    energy = np.square(region.reshape(n_frames, frame_len)).mean(axis=1)
+    return search_start + int(np.argmin(energy)) * frame_len + frame_len // 2
+
+
+# Control messages for the TTS queues, compared by identity
+TTS_STOP = object()
+TTS_SETTINGS_CHANGED = object()
+TTS_FLUSH = object()  # End of a response: speak any unterminated trailing text
+TTS_SHUTDOWN = object()
+
+
+class Utterance:
+    """
+    One push-to-talk recording: its captured frames and the streaming transcription
+    state. start_recording() creates it and hands it to that turn's streaming and
+    transcription threads, so a new press never changes the audio or text of a turn
+    still being transcribed. epoch is the turn epoch it was recorded in.
+    """
+
+    def __init__(self, epoch, turn_id, frames):
+        self.epoch = epoch
+        self.turn_id = turn_id
+        self.frames = frames  # Grows while recording; the final list once stopped
+        self.recording = True
+        self.committed_text = ""  # Text of the windows decoded while recording
+        self.pending_audio = bytearray()  # Captured but not decoded yet
+        self.consumed_frames = 0  # Frames moved into pending_audio so far
+        self.streaming_thread = None
+        self.vad_stats = {
+            "audio_seconds": 0.0,
+            "trimmed_seconds": 0.0,
+            "skipped_decodes": 0,
+            "decoded_seconds": 0.0,
+            "decode_time": 0.0,
+        }
+
+
+class SpeechChatEngine:
+    """
+    The voice pipeline without a user interface: microphone capture, transcription in the
+    ASR worker process, the streaming Ollama chat and buffered text-to-speech.
+
+    A front end drives it through start(), start_recording()/stop_recording(),
+    submit_query(), interrupt_turn() and close(), and receives everything it should show
+    through on_event(kind, *args), which is called from whichever worker thread produced
+    the event and must not block:
+
+    - ("status", message, color) and ("error" | "warning", title, message)
+    - ("query", text) replaces the transcribed query, ("query_partial", text) shows
+      streaming progress and ("query_note", text) is appended to it
+    - ("response_start", epoch), ("response_delta", epoch, text) and
+      ("response_done", epoch, text) for the streamed answer; ("code_block", epoch,
+      code, language) and ("image", base64_data, caption) for content shown beside it
+    - ("epoch", epoch) whenever an interruption starts a new turn epoch
+    - ("models", names, selected), ("microphones", names, selected, error) and
+      ("microphone_opened", name) for the device and model pickers
+    - ("response_cache", hits, misses) after every cache lookup
+    - ("turn_metrics", summary) whenever a stage duration is recorded, with summary as
+      returned by TurnMetrics.summary()
+    - ("ready",) once, when the ASR worker and the selected model have both finished
+      loading (or failed to), which is when the first turn no longer waits on start-up
+    """
+
+    def __init__(self, on_event=None, config_file=CONFIG_FILE):
+        self.on_event = on_event
+        self.config_file = config_file
+        self.status_message = ""
+
+        self.context_window = None  # Created once the settings are loaded
+        self.ollama_num_ctx = DEFAULT_SETTINGS["ollama_num_ctx"]
+        # Recent time-to-first-token samples, split by whether the model had to load
+        self.ttft_samples = {"warm": [], "cold": []}
+        self.turn_metrics = None  # Stage timestamps of each turn, see mark_hotkey_press
+
+        self.is_recording = False
+        self.utterance = None  # The latest recording, see Utterance
+        self.transcription_thread = None
+        self.streaming_transcription_thread = None
+        self.recording_archive = None
+        self.session_recorder = None  # Opt-in, see session_recording
+        self.asr_worker = None  # Whisper runs in its own process, see load_asr_model
+        self.ollama_service = None  # Persistent async Ollama client, created in start()
+        self.ollama_chat_future = None  # The streaming chat in flight, if any
+        self.ollama_model_future = None  # Model info lookup and preload in flight, if any
+        self.response_cache = None
+        self.tts_thread = None
+        self.available_mics_info = []
+        self._startup_pending = {"asr", "model"}  # Parts start() is still waiting for
+
+        self.tts_text_queue = queue.Queue()
+        # Every turn and every interruption starts a new epoch. Text chunks, rendered
+        # sentences and response text are tagged with the epoch they belong to, and each
+        # stage drops anything from an older one on sight.
+        self.turn_epoch = 0
+        self.interrupt_started = None  # perf_counter() of the last interruption
+        self.tts_synthesis_queue = queue.Queue()
+        self.tts_audio_queue = None  # Bounded by tts_lookahead_sentences once settings load
+        self.tts_synthesis_thread = None
+        self.tts_audio_thread = None
+        self.tts_player = None
+        self.tts_cache = None
+        # (rate, volume) the synthesis thread last applied to its engine. Sentences
+        # queued before a settings change are still rendered with the old values, so
+        # the speech cache keys on these rather than on self.settings.
+        self.tts_applied_voice = None
+
+        self.settings = DEFAULT_SETTINGS.copy()
+        self.load_config()
+        self.ollama_num_ctx = int(self.settings.get("ollama_num_ctx", 4096))
+        self.context_window = ContextWindow(
+            context_tokens=self.ollama_num_ctx,
+            reserve_tokens=int(self.settings.get("context_reserve_tokens", 1024)),
+            summarize=self.settings.get("context_summary", True),
+            summary_max_tokens=int(self.settings.get("context_summary_max_tokens", 200)),
+            trim_ratio=float(self.settings.get("context_trim_ratio", 0.6)),
+        )
+        if self.settings.get("tts_cache_enabled", True):
+            try:
+                self.tts_cache = SpeechCache(
+                    self.settings.get("tts_cache_dir", "tts_cache"),
+                    max_bytes=int(
+                        float(self.settings.get("tts_cache_max_mb", 50)) * 1024 * 1024
+                    ),
+                )
+            except OSError as e:
+                print(f"Speech cache unavailable: {e}")
+        if self.settings.get("response_cache_enabled", True):
+            try:
+                max_mb = float(self.settings.get("response_cache_max_mb", 20))
+                ttl_hours = float(self.settings.get("response_cache_ttl_hours", 24.0))
+                self.response_cache = ResponseCache(
+                    self.settings.get("response_cache_path", "response_cache.sqlite3"),
+                    max_bytes=int(max_mb * 1024 * 1024),
+                    ttl_seconds=ttl_hours * 3600,
+                    history_messages=int(
+                        self.settings.get("response_cache_history_messages", 2)
+                    ),
+                )
+            except Exception as e:
+                print(f"Response cache unavailable: {e}")
+        self.audio_capture = self.create_audio_capture()
+        if self.settings.get("archive_recordings", False):
+            from recording_archive import RecordingArchive  # Loads NumPy and soundfile
+
+            self.recording_archive = RecordingArchive(
+                self.settings.get("recording_archive_dir", "recordings"),
+                max_files=int(self.settings.get("recording_archive_max_files", 50)),
+                max_bytes=int(
+                    float(self.settings.get("recording_archive_max_mb", 100))
+                    * 1024
+                    * 1024
+                ),
+                sample_rate=AUDIO_SAMPLE_RATE,
+            )
+
+        self.tts_audio_queue = queue.Queue(
+            maxsize=max(1, int(self.settings.get("tts_lookahead_sentences", 2)))
+        )
+        self.turn_metrics = TurnMetrics(
+            max_turns=int(self.settings.get("metrics_max_turns", 200)),
+            window=int(self.settings.get("metrics_window_turns", 200)),
+            on_finish=self._on_turn_finished,
+        )
+        if self.settings.get("session_recording", False):
+            from session_recorder import SessionRecorder
+
+            self.session_recorder = SessionRecorder(
+                self.settings.get("session_dir", "sessions"),
+                session_info={
+                    key: self.settings.get(key)
+                    for key in (
+                        "ollama_model",
+                        "asr_backend",
+                        "whisper_model_name",
+                        "tts_mode",
+                        "tts_rate",
+                        "tts_volume",
+                        "tts_skip_code",
+                        "tts_max_chunk_chars",
+                    )
+                },
+                max_files=int(self.settings.get("session_max_files", 20)),
+            )
+
+    # Device factories. The offline benchmarks override them to swap the microphone and
+    # the speakers (and pyttsx3) for stand-ins, see benchmarks/e2e_bench.py.
+
+    def create_audio_capture(self):
+        return AudioCaptureService(
+            rate=AUDIO_SAMPLE_RATE,
+            on_error=self._on_audio_capture_error,
+            preroll_seconds=float(self.settings.get("preroll_seconds", 1.0)),
+        )
+
+    def create_tts_engine(self):
+        """Returns a pyttsx3 engine. Called on the thread that will use it."""
+        import pyttsx3
+
+        return pyttsx3.init()
+
+    def create_tts_player(self):
+        return PCMPlayer(block_frames=int(self.settings.get("tts_block_frames", 512)))
+
+    def _emit(self, kind, *args):
+        if self.on_event:
+            try:
+                self.on_event(kind, *args)
+            except Exception as e:
+                print(f"Engine: error in {kind} event handler: {e}")
+
+    def _update_status(self, message, color="white"):
+        self.status_message = message
+        self._emit("status", message, color)
+
+    def _show_error_message(self, title, message):
+        self._emit("error", title, message)
+
+    def _startup_done(self, part):
+        if part in self._startup_pending:
+            self._startup_pending.discard(part)
+            if not self._startup_pending:
+                self._emit("ready")
+
+    def _mark_stage(self, stage, epoch=None):
+        """Timestamps a stage boundary of the current turn; see TurnMetrics.mark."""
+        if self.turn_metrics.mark(stage, epoch):
+            self._emit("turn_metrics", self.turn_metrics.summary())
+
+    def _on_turn_finished(self, timeline):
+        if self.session_recorder:
+            self.session_recorder.finish_turn(timeline.turn_id, timeline.to_dict())
+
+    def mark_hotkey_press(self):
+        """Called by the front end the moment the push-to-talk key goes down."""
+        self.turn_metrics.begin_turn()
+        self._mark_stage("hotkey_press")
+        # Closing the previous timeline records its playback span
+        self._emit("turn_metrics", self.turn_metrics.summary())
+
+    def begin_voice_turn(self):
+        """
+        The push-to-talk key went down: abandons the answer still streaming or speaking,
+        then opens the new turn's timeline. In this order the old timeline is still the
+        current one when interrupt_turn() flags it as cut short.
+        """
+        self.interrupt_turn()
+        self.mark_hotkey_press()
+
+    def mark_hotkey_release(self):
+        self._mark_stage("hotkey_release")
+
+    def export_turn_metrics(self):
+        """
+        Writes the stored turn timelines as JSONL and the stage histograms in the
+        Prometheus text format into metrics_export_dir. Returns both paths.
+        """
+        directory = self.settings.get("metrics_export_dir", "metrics")
+        jsonl_path = os.path.join(directory, "turns.jsonl")
+        prometheus_path = os.path.join(directory, "turn_metrics.prom")
+        try:
+            turns = self.turn_metrics.export_jsonl(jsonl_path)
+            self.turn_metrics.export_prometheus(prometheus_path)
+        except OSError as e:
+            self._show_error_message("Metrics Error", f"Could not export turn metrics: {e}")
+            return None
+        print(
+            f"Exported {turns} turn timeline(s) to {jsonl_path} and {prometheus_path}."
+        )  # Debug print
+        self._update_status(f"Turn metrics exported to {directory}.", "green")
+        return jsonl_path, prometheus_path
+
+    def ready_message(self):
+        return f"Ready. Press and hold '{self.settings['hotkey_str']}' to speak..."
+
+    def start(self):
+        """Starts the TTS workers and the background start-up tasks."""
+        # ollama and httpx are imported here rather than at module load, so a front end
+        # can show its window before paying for them
+        from ollama_client import OllamaService
+
+        self.ollama_service = OllamaService(
+            host=self.settings.get("ollama_host", ""),
+            connect_timeout=float(self.settings.get("ollama_connect_timeout", 5.0)),
+            read_timeout=float(self.settings.get("ollama_read_timeout", 120.0)),
+        )
+        self._start_tts_playback_thread()
+        print("Performing initial background tasks...")
+        self.fetch_ollama_models()  # Runs on the Ollama event loop
+        self.fetch_microphones()  # This will start its own thread
+        self.load_asr_model()  # Starts the ASR worker process; readiness is reported back asynchronously
+
+    def load_config(self):
+        if os.path.exists(self.config_file):
+            try:
+                with open(self.config_file, "r") as f:
+                    loaded_settings = json.load(f)
+                    self.settings.update(loaded_settings)
+            except json.JSONDecodeError:
+                self._emit(
+                    "warning",
+                    "Config Error",
+                    f"Could not decode {self.config_file}. Using default settings.",
+                )
+        if not isinstance(self.settings.get("hotkey_str"), str):
+            self.settings["hotkey_str"] = DEFAULT_SETTINGS["hotkey_str"]
+        if "whisper_model_name" not in self.settings:
+            self.settings["whisper_model_name"] = DEFAULT_SETTINGS["whisper_model_name"]
+        if "selected_mic_index" not in self.settings:
+            self.settings["selected_mic_index"] = DEFAULT_SETTINGS["selected_mic_index"]
+
+    def save_config(self):
+        try:
+            with open(self.config_file, "w") as f:
+                json.dump(self.settings, f, indent=4)
+        except IOError as e:
+            self._show_error_message("Config Error", f"Could not save configuration: {e}")
+
+    # --- Ollama ---
+
+    def fetch_ollama_models(self):
+        import ollama
+
+        async def _fetch():
+            model_names = [NO_MODELS]
+            selected_model = NO_MODELS
+            status_color = "red"
+            status_message = "No Ollama models found."
+            error_msg = None
+            try:
+                self._update_status("Fetching Ollama models...", "orange")
+                models_info = await self.ollama_service.client.list()
+
+                extracted_model_names = []
+                # The ollama.list() returns a ListResponse object, which has a 'models'
+                # attribute; the model name is in the 'model' attribute of each entry
+                if hasattr(models_info, "models") and isinstance(
+                    models_info.models, list
+                ):
+                    for m_obj in models_info.models:
+                        if hasattr(m_obj, "model") and m_obj.model:
+                            extracted_model_names.append(m_obj.model)
+
+                model_names = extracted_model_names
+
+                if not model_names:
+                    error_msg = "No Ollama models found. Download one (e.g., 'ollama run llama2') and ensure Ollama server is running."
+                else:
+                    if self.settings["ollama_model"] in model_names:
+                        selected_model = self.settings["ollama_model"]
+                    else:
+                        selected_model = model_names[0]
+                        self.settings["ollama_model"] = model_names[0]
+                        self.save_config()
+                    status_message = f"Ready. Selected: {selected_model}"
+                    status_color = "green"
+            except ollama.ResponseError as e:
+                error_msg = f"Error connecting to Ollama server: {e}\nPlease ensure Ollama server is running."
+                status_message = "Ollama server connection failed."
+                status_color = "red"
+            except Exception as e:
+                error_msg = f"Unexpected error fetching Ollama models: {e}"
+                status_message = "Failed to load models."
+                status_color = "red"
+            self._emit("models", model_names or [NO_MODELS], selected_model)
+            self._update_status(status_message, status_color)
+            if error_msg:
+                self._show_error_message("Ollama Error", error_msg)
+                self._startup_done("model")
+            elif selected_model != NO_MODELS:
+                self._refresh_model_context(selected_model)
+
+        self.ollama_service.submit(_fetch())
+
+    def select_ollama_model(self, model_name):
+        self.settings["ollama_model"] = model_name
+        self.save_config()
+        self._update_status(f"Model selected: {model_name}", "green")
+        self._refresh_model_context(model_name)
+
+    def _refresh_model_context(self, model_name):
+        """
+        Sizes the history budget from the model's context length as reported by
+        ollama.show. A num_ctx set in the model's Modelfile wins; otherwise the
+        ollama_num_ctx setting is used (capped at what the model supports) and passed
+        with every request so Ollama allocates the same window that is budgeted here.
+        """
+
+        async def _show():
+            try:
+                context_length, model_num_ctx = context_length_from_show(
+                    await self.ollama_service.client.show(model_name)
+                )
+            except Exception as e:
+                print(f"Could not read context length of {model_name}: {e}")
+            else:
+                num_ctx = model_num_ctx or int(
+                    self.settings.get("ollama_num_ctx", 4096)
+                )
+                if context_length:
+                    num_ctx = min(num_ctx, context_length)
+                self.ollama_num_ctx = num_ctx
+                self.context_window.set_context_tokens(num_ctx)
+                print(
+                    f"Context window for {model_name}: {num_ctx} tokens "
+                    f"(model supports {context_length or 'unknown'}), history budget "
+                    f"{self.context_window.budget} tokens."
+                )  # Debug print
+            # Preload only once num_ctx is known: a different num_ctx makes Ollama reload
+            await self._preload_ollama_model(model_name)
+            self._startup_done("model")
+
+        # A newer selection supersedes a lookup or preload that is still running
+        if self.ollama_model_future:
+            self.ollama_model_future.cancel()
+        self.ollama_model_future = self.ollama_service.submit(_show())
+
+    def _ollama_request_options(self):
+        """Options sent with every request, so preloads and chats share one loaded model."""
+        return {
+            "keep_alive": self.settings.get("ollama_keep_alive", "30m"),
+            "options": {"num_ctx": self.ollama_num_ctx},
+        }
+
+    async def _preload_ollama_model(self, model_name):
+        """
+        Loads the model into memory with an empty chat request, so the first query
+        after startup or a model switch does not pay for the load inside the turn.
+        """
+        if not self.settings.get("ollama_preload", True):
+            return
+        self._update_status(f"Loading {model_name}...", "orange")
+        start = time.perf_counter()
+        try:
+            await self.ollama_service.client.chat(
+                model=model_name, messages=[], **self._ollama_request_options()
+            )
+        except Exception as e:
+            print(f"Preloading {model_name} failed: {e}")
+            self._update_status(f"Could not preload {model_name}.", "yellow")
+            return
+        print(
+            f"Preloaded {model_name} in {time.perf_counter() - start:.2f} s."
+        )  # Debug print
+        self._update_status(
+            f"Ready. {model_name} loaded. Press and hold '{self.settings['hotkey_str']}' to speak...",
+            "green",
+        )
+
+    def _record_ttft(self, ttft, load_seconds):
+        """Stores a time-to-first-token sample and returns a short description of it."""
+        kind = "cold" if load_seconds > OLLAMA_COLD_LOAD_SECONDS else "warm"
+        samples = self.ttft_samples[kind]
+        samples.append(ttft)
+        del samples[:-50]  # Keep the most recent samples only
+        average = sum(samples) / len(samples)
+        print(
+            f"Time to first token: {ttft:.2f} s ({kind}, model load {load_seconds:.2f} s); "
+            f"average {kind} over {len(samples)} turn(s): {average:.2f} s."
+        )  # Debug print
+        return f"first token {ttft:.2f} s, {kind}"
+
+    def _update_response_cache_stats(self):
+        if self.response_cache:
+            self._emit(
+                "response_cache", self.response_cache.hits, self.response_cache.misses
+            )
+
+    def submit_query(self, query):
+        """Sends query to the selected model and streams the answer to the display and TTS."""
+        if (
+            not self.settings["ollama_model"]
+            or self.settings["ollama_model"] == NO_MODELS
+        ):
+            self._show_error_message("Ollama Error", "No Ollama model selected.")
+            self._update_status("No model selected. Cannot converse.", "red")
+            return
+
+        import asyncio  # Already loaded by the Ollama client; ~70 ms at module load
+
+        import ollama
+
+        # Everything this response produces is tagged with the epoch it started in
+        epoch = self.turn_epoch
+        # A typed query, or one sent after the last turn's request, starts its own timeline
+        turn_id = self.turn_metrics.ensure_turn("request_sent").turn_id
+        self.turn_metrics.set_epoch(epoch)
+        recorder = self.session_recorder
+        if recorder:
+            recorder.set_query(turn_id, query, "text")  # A transcribed query was set already
+
+        async def _send():
+            self._update_status("Thinking...", "orange")
+            self._emit("response_start", epoch)
+
+            # The context window drops (or summarizes) the oldest turns as it grows
+            self.context_window.append("user", query)
+            messages_for_ollama = self.context_window.select()
+            sent_tokens = self.context_window.selected_tokens()
+            sent_chars = self.context_window.selected_chars()
+            usage = {}
+            full_response_content = ""
+            code_block = {"language": "text", "parts": []}
+
+            def show_code_blocks(events):
+                for kind, value in events:
+                    if kind == "code_start":
+                        code_block["language"] = value
+                        code_block["parts"] = []
+                    elif kind == "code_delta":
+                        code_block["parts"].append(value)
+                    elif kind == "code_end":
+                        code = "".join(code_block["parts"])
+                        if code.strip():
+                            self._emit(
+                                "code_block", epoch, code, code_block["language"]
+                            )
+
+            # Code blocks, tables and URLs are shown on screen but not read aloud; the
+            # filter finds the fences for the code viewer in the same scan of each chunk
+            speech_filter = (
+                SpeechFilter() if self.settings.get("tts_skip_code", True) else None
+            )
+            fence_tokenizer = None if speech_filter else FenceTokenizer()
+            # Strips <think> regions and unspeakable characters in one pass over the stream
+            text_cleaner = StreamingTextCleaner()
+
+            def handle_content(content_chunk):
+                """Shows a piece of the answer and hands its speakable part to TTS."""
+                self._emit("response_delta", epoch, content_chunk)
+                if speech_filter:
+                    speakable = speech_filter.feed(content_chunk)
+                    show_code_blocks(speech_filter.take_fence_events())
+                else:
+                    speakable = content_chunk
+                    show_code_blocks(fence_tokenizer.feed(content_chunk))
+                speakable = text_cleaner.feed(speakable)
+                if speakable:
+                    self.tts_text_queue.put((epoch, speakable))
+
+            model_name = self.settings["ollama_model"]
+            cache_key = None
+            cached_response = None
+            if self.response_cache and not self.settings.get("response_cache_bypass"):
+                cache_key = self.response_cache.make_key(
+                    model_name, query, messages_for_ollama[:-1]
+                )
+                cached_response = self.response_cache.get(cache_key)
+                self._update_response_cache_stats()
+            try:
+                request_start = time.perf_counter()
+                self._mark_stage("request_sent", epoch)
+                ttft = None
+                if cached_response is not None:
+                    # Goes through the same display and TTS path as a streamed answer
+                    print("Response cache hit: answering without Ollama.")  # Debug print
+                    full_response_content = cached_response
+                    self._mark_stage("first_token", epoch)
+                    if recorder:
+                        recorder.add_token(turn_id, 0.0, cached_response)
+                        recorder.set_response_info(turn_id, cached=True)
+                    handle_content(cached_response)
+                else:
+                    response_generator = await self.ollama_service.client.chat(
+                        model=model_name,
+                        messages=messages_for_ollama,
+                        stream=True,
+                        **self._ollama_request_options(),
+                    )
+                    async for chunk in response_generator:
+                        if chunk.get("done"):
+                            # The final chunk carries Ollama's token counts for this turn
+                            usage["prompt_eval_count"] = chunk.get("prompt_eval_count")
+                            usage["eval_count"] = chunk.get("eval_count")
+                            usage["load_duration"] = chunk.get("load_duration")
+                        if chunk["message"]["content"]:
+                            content_chunk = chunk["message"]["content"]
+                            if ttft is None:
+                                ttft = time.perf_counter() - request_start
+                                self._mark_stage("first_token", epoch)
+                            if recorder:
+                                recorder.add_token(
+                                    turn_id,
+                                    time.perf_counter() - request_start,
+                                    content_chunk,
+                                )
+                            full_response_content += content_chunk
+                            handle_content(content_chunk)
+                    if cache_key and full_response_content:
+                        self.response_cache.put(
+                            cache_key, model_name, query, full_response_content
+                        )
+                # Closes a code block the response never closed
+                if speech_filter:
+                    speakable = speech_filter.flush()
+                    show_code_blocks(speech_filter.take_fence_events())
+                else:
+                    speakable = ""
+                    show_code_blocks(fence_tokenizer.flush())
+                speakable = text_cleaner.feed(speakable) + text_cleaner.flush()
+                if speakable:
+                    self.tts_text_queue.put((epoch, speakable))
+                if speech_filter:
+                    print(
+                        f"Speech filter kept {speech_filter.dropped_chars} characters of code/tables/links away from TTS."
+                    )  # Debug print
+                self.tts_text_queue.put((epoch, TTS_FLUSH))
+                self._emit("response_done", epoch, full_response_content)
+                if recorder:
+                    recorder.set_response_info(turn_id, **usage)
+                self._show_embedded_image(full_response_content)
+                eval_count = usage.get("eval_count")
+                self.context_window.append(
+                    "assistant",
+                    full_response_content,
+                    tokens=eval_count + MESSAGE_OVERHEAD_TOKENS if eval_count else None,
+                )
+                self.context_window.record_usage(
+                    sent_tokens, usage.get("prompt_eval_count"), sent_chars
+                )
+                print(
+                    f"Context: sent ~{sent_tokens} tokens of history, Ollama evaluated "
+                    f"{usage.get('prompt_eval_count')} prompt and {eval_count} reply tokens "
+                    f"(fewer prompt tokens than sent means the cached prefix was reused; "
+                    f"{self.context_window.trims} trim(s) so far)."
+                )  # Debug print
+                print(
+                    f"Ollama full response content: '{full_response_content[:100]}...'"
+                )  # Debug print
+                ttft_note = " (answered from cache)" if cached_response is not None else ""
+                if ttft is not None:
+                    load_seconds = (usage.get("load_duration") or 0) / 1e9
+                    ttft_note = f" ({self._record_ttft(ttft, load_seconds)})"
+                self._update_status(f"{self.ready_message()}{ttft_note}", "green")
+            except asyncio.CancelledError:
+                if self.interrupt_started is not None:
+                    print(
+                        f"Ollama response cancelled "
+                        f"{(time.perf_counter() - self.interrupt_started) * 1000:.0f} ms after the interruption."
+                    )  # Debug print
+                # Keep what was already said, so the model knows where it was cut off
+                if full_response_content:
+                    self.context_window.append("assistant", full_response_content)
+                elif (
+                    self.context_window.messages
+                    and self.context_window.messages[-1]["role"] == "user"
+                ):
+                    self.context_window.pop()
+                raise
+            except ollama.ResponseError as e:
+                self._show_error_message("Ollama Error", f"Model response error: {e}")
+                self._update_status("Ollama error.", "red")
+                if (
+                    self.context_window.messages
+                    and self.context_window.messages[-1]["role"] == "user"
+                ):
+                    self.context_window.pop()
+            except Exception as e:
+                self._show_error_message(
+                    "Ollama Error", f"Unexpected error during Ollama interaction: {e}"
+                )
+                self._update_status("Ollama error.", "red")
+                if (
+                    self.context_window.messages
+                    and self.context_window.messages[-1]["role"] == "user"
+                ):
+                    self.context_window.pop()
+
+        self.ollama_chat_future = self.ollama_service.submit(_send())
+        return self.ollama_chat_future
+
+    def _show_embedded_image(self, full_response_content):
+        """Emits an image event for a {"type": "text/image", "data": ...} object in the answer."""
+        try:
+            json_data_match = re.search(
+                r"\{.*?\"type\":\s*\"text/image\".*?\}",
+                full_response_content,
+                re.DOTALL | re.IGNORECASE,
+            )
+            if not json_data_match:
+                return
+            json_str = json_data_match.group(0)
+            first_brace = json_str.find("{")
+            last_brace = json_str.rfind("}")
+            if first_brace == -1 or last_brace == -1 or last_brace <= first_brace:
+                return
+            json_str_cleaned = json_str[first_brace : last_brace + 1]
+            try:
+                response_obj = json.loads(json_str_cleaned)
+            except json.JSONDecodeError as jde_inner:
+                print(
+                    f"JSON Decode Error for potential image: {jde_inner} on string: {json_str_cleaned}"
+                )
+                return
+            if (
+                isinstance(response_obj, dict)
+                and response_obj.get("type", "").lower() == "text/image"
+                and "data" in response_obj
+            ):
+                self._emit(
+                    "image", response_obj["data"], response_obj.get("caption", "")
+                )
+        except Exception as e:
+            print(f"Error processing potential image JSON: {e}")
+
+    # --- Speech recognition ---
+
+    def load_asr_model(self):
+        if not WHISPER_AVAILABLE:
+            self._update_status("Whisper not installed. Offline SR disabled.", "red")
+            self._startup_done("asr")
+            return False
+        if self.asr_worker is None:
+            model_name = self.settings.get("whisper_model_name", "base")
+            configured_backend = self.settings.get("asr_backend", DEFAULT_ASR_BACKEND)
+            backend_name = select_asr_backend(configured_backend)
+            if backend_name is None:
+                # WHISPER_AVAILABLE saw a backend, but it cannot be found any more
+                self._update_status("Whisper not installed. Offline SR disabled.", "red")
+                self._startup_done("asr")
+                return False
+            if backend_name != configured_backend:
+                message = f"ASR backend '{configured_backend}' is not installed, using '{backend_name}' instead."
+                print(message)
+                self._emit("warning", "ASR Backend", message)
+            print(
+                f"Starting ASR worker process for {backend_name} model: {model_name}"
+            )
+            try:
+                self._update_status(
+                    f"Loading Whisper model ({model_name})...", "orange"
+                )
+                self.asr_worker = ASRWorkerProcess(
+                    model_name,
+                    on_event=self._on_asr_worker_event,
+                    backend_name=backend_name,
+                    compute_type=self.settings.get("asr_compute_type", "int8"),
+                    cpu_threads=self.settings.get("asr_cpu_threads", 0),
+                )
+                self.asr_worker.start()
+                return True
+            except Exception as e:
+                self._show_error_message(
+                    "Whisper Model Error",
+                    f"Failed to start the ASR worker for '{model_name}': {e}",
+                )
+                self._update_status("Whisper model load failed.", "red")
+                self.asr_worker = None
+                self._startup_done("asr")
+                return False
+        print("ASR worker already started.")
+        return True
+
+    def _on_asr_worker_event(self, kind, *args):
+        """Called from the ASR worker's listener thread for every message it sends back."""
+        if kind == "status":
+            self._update_status(args[0], "orange")
+        elif kind == "ready":
+            load_seconds, warmup_seconds = args
+            self._update_status(
+                f"Whisper ready (load {load_seconds:.1f}s, warm-up {warmup_seconds:.1f}s). Hold '{self.settings['hotkey_str']}' to speak...",
+                "green",
+            )
+            print(
+                f"Whisper model '{self.asr_worker.model_name}' loaded in {load_seconds:.2f}s, warm-up decode {warmup_seconds:.2f}s."
+            )
+            self._startup_done("asr")
+        elif kind == "error":
+            self._show_error_message(
+                "Whisper Model Error",
+                f"{args[0]}\nEnsure model name is correct, internet for first download, and PyTorch is installed.",
+            )
+            self._update_status("Whisper model load failed.", "red")
+            self._startup_done("asr")
+
+    def asr_ready(self):
+        return WHISPER_AVAILABLE and bool(self.asr_worker and self.asr_worker.is_ready())
+
+    def start_recording(self):
+        print("Attempting to start recording...")  # Debug print
+        if self.is_recording:
+            print("Already recording, ignoring start request.")  # Debug print
+            return
+        if not self.asr_ready():
+            self._show_error_message(
+                "Speech Recognition Error", "Whisper not available/loaded."
+            )
+            self._update_status("Offline SR not ready.", "red")
+            print("Whisper not ready, cannot start recording.")  # Debug print
+            return
+        if not self.audio_capture.is_open():
+            self._show_error_message(
+                "Microphone Error",
+                "Microphone stream is not open. Please select a microphone.",
+            )
+            self._update_status("No microphone selected.", "red")
+            print("Microphone stream not open, cannot start recording.")  # Debug print
+            return
+        self.is_recording = True
+        timeline = self.turn_metrics.ensure_turn("capture_start")
+        # The live stream is already running; only mark where this utterance starts
+        self.utterance = utterance = Utterance(
+            self.turn_epoch, timeline.turn_id, self.audio_capture.begin_capture()
+        )
+        self._mark_stage("capture_start")
+        self._update_status(
+            f"Recording... Release '{self.settings['hotkey_str']}' to stop.", "red"
+        )
+        print("Recording initiated.")  # Debug print
+        if self.settings.get("streaming_transcription", True):
+            utterance.streaming_thread = threading.Thread(
+                target=self._streaming_transcription_worker, args=(utterance,), daemon=True
+            )
+            self.streaming_transcription_thread = utterance.streaming_thread
+            utterance.streaming_thread.start()
+
+    def stop_recording(self):
+        print("Attempting to stop recording...")  # Debug print
+        if not self.is_recording:
+            print("Not currently recording, ignoring stop request.")  # Debug print
+            return
+        self.is_recording = False
+        utterance = self.utterance
+        utterance.recording = False
+        start_offset, end_offset, frames = self.audio_capture.end_capture()
+        self._mark_stage("capture_closed")
+        utterance.frames = frames
+        self._update_status("Processing speech...", "orange")
+        print(
+            f"Capture marked from chunk {start_offset} to {end_offset} ({len(frames)} chunks)."
+        )  # Debug print
+
+        print("Recording stopped. Starting transcription.")  # Debug print
+        self.transcription_thread = threading.Thread(
+            target=self._transcribe_audio_threaded, args=(utterance,), daemon=True
+        )
+        self.transcription_thread.start()
+
+    def _open_audio_capture(self):
+        """Opens (or reopens) the persistent microphone stream on the selected device."""
+
+        def _open():
+            requested_index = self.settings.get("selected_mic_index", -1)
+            try:
+                opened_index = self.audio_capture.start(requested_index)
+            except Exception as e:
+                self._show_error_message(
+                    "Mic Error",
+                    f"Could not open mic (index {requested_index}): {e}\nPlease check your microphone connection, OS permissions, and PyAudio installation.",
+                )
+                self._update_status("Microphone error. Try restarting.", "red")
+                print(f"Failed to open microphone stream: {e}")  # Debug print
+                return
+            if opened_index != requested_index:
+                # No specific mic was selected; remember the system default for next time
+                self.settings["selected_mic_index"] = opened_index
+                self.save_config()
+                for mic in self.available_mics_info:
+                    if mic["index"] == opened_index:
+                        self._emit("microphone_opened", mic["name"])
+
+        threading.Thread(target=_open, daemon=True).start()
+
+    def _on_audio_capture_error(self, message):
+        self.is_recording = False
+        if self.utterance is not None:
+            self.utterance.recording = False
+        self._show_error_message("Mic Error", message)
+        self._update_status("Recording error.", "red")
+
+    def _transcribe_pcm(self, audio_data_bytes, stats, initial_prompt=None):
+        """
+        Decodes 16 kHz int16 PCM bytes with the configured ASR backend and returns the text.
+        Leading/trailing silence is trimmed first, and audio without speech is not decoded.
+        stats is the utterance's vad_stats, which this adds to.
+        """
+        if self.settings.get("vad_enabled", True):
+            from vad import trim_silence  # NumPy is loaded with the first utterance
+
+            audio_data_bytes, original_seconds, trimmed_seconds = trim_silence(
+                audio_data_bytes,
+                sample_rate=AUDIO_SAMPLE_RATE,
+                min_energy_db=float(self.settings.get("vad_min_energy_db", -50.0)),
+                padding_ms=int(self.settings.get("vad_padding_ms", 200)),
+            )
+            stats["audio_seconds"] += original_seconds
+            stats["trimmed_seconds"] += trimmed_seconds
+            if not audio_data_bytes:
+                stats["skipped_decodes"] += 1
+                print(
+                    f"VAD: no speech in {original_seconds:.2f}s of audio, skipping decode."
+                )  # Debug print
+                return ""
+        text, decode_seconds = self.asr_worker.transcribe(
+            audio_data_bytes, initial_prompt=initial_prompt
+        )
+        audio_seconds = len(audio_data_bytes) / (AUDIO_SAMPLE_RATE * AUDIO_SAMPLE_WIDTH)
+        stats["decoded_seconds"] += audio_seconds
+        stats["decode_time"] += decode_seconds
+        print(
+            f"{self.asr_worker.backend_name} decoded {audio_seconds:.2f}s of audio in {decode_seconds:.2f}s: '{text}'"
+        )  # Debug print
+        self._update_status(
+            f"Transcribed {audio_seconds:.1f}s of audio in {decode_seconds:.2f}s.",
+            "orange",
+        )
+        return text
+
+    def _log_turn_vad_stats(self, stats):
+        if not stats["audio_seconds"]:
+            return
+        # Estimate the decode time saved from this turn's real-time factor
+        if stats["decoded_seconds"]:
+            rtf = stats["decode_time"] / stats["decoded_seconds"]
+            saved = f"~{stats['trimmed_seconds'] * rtf:.2f}s decode saved"
+        else:
+            saved = "decode skipped entirely"
+        print(
+            f"VAD: trimmed {stats['trimmed_seconds']:.2f}s of {stats['audio_seconds']:.2f}s audio "
+            f"({saved}, {stats['skipped_decodes']} silent segment(s) skipped)."
+        )
+
+    def _streaming_transcription_worker(self, utterance):
+        """
+        Runs while the hotkey is held. Whenever a full window of audio has been captured
+        (plus one second of lookahead to pick a quiet cut point), that window is decoded
+        and its text committed, so only the last partial window is left for stop_recording.
+        """
+        window_bytes = int(
+            float(self.settings.get("streaming_window_seconds", 5.0))
+            * AUDIO_SAMPLE_RATE
+            * AUDIO_SAMPLE_WIDTH
+        )
+        lookahead_bytes = AUDIO_SAMPLE_RATE * AUDIO_SAMPLE_WIDTH  # 1 second
+        import numpy as np
+
+        print("Streaming transcription worker started.")  # Debug print
+        while utterance.recording:
+            new_frames = utterance.frames[utterance.consumed_frames :]
+            if new_frames:
+                utterance.consumed_frames += len(new_frames)
+                utterance.pending_audio.extend(b"".join(new_frames))
+            if len(utterance.pending_audio) < window_bytes + lookahead_bytes:
+                time.sleep(0.1)
+                continue
+            try:
+                pending_np = np.frombuffer(
+                    bytes(utterance.pending_audio), dtype=np.int16
+                ).astype(np.float32)
+                window_samples = window_bytes // AUDIO_SAMPLE_WIDTH
+                lookahead_samples = lookahead_bytes // AUDIO_SAMPLE_WIDTH
+                cut_sample = find_quiet_split(
+                    pending_np,
+                    window_samples - lookahead_samples,
+                    window_samples + lookahead_samples,
+                )
+                cut_byte = cut_sample * AUDIO_SAMPLE_WIDTH
+                window_audio = bytes(utterance.pending_audio[:cut_byte])
+                start_time = time.perf_counter()
+                window_text = self._transcribe_pcm(
+                    window_audio,
+                    utterance.vad_stats,
+                    initial_prompt=utterance.committed_text[-200:],
+                )
+                del utterance.pending_audio[:cut_byte]
+                print(
+                    f"Streaming window ({cut_sample / AUDIO_SAMPLE_RATE:.2f}s) decoded in {time.perf_counter() - start_time:.2f}s: '{window_text}'"
+                )  # Debug print
+                if window_text:
+                    utterance.committed_text = (
+                        f"{utterance.committed_text} {window_text}".strip()
+                    )
+                    if utterance.epoch == self.turn_epoch:
+                        self._emit("query_partial", utterance.committed_text)
+            except Exception as e:
+                print(f"Streaming transcription error: {e}")  # Debug print
+                break
+        print("Streaming transcription worker finished.")  # Debug print
+
+    def _transcribe_audio_threaded(self, utterance):
+        print("Transcription thread started.")  # Debug print
+        print(
+            f"Audio frames available for transcription: {len(utterance.frames)}"
+        )  # Debug print
+        if not utterance.frames:
+            self._update_status("No audio recorded.", "yellow")
+            self._update_status(self.ready_message(), "green")
+            print("No audio frames to transcribe.")  # Debug print
+            return
+        if not self.asr_ready():
+            self._show_error_message("SR Error", "Whisper not available/loaded.")
+            self._update_status("Offline SR not ready.", "red")
+            print("Whisper not ready, cannot transcribe.")  # Debug print
+            return
+
+        # Let this utterance's streaming worker finish its current window before
+        # decoding the tail
+        if utterance.streaming_thread and utterance.streaming_thread.is_alive():
+            utterance.streaming_thread.join()
+        committed_text = utterance.committed_text
+        tail_audio_bytes = bytes(utterance.pending_audio) + b"".join(
+            utterance.frames[utterance.consumed_frames :]
+        )
+
+        captured_frames = utterance.frames
+        total_audio_bytes = sum(len(frame) for frame in captured_frames)
+        print(
+            f"Total audio data length for transcription: {total_audio_bytes} bytes."
+        )  # Debug print
+        if total_audio_bytes == 0:
+            self._update_status("Recorded silence or no audio.", "yellow")
+            self._emit("query", "Recorded silence or no audio.")
+            self._update_status(self.ready_message(), "green")
+            print("Recorded audio data is empty.")  # Debug print
+            return
+
+        # Archiving is handled by a background writer; transcription starts right away
+        if self.recording_archive:
+            self.recording_archive.submit(captured_frames)
+        if utterance.epoch != self.turn_epoch:
+            print("Transcription skipped, a newer turn has started.")  # Debug print
+            return
+        turn_id = utterance.turn_id
+        if self.session_recorder:
+            self.session_recorder.add_audio(
+                turn_id, b"".join(captured_frames), AUDIO_SAMPLE_RATE
+            )
+
+        try:
+            self._update_status("Transcribing with Whisper...", "orange")
+            self._mark_stage("asr_start")
+            # Only the audio not already covered by a streaming window needs decoding
+            tail_text = ""
+            if tail_audio_bytes:
+                tail_text = self._transcribe_pcm(
+                    tail_audio_bytes,
+                    utterance.vad_stats,
+                    initial_prompt=committed_text[-200:],
+                )
+            text = f"{committed_text} {tail_text}".strip()
+            if utterance.epoch != self.turn_epoch:
+                # The hotkey was pressed again while this was decoding
+                print(f"Transcription dropped, a newer turn has started: '{text}'")
+                return
+            self._mark_stage("asr_end")
+            print(
+                f"Whisper transcription: '{text}' (tail: {len(tail_audio_bytes)} bytes)"
+            )  # Debug print
+            self._log_turn_vad_stats(utterance.vad_stats)
+            if self.session_recorder:
+                self.session_recorder.set_query(turn_id, text, "voice")
+            if text:
+                self._emit("query", text)
+                self.submit_query(text)
+            else:
+                self._update_status(
+                    "Could not understand (Whisper: no speech detected or unclear)",
+                    "yellow",
+                )
+                self._emit("query_note", "Could not understand (Whisper).")
+                self._update_status(self.ready_message(), "green")
+        except Exception as e:
+            self._show_error_message(
+                "Whisper Error",
+                f"Transcription error: {e}\nEnsure Whisper model is correctly loaded and audio format is compatible.",
+            )
+            self._update_status("Whisper transcription error.", "red")
+            self._update_status(self.ready_message(), "green")
+            print(f"Whisper transcription error: {e}")  # Debug print
+        finally:
+            print("Transcription thread finished.")
+
+    # --- Microphones ---
+
+    def fetch_microphones(self):
+        def _fetch():
+            mic_names, selected_mic_name, error_msg = [NO_MICS], NO_MICS, None
+            temp_mics_info = []
+            try:
+                # Reuses the capture service's PyAudio instance instead of probing devices twice
+                temp_mics_info = self.audio_capture.list_input_devices()
+                mic_names = [mic["name"] for mic in temp_mics_info]
+                if not mic_names:
+                    error_msg = "No input microphones found."
+                    self.settings["selected_mic_index"] = -1
+                else:
+                    idx = self.settings.get("selected_mic_index", -1)
+                    found = any(mic["index"] == idx for mic in temp_mics_info)
+                    if found:
+                        selected_mic_name = next(
+                            mic["name"] for mic in temp_mics_info if mic["index"] == idx
+                        )
+                    else:
+                        selected_mic_name = mic_names[0]
+                        self.settings["selected_mic_index"] = temp_mics_info[0]["index"]
+            except Exception as e:
+                error_msg = f"Failed to list mics: {e}"
+                self.settings["selected_mic_index"] = -1
+            self.available_mics_info = temp_mics_info
+            self._emit(
+                "microphones", mic_names or [NO_MICS], selected_mic_name, error_msg
+            )
+            if error_msg:
+                self._show_error_message("Mic Error", error_msg)
+                self._update_status("Error loading mics.", "red")
+            elif mic_names and mic_names[0] != NO_MICS:
+                self._open_audio_capture()
+                # Only update status if it's not currently showing an error from another part
+                if (
+                    "error" not in self.status_message.lower()
+                    and "failed" not in self.status_message.lower()
+                ):
+                    self._update_status(f"Mic ready: {selected_mic_name}", "green")
+            else:
+                self._update_status("No mics found.", "yellow")
+
+        threading.Thread(target=_fetch, daemon=True).start()
+
+    def select_microphone(self, mic_name):
+        for mic in self.available_mics_info:
+            if mic["name"] == mic_name:
+                self.settings["selected_mic_index"] = mic["index"]
+                self.save_config()
+                self._update_status(f"Mic selected: {mic_name}", "green")
+                self._open_audio_capture()
+                return
+        self._show_error_message("Mic Error", f"Mic '{mic_name}' not found.")
+        self.settings["selected_mic_index"] = -1
+        self.save_config()
+
+    # --- Text to speech ---
+
+    def update_tts_settings(self, rate, volume):
+        self.settings.update({"tts_rate": rate, "tts_volume": volume})
+        self.save_config()
+        # Tell whichever thread owns the pyttsx3 engine to re-apply rate/volume
+        if self._tts_buffered_mode():
+            self.tts_synthesis_queue.put(TTS_SETTINGS_CHANGED)
+        else:
+            self.tts_text_queue.put(TTS_SETTINGS_CHANGED)
+        print(
+            f"TTS settings updated in config: Rate={rate}, Volume={volume}. Worker will apply."
+        )
+
+    def _tts_buffered_mode(self):
+        return self.settings.get("tts_mode", "buffered") == "buffered"
+
+    def _start_tts_playback_thread(self):
+        self.tts_thread = threading.Thread(
+            target=self._tts_playback_worker, daemon=True
+        )
+        self.tts_thread.start()
+        print("TTS playback thread started.")  # Debug print
+        if self._tts_buffered_mode():
+            self.tts_synthesis_thread = threading.Thread(
+                target=self._tts_synthesis_worker, daemon=True
+            )
+            self.tts_synthesis_thread.start()
+            self.tts_audio_thread = threading.Thread(
+                target=self._tts_audio_playback_worker, daemon=True
+            )
+            self.tts_audio_thread.start()
+            print("Buffered TTS synthesis and audio threads started.")  # Debug print
+
+    def _speak_sentence(self, engine, text, epoch):
+        """
+        Speaks one cleaned sentence. In buffered mode it is handed to the synthesis thread
+        and this returns immediately; in direct mode it blocks until spoken.
+        """
+        if self._tts_buffered_mode():
+            self.tts_synthesis_queue.put((epoch, text))
+            return
+        self._mark_stage("first_audio_out", epoch)
+        engine.say(text)
+        engine.runAndWait()  # This blocks this worker thread, not the caller
+        if epoch == self.turn_epoch:
+            self._mark_stage("last_audio_out", epoch)
+
+    def _tts_synthesis_worker(self):
+        """Renders queued sentences to PCM so the next one is ready before the current ends."""
+        try:
+            # pyttsx3.init() returns a shared engine per driver, so in buffered mode
+            # this thread is the only one that touches it.
+            engine = self.create_tts_engine()
+        except Exception as e:
+            print(f"TTS Synthesis Worker: Critical error initializing pyttsx3: {e}")
+            self._show_error_message(
+                "TTS Critical Error",
+                f"Failed to initialize TTS engine in its thread: {e}",
+            )
+            return
+        self._apply_synthesis_settings(engine)
+        self._prewarm_speech_cache(engine)
+        while True:
+            item = self.tts_synthesis_queue.get()
+            if item is TTS_SHUTDOWN:
+                break
+            if item is TTS_SETTINGS_CHANGED:
+                self._apply_synthesis_settings(engine)
+                continue
+            epoch, text = item
+            if epoch != self.turn_epoch:
+                continue  # Interrupted while waiting in the queue
+            speech = self._render_sentence(engine, text)
+            if speech is None:
+                continue
+            # Wait for room in the lookahead buffer, giving up if a stop arrives meanwhile
+            while epoch == self.turn_epoch:
+                try:
+                    self.tts_audio_queue.put((epoch, speech), timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+
+    def _apply_synthesis_settings(self, engine):
+        rate, volume = self.settings["tts_rate"], self.settings["tts_volume"]
+        engine.setProperty("rate", rate)
+        engine.setProperty("volume", volume)
+        self.tts_applied_voice = (rate, volume)
+
+    def _speech_cache_key(self, text):
+        """Key for text as the synthesis engine renders it now, see tts_applied_voice."""
+        rate, volume = self.tts_applied_voice
+        return SpeechCache.key(text, self.settings.get("tts_voice_id"), rate, volume)
+
+    def _render_sentence(self, engine, text):
+        """
+        Returns the sentence as RenderedSpeech, from the speech cache when it was
+        synthesized before with the same voice settings, or None if rendering failed.
+        """
+        cache_key = None
+        if self.tts_cache:
+            cache_key = self._speech_cache_key(text)
+            speech = self.tts_cache.get(cache_key, text)
+            if speech is not None:
+                print(f"TTS Synthesis Worker: Cache hit for '{text[:50]}...'")
+                return speech
+        try:
+            start_time = time.perf_counter()
+            speech = render_to_pcm(engine, text)
+            print(
+                f"TTS Synthesis Worker: Rendered '{text[:50]}...' in {time.perf_counter() - start_time:.2f}s"
+            )
+        except Exception as e:
+            print(f"TTS Synthesis Worker: Error rendering sentence: {e}")
+            return None
+        if cache_key:
+            self.tts_cache.put(cache_key, speech)
+        return speech
+
+    def _prewarm_speech_cache(self, engine):
+        """
+        Synthesizes the configured phrases that are not cached yet. Runs on the synthesis
+        thread before it takes queued sentences, and stops as soon as real work arrives.
+        """
+        if not self.tts_cache:
+            return
+        rendered = 0
+        for phrase in self.settings.get("tts_cache_prewarm_phrases", []):
+            if not self.tts_synthesis_queue.empty():
+                break
+            # Same cleaning as streamed text, so the phrase hashes like a spoken sentence
+            cleaner = StreamingTextCleaner()
+            text = " ".join((cleaner.feed(phrase) + cleaner.flush()).split())
+            cache_key = self._speech_cache_key(text)
+            if not text or cache_key in self.tts_cache:
+                continue
+            try:
+                self.tts_cache.put(cache_key, render_to_pcm(engine, text))
+                rendered += 1
+            except Exception as e:
+                print(f"TTS Synthesis Worker: Could not prewarm '{text}': {e}")
+        if rendered:
+            print(f"TTS Synthesis Worker: Prewarmed {rendered} phrase(s) into the speech cache.")
+
+    def _tts_audio_playback_worker(self):
+        """Plays rendered sentences back to back through one persistent output stream."""
+        self.tts_player = self.create_tts_player()
+        while True:
+            item = self.tts_audio_queue.get()
+            if item is TTS_SHUTDOWN:
+                break
+            epoch, speech = item
+            if epoch != self.turn_epoch:
+                continue
+            try:
+                self._mark_stage("first_audio_out", epoch)
+                completed = self.tts_player.play(
+                    speech, should_stop=lambda e=epoch: e != self.turn_epoch
+                )
+                if completed:
+                    self._mark_stage("last_audio_out", epoch)
+                if not completed and self.interrupt_started is not None:
+                    print(
+                        f"TTS Audio Worker: Silent {(time.perf_counter() - self.interrupt_started) * 1000:.0f} ms after the interruption."
+                    )
+            except Exception as e:
+                print(f"TTS Audio Worker: Error during playback: {e}")
+
+    def _tts_playback_worker(self):
+        engine = None  # Local engine instance for this thread (direct mode only)
+        if not self._tts_buffered_mode():
+            # In buffered mode synthesis and playback happen in their own threads and
+            # this one only segments sentences
+            engine = self._init_direct_tts_engine()
+            if engine is None:
+                return
+        self._run_tts_segmenter(engine)
+
+    def _init_direct_tts_engine(self):
+        engine = None
+        try:
+            print("TTS Playback Worker: Initializing pyttsx3 engine...")
+            engine = self.create_tts_engine()
+            if not engine:
+                print(
+                    "TTS Playback Worker: Failed to initialize pyttsx3 engine. Thread stopping."
+                )
+                return None  # Cannot proceed without an engine
+
+            print("TTS Playback Worker: pyttsx3 engine initialized successfully.")
+            # Initial properties based on app settings
+            engine.setProperty("rate", self.settings["tts_rate"])
+            engine.setProperty("volume", self.settings["tts_volume"])
+            # Voice selection is using system default as per previous changes
+
+        except Exception as e:
+            print(f"TTS Playback Worker: Critical error initializing pyttsx3: {e}")
+            self._show_error_message(
+                "TTS Critical Error",
+                f"Failed to initialize TTS engine in its thread: {e}",
+            )
+            return None  # Stop the worker if engine init fails
+        return engine
+
+    def _run_tts_segmenter(self, engine):
+        """
+        Blocks on the text queue, so an idle worker never wakes up and new text is handled
+        the moment it arrives. Control messages (TTS_STOP, TTS_SETTINGS_CHANGED,
+        TTS_SHUTDOWN) travel through the same queue as text chunks. Text chunks and
+        TTS_FLUSH arrive as (epoch, payload) pairs and are ignored once their epoch is over.
+        """
+        segmenter = SentenceSegmenter(
+            max_chunk_chars=int(self.settings.get("tts_max_chunk_chars", 500))
+        )
+        segmenter_epoch = self.turn_epoch  # Epoch of the text held in the segmenter
+
+        while True:
+            try:
+                item = self.tts_text_queue.get()
+
+                if item is TTS_SHUTDOWN:
+                    print("TTS Playback Worker: Shutdown message received.")
+                    break
+
+                if item is TTS_SETTINGS_CHANGED:
+                    # In buffered mode the synthesis thread applies them to its own engine.
+                    if engine is not None:
+                        engine.setProperty("rate", self.settings["tts_rate"])
+                        engine.setProperty("volume", self.settings["tts_volume"])
+                        print(
+                            f"TTS Playback Worker: Rate set to {self.settings['tts_rate']}, Volume to {self.settings['tts_volume']}"
+                        )
+                    continue
+
+                if item is TTS_STOP:
+                    print("TTS Playback Worker: Stop message received.")
+                    if engine is not None and engine.isBusy():
+                        print(
+                            "TTS Playback Worker: Engine is busy, stopping current speech."
+                        )
+                        engine.stop()
+                    segmenter.reset()
+                    continue
+
+                epoch, payload = item
+                if epoch != self.turn_epoch:
+                    continue  # Queued by a response that has since been interrupted
+                if epoch != segmenter_epoch:
+                    segmenter.reset()  # Never finish a sentence from an older turn
+                    segmenter_epoch = epoch
+
+                if payload is TTS_FLUSH:
+                    # End of a response: speak whatever is left without waiting for punctuation
+                    sentences_to_process = segmenter.flush()
+                else:
+                    # Only the newly arrived characters are scanned for boundaries
+                    sentences_to_process = segmenter.feed(payload)
+
+                for text_to_speak_now in sentences_to_process:
+                    if (
+                        text_to_speak_now and epoch == self.turn_epoch
+                    ):  # Re-check for an interruption
+                        # Already cleaned upstream by StreamingTextCleaner in submit_query
+                        cleaned_text_to_speak = " ".join(text_to_speak_now.split())
+                        print(
+                            f"TTS Playback Worker: Speaking: '{cleaned_text_to_speak[:100]}...'"
+                        )
+                        if cleaned_text_to_speak:
+                            self._mark_stage("first_sentence_queued", epoch)
+                            self._speak_sentence(engine, cleaned_text_to_speak, epoch)
+                        if (
+                            engine is not None and engine.isBusy()
+                        ):  # Should not be busy after runAndWait, but good for sanity
+                            print(
+                                "TTS Playback Worker: WARNING - Engine still busy after runAndWait."
+                            )
+                            engine.stop()  # Force stop if stuck
+                    else:
+                        # Interrupted during sentence processing
+                        break
+
+                if epoch != self.turn_epoch:
+                    print(
+                        "TTS Playback Worker: Interruption handled during sentence processing."
+                    )
+                    segmenter.reset()  # Clear buffer as well
+                    continue
+
+            except Exception as e:
+                print(f"TTS Playback Worker: Error during playback loop: {e}")
+                # Decide if the error is fatal for this worker
+                segmenter.reset()  # Clear buffer on error
+
+        print("TTS Playback Worker: Exiting.")
+        if engine is not None and engine.isBusy():
+            engine.stop()
+
+    def interrupt_turn(self):
+        """
+        Barge-in and the Stop Speaking button: starts a new epoch, which silences the
+        audio worker within one output block and makes every stage drop what the old
+        answer still has queued, and cancels the Ollama stream so it stops producing.
+        """
+        self.interrupt_started = time.perf_counter()
+        interrupted_epoch = self.turn_epoch
+        self.turn_epoch += 1
+        self._emit("epoch", self.turn_epoch)
+        answer_running = False
+        if self.ollama_chat_future and not self.ollama_chat_future.done():
+            self.ollama_chat_future.cancel()
+            answer_running = True
+
+        # The queues are not drained: each worker skips items of an older epoch as it
+        # reaches them, so control messages queued among them (TTS_SETTINGS_CHANGED,
+        # TTS_SHUTDOWN) are still handled, in order. Then wake the segmenter.
+        pending_count = sum(
+            pending_queue.qsize()
+            for pending_queue in (
+                self.tts_text_queue,
+                self.tts_synthesis_queue,
+                self.tts_audio_queue,
+            )
+        )
+        self.tts_text_queue.put(TTS_STOP)
+        if pending_count > 0:
+            print(f"Stop TTS Playback: {pending_count} queued TTS item(s) will be skipped.")
+        if answer_running or pending_count > 0:
+            self.turn_metrics.mark_interrupted(interrupted_epoch)
+
+        print("Stop TTS Playback: Stop message sent to TTS worker.")
+
+    def _shutdown_tts_workers(self):
+        """Wakes every TTS thread with a shutdown message so close() can join them."""
+        self.turn_epoch += 1
+        self.tts_text_queue.put(TTS_SHUTDOWN)
+        self.tts_synthesis_queue.put(TTS_SHUTDOWN)
+        while True:
+            try:
+                self.tts_audio_queue.get_nowait()
+            except queue.Empty:
+                break
+        try:
+            self.tts_audio_queue.put(TTS_SHUTDOWN, timeout=0.5)
+        except queue.Full:
+            pass
+
+    def close(self):
+        """Stops every worker and releases devices, processes and caches."""
+        self.is_recording = False  # Ensure recording stops
+        self._shutdown_tts_workers()  # Wake the TTS threads so they can be joined
+
+        # Wait for threads to finish
+        threads_to_join = []
+        if (
+            self.streaming_transcription_thread
+            and self.streaming_transcription_thread.is_alive()
+        ):
+            threads_to_join.append(
+                ("Streaming Transcription", self.streaming_transcription_thread)
+            )
+        if self.transcription_thread and self.transcription_thread.is_alive():
+            threads_to_join.append(("Transcription", self.transcription_thread))
+        if self.tts_thread and self.tts_thread.is_alive():
+            threads_to_join.append(("TTS Playback", self.tts_thread))
+        if self.tts_synthesis_thread and self.tts_synthesis_thread.is_alive():
+            threads_to_join.append(("TTS Synthesis", self.tts_synthesis_thread))
+        if self.tts_audio_thread and self.tts_audio_thread.is_alive():
+            threads_to_join.append(("TTS Audio", self.tts_audio_thread))
+
+        for name, t in threads_to_join:
+            print(f"Attempting to join {name} thread...")
+            try:
+                t.join(timeout=1.0)
+                if t.is_alive():
+                    print(f"Warning: {name} thread did not join in time.")
+                else:
+                    print(f"{name} thread joined successfully.")
+            except Exception as e:
+                print(f"Error joining {name} thread: {e}")
+
+        if self.asr_worker:
+            self.asr_worker.shutdown()
+
+        # Cancels a response still streaming and closes the pooled connections
+        if self.ollama_service:
+            self.ollama_service.close()
+        if self.response_cache:
+            self.response_cache.close()
+
+        if self.recording_archive:
+            self.recording_archive.close()
+
+        if self.tts_player:
+            self.tts_player.close()
+
+        self.turn_metrics.finish_turn()
+        if self.settings.get("metrics_export_on_exit", False):
+            self.export_turn_metrics()
+        if self.session_recorder:
+            self.session_recorder.close()
+
+        # Release the persistent microphone stream and PyAudio instance
+        try:
+            self.audio_capture.close()
+        except Exception as e:
+            print(f"Error closing audio capture: {e}")
+
+        self.save_config()
@@ -0,0 +1,29 @@
+import json
+
+import pytest
+
+from speech_engine import SpeechChatEngine
+
+
+@pytest.fixture
+def make_engine(tmp_path):
+    engines = []
+
+    def make(engine_class=SpeechChatEngine, **settings):
+        config = {
+            "tts_cache_enabled": False,
+            "response_cache_enabled": False,
+            "tts_cache_dir": str(tmp_path / "tts_cache"),
+            "response_cache_path": str(tmp_path / "response_cache.sqlite3"),
+        }
+        config.update(settings)
+        config_file = tmp_path / "config.json"
+        config_file.write_text(json.dumps(config))
+        engine = engine_class(config_file=str(config_file))
+        engines.append(engine)
+        return engine
+
+    yield make
+    for engine in engines:
+        if engine.response_cache:
+            engine.response_cache.close()
@@ -0,0 +1,39 @@
+import pytest
+
+from asr_backends import (
+    DEFAULT_ASR_BACKEND,
+    FasterWhisperBackend,
+    WhisperBackend,
+    create_asr_backend,
+    select_asr_backend,
+)
+
+
+def install(monkeypatch, *backends):
+    for backend_cls in (WhisperBackend, FasterWhisperBackend):
+        available = backend_cls in backends
+        monkeypatch.setattr(backend_cls, "is_available", classmethod(lambda cls, a=available: a))
+
+
+def test_the_configured_backend_is_used_when_installed(monkeypatch):
+    install(monkeypatch, WhisperBackend, FasterWhisperBackend)
+    assert select_asr_backend("faster-whisper") == "faster-whisper"
+    assert select_asr_backend("whisper") == "whisper"
+
+
+def test_falls_back_to_another_installed_backend(monkeypatch):
+    install(monkeypatch, FasterWhisperBackend)
+    assert select_asr_backend("whisper") == "faster-whisper"
+    install(monkeypatch, WhisperBackend)
+    assert select_asr_backend("faster-whisper") == "whisper"
+    assert select_asr_backend("no-such-backend") == DEFAULT_ASR_BACKEND
+
+
+def test_none_when_nothing_is_installed(monkeypatch):
+    install(monkeypatch)
+    assert select_asr_backend("whisper") is None
+
+
+def test_unknown_backend_names_are_rejected():
+    with pytest.raises(ValueError):
+        create_asr_backend("no-such-backend", "base")
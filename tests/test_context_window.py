@@ -0,0 +1,126 @@
+from context_window import ContextWindow, WindowView, context_length_from_show
+
+
+def make_window(**options):
+    settings = dict(
+        context_tokens=200, reserve_tokens=40, summary_max_tokens=40, trim_ratio=0.5
+    )
+    settings.update(options)
+    return ContextWindow(**settings)
+
+
+def add_turns(window, count, tokens=20):
+    for i in range(count):
+        window.append("user", f"Question {i}? More words here.", tokens=tokens)
+        window.append("assistant", f"Answer {i}. It goes on.", tokens=tokens)
+
+
+def test_budget_keeps_the_reserve_free_but_at_most_half_the_context():
+    assert make_window().budget == 160
+    assert make_window(context_tokens=60).budget == 30
+    window = make_window()
+    window.set_context_tokens(1000)
+    assert window.budget == 960
+
+
+def test_under_budget_nothing_is_dropped():
+    window = make_window()
+    add_turns(window, 4)
+    assert window.trims == 0
+    assert [m["content"] for m in window.select()][0] == "Question 0? More words here."
+    assert window.selected_tokens() == 160
+
+
+def test_over_budget_trims_down_to_trim_ratio_and_keeps_the_newest():
+    window = make_window(summarize=False)
+    add_turns(window, 4)
+    window.append("user", "Question 4?", tokens=20)  # 180 tokens against 160
+    assert window.trims == 1
+    assert window.selected_tokens() <= window.budget * window.trim_ratio
+    window.append("assistant", "Answer 4. It goes on.", tokens=20)
+    assert window.select()[-1]["content"] == "Answer 4. It goes on."
+    assert all(m["role"] != "system" for m in window.select())
+
+
+def test_prefix_is_stable_between_trims():
+    window = make_window(summarize=False)
+    add_turns(window, 5)
+    first = list(window.select())
+    window.append("user", "Short?", tokens=5)
+    assert list(window.select())[: len(first)] == first
+
+
+def test_dropped_messages_are_summarized_ahead_of_the_window():
+    window = make_window()
+    add_turns(window, 5)
+    selected = window.select()
+    summary = selected[0]
+    assert summary["role"] == "system"
+    assert summary["content"].startswith("Summary of the earlier conversation: ")
+    assert "Assistant: Answer" in summary["content"]
+    assert "More words here" not in summary["content"]  # First sentence only
+    assert window.selected_tokens() <= window.budget
+    assert window.selected_chars() == sum(len(m["content"]) for m in selected)
+
+
+def test_summary_stays_within_its_token_limit():
+    window = make_window()
+    add_turns(window, 50)
+    assert window._summary_tokens <= window.summary_max_tokens
+    # The newest dropped messages are the ones kept
+    summary = window.select()[0]["content"]
+    assert "Answer 0." not in summary
+    newest_dropped = window.messages[window.start - 1]["content"]
+    assert summary.endswith(newest_dropped.split(" More")[0])
+
+
+def test_oversized_newest_message_is_kept_alone():
+    window = make_window(summarize=False)
+    add_turns(window, 2)
+    window.append("user", "Huge", tokens=500)
+    assert [m["content"] for m in window.select()] == ["Huge"]
+
+
+def test_select_is_a_view_that_ignores_later_messages():
+    window = make_window()
+    add_turns(window, 5)
+    selected = window.select()
+    assert isinstance(selected, WindowView)
+    expected = [selected[0]] + window.messages[window.start :]
+    assert selected == expected
+    assert list(selected[:-1]) == expected[:-1]
+    assert list(selected[1:]) == expected[1:]
+    assert list(reversed(selected)) == expected[::-1]
+    assert selected[-1] is window.messages[-1]
+    window.append("user", "Later", tokens=1)
+    assert len(selected) == len(expected)
+
+
+def test_pop_and_clear():
+    window = make_window()
+    add_turns(window, 1)
+    chars = window.selected_chars()
+    window.append("user", "Failed request", tokens=3)
+    assert window.pop()["content"] == "Failed request"
+    assert (window.selected_tokens(), window.selected_chars()) == (40, chars)
+    window.clear()
+    assert list(window.select()) == []
+    assert window.selected_tokens() == window.selected_chars() == 0
+
+
+def test_record_usage_recalibrates_and_ignores_cached_prefixes():
+    window = make_window()
+    window.record_usage(sent_tokens=100, prompt_eval_count=100, sent_chars=800)
+    assert window.chars_per_token == 4.0 + 0.3 * (8.0 - 4.0)
+    before = window.chars_per_token
+    window.record_usage(sent_tokens=100, prompt_eval_count=10, sent_chars=800)
+    assert window.chars_per_token == before
+
+
+def test_context_length_from_show_response():
+    show = {
+        "model_info": {"llama.context_length": 8192},
+        "parameters": "stop <eos>\nnum_ctx 4096",
+    }
+    assert context_length_from_show(show) == (8192, 4096)
+    assert context_length_from_show({}) == (None, None)
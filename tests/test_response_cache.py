@@ -0,0 +1,116 @@
+import types
+
+import pytest
+
+import response_cache
+from response_cache import ResponseCache, normalize_prompt
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Replaces the cache's clock with one the test moves by hand."""
+    now = [1000.0]
+    monkeypatch.setattr(response_cache, "time", types.SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+@pytest.fixture
+def make_cache(tmp_path):
+    caches = []
+
+    def make(**options):
+        cache = ResponseCache(str(tmp_path / "responses.sqlite3"), **options)
+        caches.append(cache)
+        return cache
+
+    yield make
+    for cache in caches:
+        cache.close()
+
+
+def test_round_trip_and_stats(make_cache):
+    cache = make_cache()
+    key = cache.make_key("m", "What's the time?", [])
+    assert cache.get(key) is None
+    cache.put(key, "m", "What's the time?", "Noon.")
+    assert cache.get(key) == "Noon."
+    assert cache.stats() == {"hits": 1, "misses": 1, "entries": 1}
+
+
+def test_key_ignores_punctuation_and_case_but_not_the_model():
+    assert normalize_prompt("  What's the   TIME format?") == "whats the time format"
+    cache = ResponseCache(":memory:")
+    assert cache.make_key("m", "What's up?", []) == cache.make_key("m", "whats up", [])
+    assert cache.make_key("m", "What's up?", []) != cache.make_key("n", "What's up?", [])
+    cache.close()
+
+
+def test_key_depends_on_the_last_history_messages_only():
+    cache = ResponseCache(":memory:", history_messages=2)
+    turn = [
+        {"role": "user", "content": "Tell me a joke."},
+        {"role": "assistant", "content": "Why did..."},
+    ]
+    summary = {"role": "system", "content": "Summary of the earlier conversation: ..."}
+    older = {"role": "user", "content": "Hello"}
+    key = cache.make_key("m", "Repeat that", turn)
+    assert cache.make_key("m", "Repeat that", [older, summary] + turn) == key
+    assert cache.make_key("m", "Repeat that", turn[:1]) != key
+    assert cache.make_key("m", "Repeat that", turn[::-1]) != key
+    cache.close()
+
+
+def test_expired_entries_are_not_returned(make_cache, clock):
+    cache = make_cache(ttl_seconds=60)
+    cache.put("k", "m", "q", "old answer")
+    clock[0] += 59
+    assert cache.get("k") == "old answer"
+    clock[0] += 2  # Reading does not extend the lifetime
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entries_are_evicted_over_max_bytes(make_cache, clock):
+    cache = make_cache(max_bytes=30)
+    for key in ("a", "b", "c"):
+        cache.put(key, "m", key, "x" * 10)
+        clock[0] += 1
+    assert cache.get("a") == "x" * 10  # Now more recent than b
+    clock[0] += 1
+    cache.put("d", "m", "d", "x" * 10)
+    assert cache.get("b") is None
+    assert [cache.get(key) is not None for key in ("a", "c", "d")] == [True] * 3
+
+
+def test_response_larger_than_the_cache_is_not_stored(make_cache):
+    cache = make_cache(max_bytes=10)
+    cache.put("k", "m", "q", "x" * 11)
+    assert cache.get("k") is None
+
+
+def test_bypass_skips_the_cache_without_clearing_it(make_engine):
+    pytest.importorskip("ollama")
+    from benchmarks.fake_ollama import DEFAULT_MODEL, FakeOllamaServer
+    from ollama_client import OllamaService
+
+    with FakeOllamaServer(answer="Fresh answer.", ttft=0.0) as server:
+        engine = make_engine(
+            response_cache_enabled=True, ollama_model=DEFAULT_MODEL, ollama_host=server.url
+        )
+        engine.ollama_service = OllamaService(host=server.url)
+        try:
+            key = engine.response_cache.make_key(DEFAULT_MODEL, "Hi", [])  # First turn
+            engine.response_cache.put(key, DEFAULT_MODEL, "Hi", "Cached answer.")
+
+            engine.settings["response_cache_bypass"] = True
+            engine.submit_query("Hi").result(timeout=10)
+            assert server.chat_requests == 1
+            assert engine.response_cache.stats()["hits"] == 0
+
+            engine.context_window.clear()
+            engine.settings["response_cache_bypass"] = False
+            engine.submit_query("Hi").result(timeout=10)
+            assert server.chat_requests == 1
+            assert engine.response_cache.stats()["hits"] == 1
+        finally:
+            engine.ollama_service.close()
@@ -0,0 +1,110 @@
+import json
+import os
+import urllib.request
+
+import pytest
+
+from benchmarks.fake_ollama import DEFAULT_MODEL, FakeOllamaServer
+from session_recorder import SESSION_EXTENSION, SessionRecorder, read_session
+
+TIMELINE = {"started_at": 1000.0, "spans_ms": {"first_token": 120.0}}
+
+
+def record(directory, turns, **options):
+    """Records turns, each a (query, pcm, [(offset, token)]) triple, and returns the file."""
+    recorder = SessionRecorder(str(directory), session_info={"ollama_model": "m"}, **options)
+    for turn_id, (query, pcm, tokens) in enumerate(turns, 1):
+        if pcm:
+            recorder.add_audio(turn_id, pcm, 16000)
+        if query is not None:
+            recorder.set_query(turn_id, query, "voice" if pcm else "text")
+        for offset, token in tokens:
+            recorder.add_token(turn_id, offset, token)
+        recorder.set_response_info(turn_id, eval_count=len(tokens))
+        recorder.finish_turn(turn_id, TIMELINE)
+    recorder.close()
+    return recorder.path
+
+
+def test_round_trip(tmp_path):
+    pcm = bytes(range(256)) * 40
+    path = record(
+        tmp_path,
+        [
+            ("What time is it?", pcm, [(0.2, "It is"), (0.25, " noon.")]),
+            ("Typed", b"", [(0.1, "Ok.")]),
+        ],
+    )
+    assert path.endswith(SESSION_EXTENSION)
+    session_info, turns = read_session(path)
+    assert session_info["kind"] == "session"
+    assert session_info["ollama_model"] == "m"
+    first, second = turns
+    assert (first["turn"], first["query"], first["input"]) == (1, "What time is it?", "voice")
+    assert first["pcm"] == pcm
+    assert first["sample_rate"] == 16000
+    assert first["tokens"] == [[0.2, "It is"], [0.25, " noon."]]
+    assert first["eval_count"] == 2
+    assert first["timeline"] == TIMELINE
+    assert (second["input"], second["pcm"]) == ("text", b"")
+
+
+def test_turns_with_nothing_asked_are_skipped_and_idle_sessions_leave_no_file(tmp_path):
+    assert record(tmp_path, [(None, b"", [])]) is None
+    assert os.listdir(tmp_path) == []
+    path = record(tmp_path, [(None, b"", []), ("Hi", b"", [])])
+    assert [turn["query"] for turn in read_session(path)[1]] == ["Hi"]
+
+
+def test_a_cut_short_file_reads_up_to_its_last_complete_record(tmp_path):
+    path = record(tmp_path, [("One", b"\x00" * 100, []), ("Two", b"\x01" * 100, [])])
+    with open(path, "rb+") as f:
+        f.truncate(os.path.getsize(path) - 5)
+    assert [turn["query"] for turn in read_session(path)[1]] == ["One"]
+
+
+def test_other_files_are_rejected(tmp_path):
+    path = tmp_path / "other.vsession"
+    path.write_bytes(b"RIFF....")
+    with pytest.raises(ValueError):
+        read_session(str(path))
+
+
+def test_old_sessions_are_rotated(tmp_path):
+    for i in range(3):
+        name = f"{SessionRecorder.FILE_PREFIX}2020010{i}_000000{SESSION_EXTENSION}"
+        (tmp_path / name).write_bytes(b"")
+    path = record(tmp_path, [("Hi", b"", [])], max_files=2)
+    remaining = sorted(os.listdir(tmp_path))
+    assert len(remaining) == 2
+    assert os.path.basename(path) in remaining
+    assert "session_20200100_000000.vsession" not in remaining
+
+
+def test_sessions_started_at_the_same_moment_get_their_own_files(tmp_path, monkeypatch):
+    monkeypatch.setattr("session_recorder.time.time", lambda: 1700000000.25)
+    first = record(tmp_path, [("One", b"", [])])
+    second = record(tmp_path, [("Two", b"", [])])
+    assert first != second
+    assert [turn["query"] for turn in read_session(first)[1]] == ["One"]
+    assert [turn["query"] for turn in read_session(second)[1]] == ["Two"]
+
+
+def test_replay_streams_the_recorded_tokens_in_order(tmp_path):
+    tokens = [(0.0, "Recorded"), (0.02, " answer"), (0.05, ", replayed.")]
+    _, turns = read_session(record(tmp_path, [("Question", b"", tokens)]))
+    recorded = turns[0]["tokens"]
+    with FakeOllamaServer(speed=10.0) as server:
+        # As benchmarks/session_replay.py does: the recorded schedule, whatever the query
+        server.answer_for = lambda messages: recorded
+        request = urllib.request.Request(
+            server.url + "/api/chat",
+            data=json.dumps(
+                {"model": DEFAULT_MODEL, "messages": [{"role": "user", "content": "Question"}]}
+            ).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(request, timeout=5) as response:
+            chunks = [json.loads(line) for line in response if line.strip()]
+    assert [chunk["message"]["content"] for chunk in chunks[:-1]] == [t for _, t in tokens]
+    assert chunks[-1]["done"] and chunks[-1]["eval_count"] == len(tokens)
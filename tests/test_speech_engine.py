@@ -0,0 +1,167 @@
+import concurrent.futures
+import threading
+
+from benchmarks.null_tts import SilentSynthesizer
+from speech_engine import TTS_SETTINGS_CHANGED, TTS_SHUTDOWN, TTS_STOP, SpeechChatEngine
+from tts_cache import SpeechCache
+
+
+class GatedSynthesizer(SilentSynthesizer):
+    """Holds every render until release is set, and sets rendering when one starts."""
+
+    def __init__(self):
+        super().__init__(render_seconds_per_char=0.0)
+        self.rendering = threading.Event()
+        self.release = threading.Event()
+
+    def runAndWait(self):
+        self.rendering.set()
+        self.release.wait(timeout=5)
+        super().runAndWait()
+
+
+class GatedSpeechChatEngine(SpeechChatEngine):
+    def create_tts_engine(self):
+        self.synthesizer = GatedSynthesizer()
+        return self.synthesizer
+
+
+def drain(pending_queue):
+    items = []
+    while not pending_queue.empty():
+        items.append(pending_queue.get_nowait())
+    return items
+
+
+def test_interrupt_keeps_control_messages_queued(make_engine):
+    engine = make_engine()
+    epoch = engine.turn_epoch
+    engine.tts_synthesis_queue.put((epoch, "Old sentence."))
+    engine.update_tts_settings(150, 0.5)
+    engine.tts_text_queue.put((epoch, "Old text"))
+    engine.interrupt_turn()
+    assert engine.turn_epoch == epoch + 1
+    assert drain(engine.tts_synthesis_queue) == [(epoch, "Old sentence."), TTS_SETTINGS_CHANGED]
+    assert drain(engine.tts_text_queue) == [(epoch, "Old text"), TTS_STOP]
+
+
+def test_speech_cache_keys_on_the_settings_a_sentence_was_rendered_with(make_engine):
+    engine = make_engine(
+        GatedSpeechChatEngine,
+        tts_cache_enabled=True,
+        tts_cache_prewarm_phrases=[],
+        tts_rate=180,
+        tts_volume=1.0,
+    )
+    epoch = engine.turn_epoch
+    worker = threading.Thread(target=engine._tts_synthesis_worker, daemon=True)
+    worker.start()
+    engine.tts_synthesis_queue.put((epoch, "Being rendered."))
+    assert engine.synthesizer.rendering.wait(timeout=5)
+    # Queued at the old settings, then the change, which the worker applies in order
+    engine.tts_synthesis_queue.put((epoch, "Queued before the change."))
+    engine.update_tts_settings(90, 0.5)
+    engine.tts_synthesis_queue.put((epoch, "Queued after the change."))
+    engine.tts_synthesis_queue.put(TTS_SHUTDOWN)
+    engine.synthesizer.release.set()
+    spoken = []
+    while len(spoken) < 3:
+        spoken.append(engine.tts_audio_queue.get(timeout=5)[1])
+    worker.join(timeout=5)
+
+    _, before, after = spoken
+    assert len(after.pcm) > len(before.pcm)  # Rendered at half the rate
+    assert SpeechCache.key(before.text, None, 180, 1.0) in engine.tts_cache
+    assert SpeechCache.key(before.text, None, 90, 0.5) not in engine.tts_cache
+    assert SpeechCache.key(after.text, None, 90, 0.5) in engine.tts_cache
+
+
+class ScriptedMicrophone:
+    """Capture stand-in: begin_capture() starts an empty capture the test appends to."""
+
+    def __init__(self):
+        self.frames = None
+
+    def is_open(self):
+        return True
+
+    def begin_capture(self):
+        self.frames = []
+        return self.frames
+
+    def end_capture(self):
+        frames, self.frames = self.frames, None
+        return 0, len(frames), frames
+
+
+class ScriptedASR:
+    """ASR worker stand-in that names the audio it got; holds decodes until release is set."""
+
+    backend_name = "scripted"
+
+    def __init__(self):
+        self.decoding = threading.Event()
+        self.release = threading.Event()
+        self.decoded = []
+
+    def is_ready(self):
+        return True
+
+    def transcribe(self, pcm, initial_prompt=None):
+        self.decoding.set()
+        self.release.wait(timeout=5)
+        self.decoded.append(pcm)
+        return pcm.decode("ascii"), 0.0
+
+
+class ScriptedVoiceEngine(SpeechChatEngine):
+    def __init__(self, **kwargs):
+        self.queries = []
+        super().__init__(**kwargs)
+        self.asr_worker = ScriptedASR()
+
+    def create_audio_capture(self):
+        return ScriptedMicrophone()
+
+    def asr_ready(self):
+        return True
+
+    def submit_query(self, query):
+        self.queries.append(query)
+
+
+def press_and_speak(engine, words):
+    engine.begin_voice_turn()
+    engine.start_recording()
+    engine.audio_capture.frames.append(words)
+    engine.stop_recording()
+    return engine.transcription_thread
+
+
+def test_a_press_during_transcription_drops_the_old_turn(make_engine):
+    engine = make_engine(
+        ScriptedVoiceEngine, streaming_transcription=False, vad_enabled=False
+    )
+    first = press_and_speak(engine, b"first question")
+    assert engine.asr_worker.decoding.wait(timeout=5)
+    second = press_and_speak(engine, b"second question")
+    engine.asr_worker.release.set()
+    first.join(timeout=5)
+    second.join(timeout=5)
+    assert sorted(engine.asr_worker.decoded) == [b"first question", b"second question"]
+    assert engine.queries == ["second question"]
+
+
+def test_a_press_while_the_answer_streams_flags_its_turn_interrupted(make_engine):
+    engine = make_engine()
+    engine.begin_voice_turn()
+    # submit_query tags the timeline with its epoch and keeps the stream's future
+    engine.turn_metrics.set_epoch(engine.turn_epoch)
+    engine.ollama_chat_future = concurrent.futures.Future()
+    answered = engine.turn_metrics.current_turn_id()
+    engine.begin_voice_turn()
+    assert engine.ollama_chat_future.cancelled()
+    finished = engine.turn_metrics.turns[-1]
+    assert finished.turn_id == answered
+    assert finished.interrupted
+    assert engine.turn_metrics.current_turn_id() != answered
@@ -0,0 +1,300 @@
+import pytest
+
+from text_stream import (
+    FenceTokenizer,
+    SentenceSegmenter,
+    SpeechFilter,
+    StreamingTextCleaner,
+    remove_special_characters,
+)
+
+
+def chunkings(text):
+    """The whole text, one character at a time, every split in two and fixed sizes."""
+    yield [text]
+    yield list(text)
+    for i in range(1, len(text)):
+        yield [text[:i], text[i:]]
+    for size in (2, 3, 5, 7):
+        yield [text[i : i + size] for i in range(0, len(text), size)]
+
+
+def segment(chunks, **options):
+    segmenter = SentenceSegmenter(**options)
+    sentences = []
+    for chunk in chunks:
+        sentences.extend(segmenter.feed(chunk))
+    return sentences + segmenter.flush()
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        (
+            "Dr. Smith arrived at 3.30 pm. He left e.g. early! Did he? Yes.",
+            ["Dr. Smith arrived at 3.30 pm.", "He left e.g. early!", "Did he?", "Yes."],
+        ),
+        (
+            "J. R. R. Tolkien wrote it. Then... he slept. Wait… What?",
+            ["J. R. R. Tolkien wrote it.", "Then... he slept.", "Wait…", "What?"],
+        ),
+        (
+            "Steps:\n1. Open it\n2. Close it\n\nDone.",
+            ["Steps:", "1. Open it", "2. Close it", "Done."],
+        ),
+        (
+            "- one\n- two\nplain line\ncontinues here.",
+            ["- one", "- two", "plain line\ncontinues here."],
+        ),
+        ('He said "Stop." Then left.', ['He said "Stop."', "Then left."]),
+        ("Visit example.com/a.b now. Ok", ["Visit example.com/a.b now.", "Ok"]),
+    ],
+)
+def test_sentences_are_the_same_whatever_the_chunking(text, expected):
+    for chunks in chunkings(text):
+        assert segment(chunks) == expected, chunks
+
+
+def test_boundary_at_the_end_of_a_chunk_waits_for_the_next_character():
+    segmenter = SentenceSegmenter()
+    assert segmenter.feed("It is 3.") == []
+    assert segmenter.feed("14 today. Next") == ["It is 3.14 today."]
+    assert segmenter.flush() == ["Next"]
+
+
+def test_abbreviation_split_across_chunks_does_not_end_the_sentence():
+    segmenter = SentenceSegmenter()
+    assert segmenter.feed("Ask Dr") == []
+    assert segmenter.feed(". Smith now. ") == ["Ask Dr. Smith now."]
+
+
+def test_text_without_boundaries_is_cut_at_a_space():
+    sentences = segment(["word " * 10], max_chunk_chars=20)
+    assert sentences == ["word word word word", "word word word", "word word word"]
+    assert all(len(sentence) <= 20 for sentence in sentences)
+
+
+def test_flush_resets_the_segmenter():
+    segmenter = SentenceSegmenter()
+    segmenter.feed("Left over")
+    assert segmenter.flush() == ["Left over"]
+    assert segmenter.flush() == []
+    assert segment(["  \n\n "]) == []
+
+
+def speak(chunks):
+    speech_filter = SpeechFilter()
+    return "".join(speech_filter.feed(chunk) for chunk in chunks) + speech_filter.flush()
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("Run `ls` now.", "Run ls now."),
+        ("Use `os.path.join(a, b)` here.", "Use code here."),
+        ("Use ``a`b`` ok", "Use a`b ok"),  # A double-backtick span may contain a backtick
+        ("Price 5` odd\nnext", "Price 5 odd\nnext"),  # Never closed on its line: literal
+        ("use `x", "use x"),
+        (
+            "Try:\n```python\nprint(`x`)\n```\nDone.",
+            "Try:\n The code is shown on screen. \nDone.",
+        ),
+        ("Open ```\ncode never closed", "Open  The code is shown on screen. "),
+        ("See https://example.com/x. Then www.foo.org ok", "See link. Then link ok"),
+        (
+            "| a | b |\n|---|---|\n| 1 | 2 |\nAfter.",
+            " The table is shown on screen. After.",
+        ),
+    ],
+)
+def test_speech_is_the_same_whatever_the_chunking(text, expected):
+    for chunks in chunkings(text):
+        assert speak(chunks) == expected, chunks
+
+
+def test_feed_events_matches_feed_with_a_shared_tokenizer():
+    text = "Intro `x`.\n```sh\nls -la\n```\nSee http://a.b/c now."
+    for chunks in chunkings(text):
+        tokenizer = FenceTokenizer()
+        speech_filter = SpeechFilter()
+        spoken = "".join(speech_filter.feed_events(tokenizer.feed(chunk)) for chunk in chunks)
+        spoken += speech_filter.feed_events(tokenizer.flush()) + speech_filter.flush()
+        assert spoken == speak([text])
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "Look:\n```Python\nprint(1)\n```\nDone.",
+        "````md\n```py\nx = 1\n```\n````\n| a |\nAfter `x`.",
+        "Text ```inline``` and `tick` more https://x.io```",
+        "  ```sh\nls\n``` then ``",
+        "```js\nlet x",
+    ],
+)
+def test_feed_finds_the_same_fences_as_the_tokenizer(text):
+    expected = [event for event in fence_events([text]) if event[0] != "text"]
+    for chunks in chunkings(text):
+        speech_filter = SpeechFilter()
+        events = []
+        for chunk in chunks:
+            speech_filter.feed(chunk)
+            events.extend(speech_filter.take_fence_events())
+        speech_filter.flush()
+        events.extend(speech_filter.take_fence_events())
+        merged = []
+        for kind, value in events:
+            if merged and kind == "code_delta" and merged[-1][0] == kind:
+                merged[-1] = (kind, merged[-1][1] + value)
+            else:
+                merged.append((kind, value))
+        assert merged == expected, chunks
+
+
+def test_indentation_before_a_fence_is_not_spoken():
+    for chunks in chunkings("Hi\n  ```\ncode\n```"):
+        assert speak(chunks) == "Hi\n The code is shown on screen. ", chunks
+
+
+def test_dropped_characters_are_counted():
+    speech_filter = SpeechFilter()
+    speech_filter.feed("A ```\n12345\n``` and http://x.io")
+    speech_filter.flush()
+    assert speech_filter.dropped_chars == len("12345\n") + len("http://x.io")
+
+
+def clean(chunks):
+    cleaner = StreamingTextCleaner()
+    return "".join(cleaner.feed(chunk) for chunk in chunks) + cleaner.flush()
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("<think>plan it</think>Hello  there!", "Hello there!"),
+        ("  Hi (there) & you.\n\n\n- Item one\nnext", "Hi there you.\n\n- Item one\nnext"),
+        ("a \n$$\n b", "a\n\nb"),  # A paragraph break with dropped characters inside
+        ("Sure.#<think>x</think> Done", "Sure. Done"),
+        ("Stray </think> tag <THINK >", "Stray tag"),  # An unclosed block hides the rest
+        ("x < y and 3<4", "x y and 34"),
+        ("Emoji 😀 and\tnbsp\xa0here", "Emoji and nbsp here"),
+    ],
+)
+def test_cleaning_is_the_same_whatever_the_chunking(text, expected):
+    for chunks in chunkings(text):
+        assert clean(chunks) == expected, chunks
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "<think>\nreasoning\n</think>\n\n**Sure!** Room #4, 3.30 pm; bring notes & draft.",
+        "Mixed\t whitespace \r\n here -> there @sam (ok) “quoted” text",
+        "a<think>b</think>c < think>d< / think >e",
+    ],
+)
+def test_matches_remove_special_characters_apart_from_line_breaks(text):
+    assert " ".join(clean(list(text)).split()) == remove_special_characters(text)
+
+
+def test_partial_think_tag_is_held_back_until_decided():
+    cleaner = StreamingTextCleaner()
+    assert cleaner.feed("Hi <thi") == "Hi"
+    assert cleaner.feed("nk>secret</th") == ""
+    assert cleaner.feed("ink> there") == " there"
+    assert cleaner.flush() == ""
+
+
+def fence_events(chunks):
+    """FenceTokenizer events with consecutive text or code pieces joined."""
+    tokenizer = FenceTokenizer()
+    events = []
+    for chunk in chunks:
+        events.extend(tokenizer.feed(chunk))
+    events.extend(tokenizer.flush())
+    merged = []
+    for kind, value in events:
+        if merged and kind in ("text", "code_delta") and merged[-1][0] == kind:
+            merged[-1] = (kind, merged[-1][1] + value)
+        else:
+            merged.append((kind, value))
+    return merged
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        (
+            "Look:\n```Python\nprint(1)\n```\nDone.",
+            [
+                ("text", "Look:\n"),
+                ("code_start", "python"),
+                ("code_delta", "print(1)\n"),
+                ("code_end", None),
+                ("text", "\nDone."),
+            ],
+        ),
+        (
+            "```\nuse `x` and ``y``\n```\nok",
+            [
+                ("code_start", "text"),
+                ("code_delta", "use `x` and ``y``\n"),
+                ("code_end", None),
+                ("text", "\nok"),
+            ],
+        ),
+        (
+            "````md\n```py\nx = 1\n```\n````\nAfter.",
+            [
+                ("code_start", "md"),
+                ("code_delta", "```py\nx = 1\n```\n"),
+                ("code_end", None),
+                ("text", "\nAfter."),
+            ],
+        ),
+        (
+            "Text ```inline``` and `tick` more",
+            [
+                ("text", "Text "),
+                ("code_start", "text"),
+                ("code_delta", "inline"),
+                ("code_end", None),
+                ("text", " and `tick` more"),
+            ],
+        ),
+        (
+            "```js\nlet x",  # Never closed: flush() closes it
+            [("code_start", "js"), ("code_delta", "let x"), ("code_end", None)],
+        ),
+        ("Ends with ``", [("text", "Ends with ``")]),
+    ],
+)
+def test_fence_events_are_the_same_whatever_the_chunking(text, expected):
+    for chunks in chunkings(text):
+        assert fence_events(chunks) == expected, chunks
+
+
+def test_fence_split_across_chunks_is_held_back():
+    tokenizer = FenceTokenizer()
+    assert tokenizer.feed("Code: `") == [("text", "Code: ")]
+    assert tokenizer.feed("``") == []
+    assert tokenizer.feed("sh\n") == [("code_start", "sh")]
+    assert tokenizer.in_code
+
+
+def test_unterminated_fence_is_closed_at_flush():
+    tokenizer = FenceTokenizer()
+    tokenizer.feed("Intro\n```python")
+    events = tokenizer.flush()
+    assert events[-1] == ("code_end", None)
+    assert [kind for kind, _ in events].count("code_start") == 1
+    assert not tokenizer.in_code
+
+
+def test_long_info_string_without_newline_is_code():
+    code = "x" * 100
+    assert fence_events(["```" + code + "\n```"]) == [
+        ("code_start", "text"),
+        ("code_delta", code + "\n"),
+        ("code_end", None),
+    ]
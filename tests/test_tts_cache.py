@@ -0,0 +1,59 @@
+import os
+
+from tts_cache import SpeechCache
+from tts_output import RenderedSpeech
+
+
+def speech(text, frames=100):
+    return RenderedSpeech(
+        text=text, pcm=b"\x01\x00" * frames, sample_rate=22050, channels=1, sample_width=2
+    )
+
+
+def test_key_is_stable_and_covers_every_voice_setting():
+    key = SpeechCache.key("Hello.", "voice-1", 180, 1.0)
+    assert key == SpeechCache.key("Hello.", "voice-1", 180, 1)
+    assert key == SpeechCache.key("Hello.", "voice-1", 180, 1.0001)  # Volume to 3 decimals
+    assert len(key) == 64
+    others = [
+        SpeechCache.key("Hello!", "voice-1", 180, 1.0),
+        SpeechCache.key("Hello.", "voice-2", 180, 1.0),
+        SpeechCache.key("Hello.", "voice-1", 150, 1.0),
+        SpeechCache.key("Hello.", "voice-1", 180, 0.9),
+    ]
+    assert key not in others
+
+
+def test_round_trip(tmp_path):
+    cache = SpeechCache(str(tmp_path))
+    key = SpeechCache.key("Hello.", None, 180, 1.0)
+    assert key not in cache
+    assert cache.get(key, "Hello.") is None
+    cache.put(key, speech("Hello."))
+    assert key in cache
+    assert cache.get(key, "Hello.") == speech("Hello.")
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_files_are_evicted_over_max_bytes(tmp_path):
+    cache = SpeechCache(str(tmp_path), max_bytes=10**6)
+    keys = [SpeechCache.key(f"Sentence {i}.", None, 180, 1.0) for i in range(3)]
+    for age, key in zip((30, 20, 10), keys):
+        cache.put(key, speech(key))
+        old = os.path.getmtime(cache._path(key)) - age
+        os.utime(cache._path(key), (old, old))
+    file_size = os.path.getsize(cache._path(keys[0]))
+    assert cache.get(keys[0], "") is not None  # Reading makes the oldest the newest
+
+    cache.max_bytes = 3 * file_size
+    newest = SpeechCache.key("Sentence 3.", None, 180, 1.0)
+    cache.put(newest, speech(newest))
+    assert [key in cache for key in keys + [newest]] == [True, False, True, True]
+    assert sum(os.path.getsize(tmp_path / name) for name in os.listdir(tmp_path)) <= cache.max_bytes
+
+
+def test_size_index_is_rebuilt_from_the_directory(tmp_path):
+    cache = SpeechCache(str(tmp_path))
+    cache.put(SpeechCache.key("A.", None, 180, 1.0), speech("A."))
+    reopened = SpeechCache(str(tmp_path))
+    assert reopened._total_bytes == cache._total_bytes > 0
@@ -0,0 +1,104 @@
+import threading
+
+from ui_updates import UIUpdateChannel
+
+
+class FakeRoot:
+    """Records after() callbacks instead of running a Tk main loop."""
+
+    def __init__(self):
+        self.pending = {}  # after id -> callback
+        self._next_id = 0
+
+    def after(self, delay_ms, callback):
+        self._next_id += 1
+        self.pending[self._next_id] = callback
+        return self._next_id
+
+    def after_cancel(self, after_id):
+        self.pending.pop(after_id, None)
+
+    def run_pending(self):
+        callbacks, self.pending = list(self.pending.values()), {}
+        for callback in callbacks:
+            callback()
+
+
+class FakeTextbox:
+    def __init__(self, on_insert=None):
+        self.text = ""
+        self.options = {}
+        self.on_insert = on_insert
+
+    def insert(self, index, text):
+        self.text += text
+        if self.on_insert:
+            self.on_insert()
+
+    def delete(self, start, end):
+        self.text = ""
+
+    def see(self, index):
+        pass
+
+    def configure(self, **options):
+        self.options.update(options)
+
+
+def started_channel():
+    root = FakeRoot()
+    channel = UIUpdateChannel(root)
+    channel.start()
+    return root, channel
+
+
+def test_an_idle_pump_schedules_nothing():
+    root, _ = started_channel()
+    assert not root.pending
+
+
+def test_posts_arm_one_frame_and_a_drained_pump_stops():
+    root, channel = started_channel()
+    textbox = FakeTextbox()
+    channel.append_text(textbox, "Hello")
+    channel.append_text(textbox, ", world")
+    assert len(root.pending) == 1
+    root.run_pending()
+    assert textbox.text == "Hello, world"
+    assert not root.pending
+    channel.set_text(textbox, "Again")
+    assert len(root.pending) == 1
+
+
+def test_updates_posted_during_a_frame_get_the_next_one():
+    root, channel = started_channel()
+    status = FakeTextbox()
+    textbox = FakeTextbox(on_insert=lambda: channel.configure(status, text="busy"))
+    channel.append_text(textbox, "token")
+    root.run_pending()
+    assert len(root.pending) == 1
+    root.run_pending()
+    assert status.options == {"text": "busy"}
+    assert not root.pending
+
+
+def test_a_worker_thread_post_arms_the_pump():
+    root, channel = started_channel()
+    textbox = FakeTextbox()
+    worker = threading.Thread(target=channel.append_text, args=(textbox, "from a worker"))
+    worker.start()
+    worker.join()
+    assert len(root.pending) == 1
+    root.run_pending()
+    assert textbox.text == "from a worker"
+
+
+def test_stop_applies_what_is_buffered_and_disarms():
+    root, channel = started_channel()
+    textbox = FakeTextbox()
+    channel.append_text(textbox, "last words")
+    channel.stop()
+    assert textbox.text == "last words"
+    assert not root.pending
+    channel.append_text(textbox, " buffered until started again")
+    assert not root.pending
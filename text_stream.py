@@ -0,0 +1,683 @@
+import re
+
+# Words that end with a period without ending the sentence. Compared lowercased,
+# with inner periods kept ("e.g", "i.e").
+DEFAULT_ABBREVIATIONS = frozenset(
+    [
+        "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "mt", "vs", "e.g",
+        "i.e", "cf", "approx", "dept", "fig", "inc", "ltd", "corp", "vol", "jan",
+        "feb", "mar", "apr", "jun", "jul", "aug", "sep", "sept", "oct", "nov",
+        "dec", "u.s", "u.k", "a.m", "p.m",
+    ]
+)  # fmt: skip
+
+_BOUNDARY_CANDIDATE = re.compile(r"[.!?\n…]")
+_LIST_ITEM_START = re.compile(r"(?:[-*+•]\s|\d{1,3}[.)]\s|#)")
+_TERMINATORS = ".!?…"
+_CLOSERS = "\"')]”’"
+
+
+class SentenceSegmenter:
+    """
+    Incremental sentence splitter for streamed LLM text.
+
+    feed() appends a chunk and returns the sentences it completed. Only characters that
+    have not been examined before are scanned, so the cost per chunk is proportional to
+    the chunk, not to the buffered text. A boundary right at the end of the buffer is
+    decided once the next character arrives (or at flush()). Handles abbreviations,
+    initials, decimals, ellipses, numbered and bulleted list items and paragraph breaks.
+    Text without any boundary is flushed at the last space before max_chunk_chars.
+    """
+
+    def __init__(self, max_chunk_chars=500, abbreviations=DEFAULT_ABBREVIATIONS):
+        self.max_chunk_chars = max_chunk_chars
+        self.abbreviations = abbreviations
+        self._buffer = ""
+        self._scan_pos = 0
+
+    def feed(self, text):
+        if text:
+            self._buffer += text
+        return self._scan(final=False)
+
+    def flush(self):
+        """Returns the remaining buffered text as the final sentence(s) and resets."""
+        sentences = self._scan(final=True)
+        tail = self._buffer.strip()
+        if tail:
+            sentences.append(tail)
+        self.reset()
+        return sentences
+
+    def reset(self):
+        self._buffer = ""
+        self._scan_pos = 0
+
+    def _scan(self, final):
+        buf = self._buffer
+        n = len(buf)
+        pos = self._scan_pos
+        start = 0
+        sentences = []
+        while True:
+            match = _BOUNDARY_CANDIDATE.search(buf, pos)
+            if match is None:
+                pos = n
+                break
+            i = match.start()
+            if buf[i] == "\n":
+                end, is_boundary = self._newline_boundary(buf, i, start, final)
+            else:
+                end, is_boundary = self._terminator_boundary(buf, i, start, final)
+            if is_boundary is None:  # Needs to see more text first
+                pos = i
+                break
+            if is_boundary:
+                sentence = buf[start:end].strip()
+                if sentence:
+                    sentences.append(sentence)
+                start = end
+            pos = end
+
+        # No boundary for too long (e.g. a paragraph without punctuation): cut at a space
+        while n - start > self.max_chunk_chars:
+            limit = start + self.max_chunk_chars
+            cut = buf.rfind(" ", start + 1, limit)
+            if cut == -1:
+                cut = limit
+            sentence = buf[start:cut].strip()
+            if sentence:
+                sentences.append(sentence)
+            start = cut
+            pos = max(pos, start)
+
+        if start:
+            self._buffer = buf[start:]
+        self._scan_pos = pos - start
+        return sentences
+
+    def _newline_boundary(self, buf, i, start, final):
+        n = len(buf)
+        j = i + 1
+        while j < n and buf[j] in " \t\r":
+            j += 1
+        if j == n:
+            return (j, True) if final else (i, None)
+        if buf[j] == "\n":
+            # Paragraph break: consume the whole blank run
+            while j < n and buf[j].isspace():
+                j += 1
+            return j, True
+        # A list item or heading line ends at its newline
+        line_start = max(start, buf.rfind("\n", start, i) + 1)
+        while line_start < i and buf[line_start] in " \t":
+            line_start += 1
+        if _LIST_ITEM_START.match(buf, line_start):
+            return j, True
+        if n - j < 4 and not final:
+            return i, None  # Not enough text to tell whether a list item starts here
+        if _LIST_ITEM_START.match(buf, j):
+            return j, True
+        return j, False  # Soft line wrap inside a sentence
+
+    def _terminator_boundary(self, buf, i, start, final):
+        n = len(buf)
+        j = i
+        while j < n and buf[j] in _TERMINATORS:
+            j += 1
+        while j < n and buf[j] in _CLOSERS:
+            j += 1
+        if j == n:
+            return (j, True) if final else (i, None)
+        if not buf[j].isspace():
+            return j, False  # 3.14, file.txt, e.g.x, example.com/...
+
+        run = buf[i:j].rstrip(_CLOSERS)
+        if run == ".":
+            k = i
+            while k > start and (buf[k - 1].isalnum() or buf[k - 1] == "."):
+                k -= 1
+            word = buf[k:i]
+            if word.lower() in self.abbreviations:
+                return j, False
+            if len(word) == 1 and word.isupper():
+                return j, False  # Initial, as in "J. R. R. Tolkien"
+            if word.isdigit() and not buf[start:k].strip():
+                return j, False  # "2. " list marker at the start of an item
+        elif run.startswith("..") or run.startswith("…"):
+            # An ellipsis followed by a lowercase word continues the sentence
+            k = j
+            while k < n and buf[k].isspace():
+                k += 1
+            if k == n:
+                return (j, True) if final else (i, None)
+            if buf[k].islower():
+                return j, False
+        return j, True
+
+
+_FENCE_LANG = re.compile(r"[A-Za-z0-9+#._-]+")
+_MAX_INFO_STRING = 64  # An "info string" longer than this is treated as code, not a language
+
+# FenceTokenizer states
+_FENCE_TEXT, _FENCE_INFO, _FENCE_CODE = range(3)
+
+
+class FenceTokenizer:
+    """
+    Incremental Markdown code-fence tokenizer for streamed responses.
+
+    feed() returns a list of events for the new text only:
+        ("text", str)          prose outside code blocks
+        ("code_start", lang)   an opening fence; lang is "text" when none was given
+        ("code_delta", str)    code inside the block
+        ("code_end", None)     the closing fence
+    Trailing backticks are held back until the next chunk shows whether they form a
+    fence, so a ``` split across chunks is still recognized. As in CommonMark, a block
+    is only closed by a run at least as long as the one that opened it, so a ```` block
+    can show a ``` example. The cost of a feed() is proportional to the chunk, never to
+    the size of the open block.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self._pending = ""
+        self._state = _FENCE_TEXT
+        self._info_parts = []
+        self._fence_len = 0  # Backticks in the fence that opened the current block
+        self.in_code = False
+
+    @property
+    def busy(self):
+        """True inside a block, or while backticks at the end of the text are held back."""
+        return self.in_code or bool(self._pending)
+
+    def feed(self, text):
+        self._pending += text
+        return self._process(final=False)
+
+    def flush(self):
+        """Emits what is held back and closes a block the response never closed."""
+        events = self._process(final=True)
+        if self._state == _FENCE_INFO:
+            events.append(("code_start", self._language()))
+            info = "".join(self._info_parts)
+            if info:
+                events.append(("code_delta", info))
+            events.append(("code_end", None))
+        elif self._state == _FENCE_CODE:
+            events.append(("code_end", None))
+        self.reset()
+        return events
+
+    def _language(self):
+        words = "".join(self._info_parts).split(None, 1)
+        if words and _FENCE_LANG.fullmatch(words[0]):
+            return words[0].lower()
+        return "text"
+
+    def _process(self, final):
+        buf = self._pending
+        n = len(buf)
+        # Backticks at the very end might be the start of a fence split across chunks
+        safe_end = n if final else len(buf.rstrip("`"))
+        events = []
+        pos = 0
+        while pos < n:
+            if self._state == _FENCE_INFO:
+                newline = buf.find("\n", pos, safe_end)
+                fence = buf.find("```", pos, safe_end)
+                if fence != -1 and (newline == -1 or fence < newline):
+                    # ```code``` on a single line: no language, the rest is the code
+                    code = "".join(self._info_parts) + buf[pos:fence]
+                    self._info_parts = []
+                    events.append(("code_start", "text"))
+                    if code:
+                        events.append(("code_delta", code))
+                    events.append(("code_end", None))
+                    self._state = _FENCE_TEXT
+                    self.in_code = False
+                    pos = fence + 3
+                elif newline != -1:
+                    self._info_parts.append(buf[pos:newline])
+                    info = "".join(self._info_parts)
+                    if len(info) > _MAX_INFO_STRING:
+                        # Same as when it arrives in pieces: too long to be a language
+                        events.append(("code_start", "text"))
+                        events.append(("code_delta", info))
+                        pos = newline
+                    else:
+                        events.append(("code_start", self._language()))
+                        pos = newline + 1
+                    self._info_parts = []
+                    self._state = _FENCE_CODE
+                else:
+                    self._info_parts.append(buf[pos:safe_end])
+                    pos = safe_end
+                    if sum(len(part) for part in self._info_parts) > _MAX_INFO_STRING:
+                        # No newline in sight: the "info string" is really code
+                        code = "".join(self._info_parts)
+                        self._info_parts = []
+                        events.append(("code_start", "text"))
+                        events.append(("code_delta", code))
+                        self._state = _FENCE_CODE
+                    break
+                continue
+
+            fence = buf.find("```", pos, safe_end)
+            end = safe_end if fence == -1 else fence
+            if end > pos:
+                kind = "code_delta" if self._state == _FENCE_CODE else "text"
+                events.append((kind, buf[pos:end]))
+            if fence == -1:
+                pos = safe_end
+                break
+            # A longer backtick run still opens/closes a single fence
+            pos = fence + 3
+            while pos < safe_end and buf[pos] == "`":
+                pos += 1
+            if self._state == _FENCE_CODE and pos - fence < self._fence_len:
+                events.append(("code_delta", buf[fence:pos]))  # Shorter: part of the code
+            elif self._state == _FENCE_CODE:
+                events.append(("code_end", None))
+                self._state = _FENCE_TEXT
+                self.in_code = False
+            else:
+                self._state = _FENCE_INFO
+                self._info_parts = []
+                self._fence_len = pos - fence
+                self.in_code = True
+        self._pending = buf[pos:]
+        return events
+
+
+# A URL ends at whitespace or at a fence, which the FenceTokenizer would split it at
+_SPEECH_SPECIAL = re.compile(r"`+|\n|(?:https?://|www\.)(?:[^\s`]|`(?!``))*")
+_URL_PREFIXES = ("https://", "http://", "www.")
+_CODE_LIKE_CHARS = frozenset("(){}[]<>=;:/\\$#@|")
+
+# SpeechFilter states
+_NORMAL, _INLINE_CODE, _TABLE = range(3)
+
+
+class SpeechFilter:
+    """
+    Streaming filter between the Ollama token stream and the TTS queue that keeps
+    Markdown which should not be read aloud away from the speech engine.
+
+    Fenced code blocks and tables are replaced by a short spoken placeholder, URLs by
+    link_placeholder, and inline code is spoken only when it is short and word-like.
+    feed() scans prose once for everything it acts on, fences included, and hands the
+    text from an opening fence to its FenceTokenizer until the block is closed, so every
+    character is scanned by one of the two. The tokenizer's code events are kept for
+    take_fence_events(), which is how the code viewer gets them without a second scan.
+    feed_events() instead takes the events of a tokenizer the caller runs itself. The
+    inline-code, table and URL state is carried across chunk boundaries; ambiguous tails
+    (a lone backtick, "htt", a URL still being streamed) are held back until the next
+    chunk decides them.
+    """
+
+    def __init__(
+        self,
+        code_placeholder="The code is shown on screen.",
+        table_placeholder="The table is shown on screen.",
+        link_placeholder="link",
+        inline_code_placeholder="code",
+        inline_code_max_chars=30,
+    ):
+        self.code_placeholder = code_placeholder
+        self.table_placeholder = table_placeholder
+        self.link_placeholder = link_placeholder
+        self.inline_code_placeholder = inline_code_placeholder
+        self.inline_code_max_chars = inline_code_max_chars
+        self._fences = FenceTokenizer()
+        self.reset()
+
+    def reset(self):
+        self._fences.reset()
+        self._fence_events = []
+        self._pending = ""
+        self._state = _NORMAL
+        self._at_line_start = True
+        self._in_table_run = False
+        self._inline_delim = ""
+        self._inline_parts = []
+        self.dropped_chars = 0  # Characters kept away from TTS, for diagnostics
+
+    def feed(self, text):
+        """Returns the speakable part of everything decidable so far."""
+        if self._fences.busy:
+            return self._feed_fences(self._fences.feed(text))
+        self._pending += text
+        return self._process(final=False)
+
+    def take_fence_events(self):
+        """Returns the code_start/code_delta/code_end events found since the last call."""
+        events, self._fence_events = self._fence_events, []
+        return events
+
+    def _feed_fences(self, events):
+        self._fence_events.extend(event for event in events if event[0] != "text")
+        return self.feed_events(events)
+
+    def _hand_off_fence(self, text):
+        """Passes text, which starts with a fence, to the tokenizer; the rest comes back."""
+        self._pending = ""
+        return self._feed_fences(self._fences.feed(text))
+
+    def feed_events(self, events):
+        """Like feed(), but for FenceTokenizer events produced by the caller."""
+        out = []
+        for kind, value in events:
+            if kind == "text":
+                self._pending += value
+                out.append(self._process(final=False))
+            elif kind == "code_start":
+                # The fence decides anything held back before it
+                out.append(self._process(final=True))
+                out.append(self._close_inline_code())
+                self._state = _NORMAL
+                self._in_table_run = False
+                out.append(" " + self.code_placeholder + " ")
+            elif kind == "code_delta":
+                self.dropped_chars += len(value)
+            else:  # code_end
+                self._at_line_start = False
+        return "".join(out)
+
+    def flush(self):
+        """Returns whatever is still held back at the end of a response and resets."""
+        # Text the tokenizer still holds comes first; a fence held back
+        # here at the very end is then handed to it and flushed as well
+        out = self._feed_fences(self._fences.flush())
+        out += self._process(final=True)
+        out += self._feed_fences(self._fences.flush())
+        out += self._process(final=True)
+        out += self._close_inline_code()
+        dropped, fence_events = self.dropped_chars, self._fence_events
+        self.reset()
+        self.dropped_chars, self._fence_events = dropped, fence_events
+        return out
+
+    def _close_inline_code(self):
+        """Speaks an inline code span that was never closed as plain text."""
+        if self._state != _INLINE_CODE:
+            return ""
+        text = "".join(self._inline_parts)
+        self._inline_parts = []
+        self._state = _NORMAL
+        return text
+
+    def _speak_inline_code(self, content):
+        if len(content) <= self.inline_code_max_chars and not (
+            _CODE_LIKE_CHARS & set(content)
+        ):
+            return content
+        self.dropped_chars += len(content)
+        return self.inline_code_placeholder
+
+    def _process(self, final):
+        buf = self._pending
+        # Backticks at the very end may still grow into a fence
+        n = len(buf) if final else len(buf.rstrip("`"))
+        i = 0
+        out = []
+        while i < n:
+            if self._state == _TABLE:
+                j = buf.find("\n", i, n)
+                fence = buf.find("```", i, n if j == -1 else j)
+                if fence != -1:
+                    self.dropped_chars += fence - i
+                    return "".join(out) + self._hand_off_fence(buf[fence:])
+                if j == -1:
+                    self.dropped_chars += n - i
+                    i = n
+                    break
+                self.dropped_chars += j + 1 - i
+                i = j + 1
+                self._state = _NORMAL
+                self._at_line_start = True
+                continue
+
+            if self._state == _INLINE_CODE:
+                j = buf.find(self._inline_delim, i, n)
+                newline = buf.find("\n", i, n)
+                fence = buf.find("```", i, n)
+                if fence != -1 and (j == -1 or fence <= j) and (newline == -1 or fence < newline):
+                    # The fence wins; the span so far is spoken as plain text at code_start
+                    self._inline_parts.append(buf[i:fence])
+                    return "".join(out) + self._hand_off_fence(buf[fence:])
+                if j != -1 and (newline == -1 or j < newline):
+                    content = "".join(self._inline_parts) + buf[i:j]
+                    out.append(self._speak_inline_code(content))
+                    self._inline_parts = []
+                    self._state = _NORMAL
+                    i = j + len(self._inline_delim)
+                elif newline != -1:
+                    # Unterminated on this line: the backtick was literal after all
+                    out.append("".join(self._inline_parts) + buf[i:newline])
+                    self._inline_parts = []
+                    self._state = _NORMAL
+                    i = newline
+                else:
+                    self._inline_parts.append(buf[i:n])
+                    i = n
+                continue
+
+            if self._at_line_start:
+                k = i
+                while k < n and buf[k] in " \t":
+                    k += 1
+                if k == n:
+                    if final:
+                        i = n
+                    break
+                self._at_line_start = False
+                if buf.startswith("```", k):
+                    return "".join(out) + self._hand_off_fence(buf[k:])  # Indent dropped
+                if buf[k] == "|":
+                    self._state = _TABLE
+                    if not self._in_table_run:
+                        out.append(" " + self.table_placeholder + " ")
+                        self._in_table_run = True
+                    i = k
+                    continue
+                self._in_table_run = False
+
+            match = _SPEECH_SPECIAL.search(buf, i, n)
+            if match is None:
+                end = n
+                if not final:
+                    # Hold back a trailing word that could still become a URL
+                    word_start = max(i, buf.rfind(" ", i, n) + 1, buf.rfind("\n", i, n) + 1)
+                    if word_start < n and buf[word_start] in "hHwW":
+                        word = buf[word_start:n].lower()
+                        if any(p.startswith(word) for p in _URL_PREFIXES):
+                            end = word_start
+                out.append(buf[i:end])
+                i = end
+                break
+
+            out.append(buf[i : match.start()])
+            token = match.group()
+            if token == "\n":
+                out.append("\n")
+                self._at_line_start = True
+                i = match.end()
+            elif token[0] == "`":
+                if len(token) >= 3:
+                    return "".join(out) + self._hand_off_fence(buf[match.start() :])
+                if match.end() == n and not final:
+                    i = match.start()  # More backticks may follow in the next chunk
+                    break
+                self._state = _INLINE_CODE
+                self._inline_delim = token
+                self._inline_parts = []
+                i = match.end()
+            else:
+                if match.end() == n and not final:
+                    i = match.start()  # The URL may continue in the next chunk
+                    break
+                url = token.rstrip(".,;:!?)]'\"")
+                out.append(self.link_placeholder)
+                self.dropped_chars += len(url)
+                i = match.start() + len(url)
+
+        self._pending = buf[i:]
+        return "".join(out)
+
+
+_THINK_TAG = re.compile(r"<\s*(/?)\s*think\s*>", re.IGNORECASE)
+# Characters TTS should not see, as in remove_special_characters
+_CLEANER_DROP = re.compile(r"[^\w\s.,!?\"”-]+")
+_CLEANER_SPACES = re.compile(r"\s+")
+_KEPT_PUNCTUATION = ".,!?\"”-"
+_MAX_TAG_LEN = 16  # Longest partial "< / think >" worth holding back at a chunk end
+
+
+def _collapse_space(match):
+    newlines = match.group().count("\n")
+    return "\n\n" if newlines > 1 else "\n" if newlines else " "
+
+
+class StreamingTextCleaner:
+    """
+    Stateful replacement for remove_special_characters that runs over the token stream.
+
+    <think>...</think> regions are suppressed wherever the chunks split them. Each chunk
+    outside them gets a fixed number of compiled regex passes (drop characters, collapse
+    whitespace), and only the unfinished tail is carried over: a possible partial think
+    tag, and whitespace that waits for the next kept character. Unlike the per-sentence
+    function, line breaks are kept (one newline for a line break, two for a paragraph)
+    so the sentence segmenter can still see list items and paragraphs.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self._pending = ""  # Raw text held back for a possible partial think tag
+        self._in_think = False
+        self._space = ""  # Collapsed whitespace seen since the last kept character
+        self._started = False  # Leading whitespace of a response is dropped
+
+    def feed(self, text):
+        if not text:
+            return ""  # The speech filter is holding the chunk back
+        if self._pending or self._in_think or "<" in text:
+            self._pending += text
+            return self._process(final=False)
+        return self._clean(text)  # No tag can start in this chunk
+
+    def flush(self):
+        out = self._process(final=True)
+        self.reset()
+        return out
+
+    def _hold_back_from(self, buf):
+        """Index from which a possible partial think tag at the end must wait for more text."""
+        lt = buf.rfind("<", max(0, len(buf) - _MAX_TAG_LEN))
+        if lt != -1 and ">" not in buf[lt:]:
+            return lt
+        return len(buf)
+
+    def _clean(self, text):
+        core = text.replace(" ", "").strip(_KEPT_PUNCTUATION)
+        if "  " in text or not (core.isalnum() or not core):
+            text = self._space + _CLEANER_DROP.sub("", text)
+            # Whitespace other than a lone space is never printable, so this finds every run
+            # the collapsing pass would change
+            if "  " in text or not text.isprintable():
+                text = _CLEANER_SPACES.sub(_collapse_space, text)
+        elif self._space:
+            # Words, edge punctuation and single spaces, the usual token: nothing to drop or
+            # collapse, only the carried space to merge
+            text = self._space + (text[1:] if text[:1] == " " else text)
+        # Trailing whitespace is decided by what follows, so it is carried, not emitted
+        kept = text.rstrip()
+        self._space = text[len(kept) :]
+        if not self._started:
+            kept = kept.lstrip()
+            self._started = bool(kept)
+        return kept
+
+    def _process(self, final):
+        buf = self._pending
+        limit = len(buf) if final else self._hold_back_from(buf)
+        out = []
+        pos = 0
+        while pos < limit:
+            match = _THINK_TAG.search(buf, pos, limit)
+            end = limit if match is None else match.start()
+            if end > pos and not self._in_think:
+                out.append(self._clean(buf[pos:end]))
+            if match is None:
+                pos = limit
+                break
+            # Inside a think block only a closing tag counts; outside, a stray one is dropped
+            self._in_think = not match.group(1)
+            pos = match.end()
+        self._pending = buf[pos:]
+        return "".join(out)
+
+
+def remove_special_characters(text_input):  # This is the function your TTS worker uses
+    """
+    Cleans text for TTS:
+    1. Removes entire <think>...</think> blocks (tags and content).
+    2. Removes any stray <think> or </think> tags.
+    3. Cleans other non-essential special characters for smoother speech.
+    4. Consolidates whitespace.
+
+    Works on one complete piece of text; StreamingTextCleaner does the same over a
+    token stream.
+    """
+    if not isinstance(text_input, str):
+        return ""
+
+    # 1. Remove entire <think>...</think> blocks (tags and their content)
+    processed_text = re.sub(
+        r"<\s*think\s*>.*?<\s*/\s*think\s*>",
+        "",
+        text_input,
+        flags=re.IGNORECASE | re.DOTALL,
+    )
+
+    # 2. Remove any standalone <think> or </think> tags
+    processed_text = re.sub(
+        r"<\s*/?\s*think\s*>", "", processed_text, flags=re.IGNORECASE
+    )
+
+    # 3. Further cleanup of other special characters (keeping essential punctuation)
+    processed_text = re.sub(r"[^\w\s.,!?\"”-]", "", processed_text)
+
+    # 4. Consolidate multiple spaces and strip.
+    processed_text = re.sub(r"\s+", " ", processed_text).strip()
+
+    return processed_text
+
+
+def legacy_regex_segment(buffer):
+    """
+    The sentence splitting the TTS worker used before SentenceSegmenter, kept as a
+    reference for benchmarks. Returns (sentences, remaining_buffer); it re-runs
+    re.search/re.split over the whole buffer on every call.
+    """
+    sentences_to_process = []
+    if re.search(r"[.!?\"”\n]\s*$", buffer) or "\n\n" in buffer:
+        split_parts = re.split(r"(?<=[.!?\"”])\s+|\n\n+", buffer)
+        if len(split_parts) > 1 and split_parts[-1] == "":
+            sentences_to_process = [s for s in split_parts[:-1] if s.strip()]
+            buffer = ""
+        elif len(split_parts) == 1 and split_parts[0].strip():
+            sentences_to_process = [split_parts[0].strip()]
+            buffer = ""
+        elif len(split_parts) > 1:
+            sentences_to_process = [s for s in split_parts[:-1] if s.strip()]
+            buffer = split_parts[-1]
+    if len(buffer) > 500:
+        sentences_to_process.append(buffer)
+        buffer = ""
+    return sentences_to_process, buffer
@@ -0,0 +1,104 @@
+import hashlib
+import json
+import os
+import threading
+import wave
+
+from tts_output import RenderedSpeech
+
+
+class SpeechCache:
+    """
+    Content-addressed cache of synthesized sentences, stored as WAV files.
+
+    A sentence is filed under a hash of its cleaned text and the voice, rate and volume
+    it was rendered with, so changing any of them never plays stale audio. Reading a
+    file refreshes its modification time, and once the directory grows past max_bytes
+    the least recently used files are deleted.
+    """
+
+    def __init__(self, directory, max_bytes=50 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._sizes = {}  # file name -> bytes, so the total is known without a scan
+        for name in os.listdir(directory):
+            if name.endswith(".wav"):
+                self._sizes[name] = os.path.getsize(os.path.join(directory, name))
+        self._total_bytes = sum(self._sizes.values())
+
+    @staticmethod
+    def key(text, voice_id, rate, volume):
+        material = json.dumps([text, voice_id, rate, round(float(volume), 3)])
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".wav")
+
+    def __contains__(self, key):
+        return os.path.exists(self._path(key))
+
+    def get(self, key, text):
+        """Returns the cached RenderedSpeech for key, or None."""
+        path = self._path(key)
+        try:
+            with wave.open(path, "rb") as wf:
+                speech = RenderedSpeech(
+                    text=text,
+                    pcm=wf.readframes(wf.getnframes()),
+                    sample_rate=wf.getframerate(),
+                    channels=wf.getnchannels(),
+                    sample_width=wf.getsampwidth(),
+                )
+            os.utime(path)  # Mark as recently used for eviction
+        except (OSError, EOFError, wave.Error):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return speech
+
+    def put(self, key, speech):
+        name = key + ".wav"
+        path = self._path(key)
+        temp_path = path + ".tmp"
+        try:
+            with wave.open(temp_path, "wb") as wf:
+                wf.setnchannels(speech.channels)
+                wf.setsampwidth(speech.sample_width)
+                wf.setframerate(speech.sample_rate)
+                wf.writeframes(speech.pcm)
+            os.replace(temp_path, path)  # Readers never see a half-written file
+            size = os.path.getsize(path)
+        except OSError as e:
+            print(f"Speech cache: could not store sentence: {e}")
+            return
+        with self._lock:
+            self._total_bytes += size - self._sizes.get(name, 0)
+            self._sizes[name] = size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        entries = []
+        for name in self._sizes:
+            try:
+                entries.append(
+                    (os.path.getmtime(os.path.join(self.directory, name)), name)
+                )
+            except OSError:
+                entries.append((0.0, name))  # Already gone: drop it from the index first
+        entries.sort()  # Least recently used first
+        for _, name in entries:
+            if self._total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"Speech cache: could not remove {name}: {e}")
+                continue
+            self._total_bytes -= self._sizes.pop(name)
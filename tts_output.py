@@ -0,0 +1,107 @@
+import collections
+import os
+import tempfile
+import wave
+
+# One synthesized sentence, ready to be written to the output stream
+RenderedSpeech = collections.namedtuple(
+    "RenderedSpeech", "text pcm sample_rate channels sample_width"
+)
+
+
+def render_to_pcm(engine, text, wav_path=None):
+    """
+    Synthesizes text with a pyttsx3 engine into memory via save_to_file and returns a
+    RenderedSpeech. Blocks the calling thread for the duration of synthesis only, not
+    playback.
+    """
+    cleanup = wav_path is None
+    if wav_path is None:
+        fd, wav_path = tempfile.mkstemp(suffix=".wav", prefix="tts_")
+        os.close(fd)
+    try:
+        engine.save_to_file(text, wav_path)
+        engine.runAndWait()
+        with wave.open(wav_path, "rb") as wf:
+            return RenderedSpeech(
+                text=text,
+                pcm=wf.readframes(wf.getnframes()),
+                sample_rate=wf.getframerate(),
+                channels=wf.getnchannels(),
+                sample_width=wf.getsampwidth(),
+            )
+    finally:
+        if cleanup:
+            try:
+                os.remove(wav_path)
+            except OSError:
+                pass
+
+
+class PCMPlayer:
+    """
+    Plays rendered sentences through a single persistent PyAudio output stream, so
+    consecutive sentences are written back to back without reopening the device. The
+    stream is only reopened if the audio format changes.
+    """
+
+    def __init__(self, block_frames=1024):
+        self.block_frames = block_frames
+        self.pa = None
+        self.stream = None
+        self._stream_format = None
+
+    def _ensure_stream(self, sample_rate, channels, sample_width):
+        stream_format = (sample_rate, channels, sample_width)
+        if self.stream is not None and self._stream_format == stream_format:
+            return self.stream
+        self._close_stream()
+        if self.pa is None:
+            import pyaudio  # Deferred until the first sentence is played
+
+            self.pa = pyaudio.PyAudio()
+        self.stream = self.pa.open(
+            format=self.pa.get_format_from_width(sample_width),
+            channels=channels,
+            rate=sample_rate,
+            output=True,
+            frames_per_buffer=self.block_frames,
+        )
+        self._stream_format = stream_format
+        print(
+            f"PCM player: output stream opened ({sample_rate} Hz, {channels} ch, {8 * sample_width}-bit)."
+        )
+        return self.stream
+
+    def play(self, speech, should_stop):
+        """
+        Writes speech to the output stream in small blocks, checking should_stop() between
+        blocks so a stop request silences playback within one block. Returns True if the
+        whole sentence was played.
+        """
+        stream = self._ensure_stream(
+            speech.sample_rate, speech.channels, speech.sample_width
+        )
+        block_bytes = self.block_frames * speech.channels * speech.sample_width
+        pcm = memoryview(speech.pcm)
+        for offset in range(0, len(pcm), block_bytes):
+            if should_stop():
+                return False
+            stream.write(pcm[offset : offset + block_bytes].tobytes())
+        return True
+
+    def _close_stream(self):
+        if self.stream is not None:
+            try:
+                self.stream.stop_stream()
+                self.stream.close()
+            except Exception as e:
+                print(f"PCM player: error closing output stream: {e}")
+            self.stream = None
+            self._stream_format = None
+
+    def close(self):
+        self._close_stream()
+        if self.pa is not None:
+            self.pa.terminate()
+            self.pa = None
@@ -0,0 +1,278 @@
+import collections
+import json
+import os
+import threading
+import time
+
+# Stage boundaries of one push-to-talk turn, in pipeline order
+TURN_STAGES = (
+    "hotkey_press",
+    "capture_start",
+    "hotkey_release",
+    "capture_closed",
+    "asr_start",
+    "asr_end",
+    "request_sent",
+    "first_token",
+    "first_sentence_queued",
+    "first_audio_out",
+    "last_audio_out",
+)
+
+# Named spans between two stages; these are what the histograms and the stats panel show
+TURN_SPANS = (
+    ("press_to_capture", "hotkey_press", "capture_start"),
+    ("release_to_closed", "hotkey_release", "capture_closed"),
+    ("asr", "asr_start", "asr_end"),
+    ("asr_to_request", "asr_end", "request_sent"),
+    ("first_token", "request_sent", "first_token"),
+    ("first_sentence", "first_token", "first_sentence_queued"),
+    ("first_audio", "first_sentence_queued", "first_audio_out"),
+    ("release_to_audio", "hotkey_release", "first_audio_out"),
+    ("playback", "first_audio_out", "last_audio_out"),
+)
+
+# Upper bounds (seconds) of the Prometheus histogram buckets
+DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class TurnTimeline:
+    """perf_counter() timestamps of the stage boundaries one turn has reached so far."""
+
+    def __init__(self, turn_id):
+        self.turn_id = turn_id
+        self.started_at = time.time()  # Wall clock, for the export only
+        self.epoch = None  # Turn epoch of the response, once a request is sent
+        self.marks = {}
+        self.interrupted = False
+
+    def mark(self, stage, timestamp=None):
+        """Records stage once; later marks of the same stage are ignored."""
+        if stage in self.marks:
+            return False
+        self.marks[stage] = time.perf_counter() if timestamp is None else timestamp
+        return True
+
+    def span(self, start, end):
+        if start in self.marks and end in self.marks:
+            return self.marks[end] - self.marks[start]
+        return None
+
+    def to_dict(self):
+        """Stage offsets in milliseconds from the first mark, plus the span durations."""
+        origin = min(self.marks.values()) if self.marks else 0.0
+        return {
+            "turn": self.turn_id,
+            "started_at": self.started_at,
+            "interrupted": self.interrupted,
+            "stages_ms": {
+                stage: round((self.marks[stage] - origin) * 1000, 1)
+                for stage in TURN_STAGES
+                if stage in self.marks
+            },
+            "spans_ms": {
+                name: round(seconds * 1000, 1)
+                for name, start, end in TURN_SPANS
+                if (seconds := self.span(start, end)) is not None
+            },
+        }
+
+
+class SpanHistogram:
+    """Fixed buckets for the whole session plus a bounded window of recent samples."""
+
+    def __init__(self, buckets, window):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0.0
+        self.recent = collections.deque(maxlen=window)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.recent.append(seconds)
+        for i, upper in enumerate(self.buckets):
+            if seconds <= upper:
+                self.bucket_counts[i] += 1
+                break
+
+    def quantile(self, q):
+        """Nearest-rank quantile of the recent samples, or None without samples."""
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, max(0, round(q * len(ordered)) - 1))]
+
+
+class TurnMetrics:
+    """
+    Bounded in-memory store of per-turn latency timelines.
+
+    begin_turn() starts a timeline and closes the previous one; mark() records a stage
+    boundary on the current timeline. As soon as both ends of a span are known its
+    duration goes into that span's histogram, so the p50/p95 figures are live during the
+    turn. Only the last max_turns finished timelines and the last window samples per
+    span are kept; the bucket counts cover the whole session. Thread-safe.
+
+    on_finish(timeline), if given, is called with every timeline once it is closed.
+    """
+
+    def __init__(self, max_turns=200, window=200, buckets=DEFAULT_BUCKETS, on_finish=None):
+        self.on_finish = on_finish
+        self._lock = threading.Lock()
+        self.turns = collections.deque(maxlen=max_turns)
+        self.histograms = {
+            name: SpanHistogram(buckets, window) for name, _, _ in TURN_SPANS
+        }
+        self.current = None
+        self._next_turn_id = 1
+
+    def begin_turn(self):
+        with self._lock:
+            finished = self._finish_current()
+            self.current = timeline = TurnTimeline(self._next_turn_id)
+            self._next_turn_id += 1
+        self._notify(finished)
+        return timeline
+
+    def ensure_turn(self, stage):
+        """Starts a timeline unless the current one has yet to reach stage."""
+        with self._lock:
+            if self.current is not None and stage not in self.current.marks:
+                return self.current
+        return self.begin_turn()
+
+    def mark(self, stage, epoch=None):
+        """
+        Records stage on the current timeline. With epoch, the mark is dropped unless the
+        timeline belongs to that turn epoch, so an interrupted answer cannot mark the next
+        turn. Returns True if a new span sample was recorded.
+        """
+        timestamp = time.perf_counter()
+        with self._lock:
+            timeline = self.current
+            if timeline is None or (epoch is not None and timeline.epoch != epoch):
+                return False
+            if stage == "last_audio_out":
+                # Moves with every sentence; its span is recorded when the turn ends
+                timeline.marks[stage] = timestamp
+                return False
+            if not timeline.mark(stage, timestamp):
+                return False
+            recorded = False
+            for name, start, end in TURN_SPANS:
+                if end == stage:
+                    seconds = timeline.span(start, end)
+                    if seconds is not None:
+                        self.histograms[name].add(seconds)
+                        recorded = True
+            return recorded
+
+    def set_epoch(self, epoch):
+        with self._lock:
+            if self.current is not None:
+                self.current.epoch = epoch
+
+    def mark_interrupted(self, epoch):
+        """Flags the current timeline if its answer (turn epoch epoch) was cut short."""
+        with self._lock:
+            if self.current is not None and self.current.epoch == epoch:
+                self.current.interrupted = True
+
+    def current_turn_id(self):
+        with self._lock:
+            return self.current.turn_id if self.current is not None else None
+
+    def finish_turn(self):
+        with self._lock:
+            finished = self._finish_current()
+        self._notify(finished)
+
+    def _finish_current(self):
+        timeline, self.current = self.current, None
+        if timeline is None or not timeline.marks:
+            return None
+        seconds = timeline.span("first_audio_out", "last_audio_out")
+        if seconds is not None:
+            self.histograms["playback"].add(seconds)
+        self.turns.append(timeline)
+        return timeline
+
+    def _notify(self, timeline):
+        # Outside the lock, so the callback may call back into this object
+        if timeline is not None and self.on_finish:
+            try:
+                self.on_finish(timeline)
+            except Exception as e:
+                print(f"Turn metrics: error in on_finish: {e}")
+
+    def summary(self):
+        """{span: (samples, p50, p95)} over the recent window, for spans with samples."""
+        with self._lock:
+            return {
+                name: (len(h.recent), h.quantile(0.5), h.quantile(0.95))
+                for name, h in self.histograms.items()
+                if h.recent
+            }
+
+    def export_jsonl(self, path):
+        """Writes one JSON object per stored turn, oldest first, replacing path."""
+        with self._lock:
+            lines = [json.dumps(timeline.to_dict()) for timeline in self.turns]
+            if self.current is not None and self.current.marks:
+                lines.append(json.dumps(self.current.to_dict()))
+        _write_atomically(path, "".join(line + "\n" for line in lines))
+        return len(lines)
+
+    def export_prometheus(self, path, prefix="voice_turn"):
+        """Writes the span histograms in the Prometheus text exposition format."""
+        name = f"{prefix}_stage_seconds"
+        lines = [
+            f"# HELP {name} Duration of each stage of a push-to-talk turn.",
+            f"# TYPE {name} histogram",
+        ]
+        quantile_lines = [
+            f"# HELP {name}_recent Quantiles over the most recent turns.",
+            f"# TYPE {name}_recent gauge",
+        ]
+        with self._lock:
+            for span, h in self.histograms.items():
+                cumulative = 0
+                for upper, count in zip(h.buckets, h.bucket_counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{stage="{span}",le="{upper}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{stage="{span}",le="+Inf"}} {h.count}')
+                lines.append(f'{name}_sum{{stage="{span}"}} {h.total:.6f}')
+                lines.append(f'{name}_count{{stage="{span}"}} {h.count}')
+                for q in (0.5, 0.95):
+                    value = h.quantile(q)
+                    if value is not None:
+                        quantile_lines.append(
+                            f'{name}_recent{{stage="{span}",quantile="{q}"}} {value:.6f}'
+                        )
+            lines.append(f"# HELP {prefix}_turns_total Turns started this session.")
+            lines.append(f"# TYPE {prefix}_turns_total counter")
+            lines.append(f"{prefix}_turns_total {self._next_turn_id - 1}")
+        _write_atomically(path, "\n".join(lines + quantile_lines) + "\n")
+
+
+def format_summary(summary):
+    """One line per span, e.g. 'first_token   0.42 / 0.80 s', for the stats panel."""
+    if not summary:
+        return "No turns yet."
+    width = max(len(name) for name in summary)
+    return "\n".join(
+        f"{name:<{width}}  {p50:5.2f} / {p95:5.2f} s"
+        for name, (_, p50, p95) in summary.items()
+    )
+
+
+def _write_atomically(path, text):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
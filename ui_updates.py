@@ -0,0 +1,156 @@
+import threading
+import time
+
+
+class UIUpdateChannel:
+    """
+    Thread-safe buffer between worker threads and the Tk widgets they update.
+
+    Workers call append_text(), set_text() and configure() from any thread; no widget
+    is touched until the pump, which runs on the GUI thread via after(), drains the
+    buffer at most max_fps times per second. Everything appended to a textbox during one
+    frame is written with a single insert and a single see("end"), and only the last
+    configure() per widget and option survives, so a 100 tokens/s stream costs 30 small
+    Tk updates per second instead of 200 queued callbacks.
+
+    The pump only runs while there is something to draw. The first update posted while
+    it is idle arms it with one after() call (Tk hands calls from worker threads to the
+    GUI thread), and it stops rescheduling itself once a frame finds the buffer empty,
+    so an idle window does not wake up max_fps times per second.
+
+    Text can be tagged with the turn epoch it belongs to. After set_epoch() moves on,
+    tagged text from older epochs is dropped, whether it is still buffered or arrives
+    later from a response that has not noticed its cancellation yet.
+    """
+
+    def __init__(self, root, max_fps=30):
+        self.root = root
+        self.interval_ms = max(1, int(1000 / max(1, max_fps)))
+        self._lock = threading.Lock()
+        self._text = {}  # textbox -> [replacement text or None, [(epoch, text), ...]]
+        self.epoch = None
+        self._options = {}  # widget -> {option: value}
+        self._after_id = None
+        self._running = False
+        self._armed = False  # A frame is scheduled or being drawn; guarded by _lock
+        self.frames = 0  # Frames that applied at least one update
+        self.updates = 0  # Updates received, before coalescing
+
+    def start(self):
+        """Starts the pump. Must be called on the GUI thread."""
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            arm = self._arm_if_pending()
+        if arm:
+            self._schedule(self.interval_ms)
+
+    def stop(self):
+        """Stops the pump after applying whatever is still buffered. GUI thread only."""
+        with self._lock:
+            self._running = False
+            self._armed = False
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+        self._apply()
+
+    def set_epoch(self, epoch):
+        with self._lock:
+            self.epoch = epoch
+
+    def _is_stale(self, epoch):
+        return epoch is not None and epoch != self.epoch
+
+    def append_text(self, textbox, text, epoch=None):
+        if not text:
+            return
+        with self._lock:
+            if self._is_stale(epoch):
+                return
+            self._text.setdefault(textbox, [None, []])[1].append((epoch, text))
+            self.updates += 1
+            arm = self._running and not self._armed and self._arm_if_pending()
+        if arm:
+            self._schedule(self.interval_ms)
+
+    def set_text(self, textbox, text, epoch=None):
+        """Replaces the whole content of textbox, discarding text appended before it."""
+        with self._lock:
+            if self._is_stale(epoch):
+                return
+            self._text[textbox] = [text, []]
+            self.updates += 1
+            arm = self._running and not self._armed and self._arm_if_pending()
+        if arm:
+            self._schedule(self.interval_ms)
+
+    def configure(self, widget, **options):
+        with self._lock:
+            self._options.setdefault(widget, {}).update(options)
+            self.updates += 1
+            arm = self._running and not self._armed and self._arm_if_pending()
+        if arm:
+            self._schedule(self.interval_ms)
+
+    def _arm_if_pending(self):
+        """True if the caller must schedule a frame. Called with _lock held."""
+        if not self._running or self._armed or not (self._text or self._options):
+            return False
+        self._armed = True
+        return True
+
+    def _schedule(self, delay_ms):
+        # Never with _lock held: from a worker thread, after() waits for the GUI thread
+        try:
+            self._after_id = self.root.after(delay_ms, self._pump)
+        except Exception as e:
+            print(f"UI update: could not schedule a frame: {e}")
+            with self._lock:
+                self._armed = False  # The next update tries again
+
+    def _pump(self):
+        self._after_id = None
+        if not self._running:
+            return  # Scheduled by a post that raced with stop(), which applied it all
+        started = time.perf_counter()
+        self._apply()
+        with self._lock:
+            # Updates posted while this frame was drawn keep the pump going; if there
+            # are none it goes idle until the next post arms it again
+            self._armed = False
+            arm = self._arm_if_pending()
+        if arm:
+            # Keep the frame rate capped even when applying took a while
+            spent_ms = int((time.perf_counter() - started) * 1000)
+            self._schedule(max(1, self.interval_ms - spent_ms))
+
+    def _apply(self):
+        with self._lock:
+            text, self._text = self._text, {}
+            options, self._options = self._options, {}
+            for entry in text.values():
+                entry[1] = [part for epoch, part in entry[1] if not self._is_stale(epoch)]
+        if not text and not options:
+            return
+        self.frames += 1
+        for widget, widget_options in options.items():
+            try:
+                widget.configure(**widget_options)
+            except Exception as e:
+                print(f"UI update: could not configure {widget}: {e}")
+        for textbox, (replacement, parts) in text.items():
+            try:
+                if replacement is not None:
+                    textbox.delete("1.0", "end")
+                    if replacement:
+                        textbox.insert("end", replacement)
+                if parts:
+                    textbox.insert("end", "".join(parts))
+                textbox.see("end")
+            except Exception as e:
+                print(f"UI update: could not update text: {e}")
@@ -0,0 +1,75 @@
+import numpy as np
+
+
+def frame_features(audio_np, frame_len):
+    """
+    Splits float32 audio into non-overlapping frames and returns per-frame energy in dBFS
+    and zero-crossing rate, computed in one vectorized pass. A trailing partial frame is
+    ignored.
+    """
+    n_frames = len(audio_np) // frame_len
+    if n_frames == 0:
+        return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.float32)
+    frames = audio_np[: n_frames * frame_len].reshape(n_frames, frame_len)
+    energy_db = 10.0 * np.log10(np.mean(np.square(frames), axis=1) + 1e-10)
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (frame_len - 1)
+    return energy_db, zcr
+
+
+def detect_speech_bounds(
+    audio_np,
+    sample_rate=16000,
+    frame_ms=20,
+    min_energy_db=-50.0,
+    noise_margin_db=12.0,
+    min_speech_ms=100,
+    padding_ms=200,
+    max_noise_floor_db=-40.0,
+):
+    """
+    Energy / zero-crossing voice activity detection over 20 ms frames.
+
+    A frame counts as speech when its energy is above both min_energy_db and the estimated
+    noise floor plus noise_margin_db, or slightly below that but with a high zero-crossing
+    rate (unvoiced fricatives like "s" and "f" are quiet but noisy). The noise floor is
+    capped at max_noise_floor_db so clips with no pauses at all are not trimmed. Returns the
+    (start, end) sample range of speech including padding_ms on each side, or None when
+    less than min_speech_ms of speech was found.
+    """
+    frame_len = int(sample_rate * frame_ms / 1000)
+    energy_db, zcr = frame_features(audio_np, frame_len)
+    if len(energy_db) == 0:
+        return None
+    noise_floor_db = min(np.percentile(energy_db, 10), max_noise_floor_db)
+    threshold_db = max(min_energy_db, noise_floor_db + noise_margin_db)
+    is_speech = (energy_db > threshold_db) | (
+        (energy_db > threshold_db - 6.0) & (zcr > 0.3)
+    )
+    speech_frames = np.flatnonzero(is_speech)
+    if len(speech_frames) * frame_ms < min_speech_ms:
+        return None
+    pad_frames = int(padding_ms / frame_ms)
+    start_frame = max(0, speech_frames[0] - pad_frames)
+    end_frame = min(len(energy_db), speech_frames[-1] + 1 + pad_frames)
+    end_sample = len(audio_np) if end_frame == len(energy_db) else end_frame * frame_len
+    return start_frame * frame_len, end_sample
+
+
+def trim_silence(pcm_bytes, sample_rate=16000, **vad_options):
+    """
+    Trims leading and trailing silence from 16-bit mono PCM.
+
+    Returns (trimmed_pcm_bytes, original_seconds, trimmed_seconds). trimmed_pcm_bytes is
+    empty when no speech was detected, meaning the audio should not be decoded at all.
+    """
+    samples = np.frombuffer(pcm_bytes, dtype=np.int16)
+    original_seconds = len(samples) / sample_rate
+    bounds = detect_speech_bounds(
+        samples.astype(np.float32) / 32768.0, sample_rate=sample_rate, **vad_options
+    )
+    if bounds is None:
+        return b"", original_seconds, original_seconds
+    start, end = bounds
+    trimmed_seconds = (len(samples) - (end - start)) / sample_rate
+    return samples[start:end].tobytes(), original_seconds, trimmed_seconds